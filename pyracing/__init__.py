@@ -1,4 +1,8 @@
 from .common import Entity
+from .event_dispatcher import EventDispatcher
+from .write_buffer import WriteBuffer
+from .memory_database import MemoryDatabase
+from .sqlite_database import SQLiteDatabase
 from .meet import Meet
 from .race import Race
 from .runner import Runner
@@ -6,28 +10,83 @@ from .horse import Horse
 from .jockey import Jockey
 from .trainer import Trainer
 from .performance import Performance
+from .compact_performance import CompactPerformance
 from .performance_list import PerformanceList
+from .performance_query import PerformanceQuery
+from .cumulative_statistics import CumulativeStatistics
+from .snapshot import Snapshot
+from .performance_store import PerformanceStore
+from .runner_features import RunnerFeatures
 from .processor import Processor
 
 
-def initialize(database, scraper):
+def initialize(database, scraper, runner_features=False, performance_store=None, versioned=False):
 	"""Initialize package dependencies
 
 	database must be an object representing a database connection that conforms to the pymongo API, supporting code such as the following:
 	documents = database[collection_name].find(filter)
 
+	Alternatively, database can be a factory function taking no arguments that returns such an object (e.g. lambda: pymongo.MongoClient()['pyracing']). The factory is called once in each process that uses pyracing, so that worker processes forked after initialization create their own client instead of sharing their parent's.
+
 	scraper must be an object that conforms to the pypunters.Scraper API, supporting code such as the following:
 	meets = scraper.scrape_meets(date)
+
+	If runner_features is True, the features calculated for each runner will be materialised in the runner_features collection (see RunnerFeatures).
+
+	performance_store can be a PerformanceStore (or the path to one) from which horse and jockey performances will be read instead of the database, as of the date the store was built (see PerformanceStore).
+
+	If versioned is True, expired entities will be marked as superseded rather than deleted when they are scraped again, so that they remain available to as-of reads (see as_of).
 	"""
 
 	Entity.database = database
 	Entity.scraper = scraper
+	Entity.versioned = versioned
+
+	RunnerFeatures.enabled = runner_features
+
+	if isinstance(performance_store, str):
+		performance_store = PerformanceStore(performance_store)
+	Performance.store = performance_store
 
-	for entity in (Meet, Race, Runner, Horse, Jockey, Trainer, Performance):
+	for entity in (Meet, Race, Runner, Horse, Jockey, Trainer, Performance, RunnerFeatures):
 		entity.initialize()
 
 
-def add_subscriber(event, handler):
-	"""Add handler to the list of subscribers to event"""
+def add_subscriber(event, handler, asynchronous=False, batch=False):
+	"""Add handler to the list of subscribers to event
+
+	If asynchronous is True, handler will be called from a background thread rather than during the save or delete that published the event, and will see the entity as it is when the event is delivered.
+	If batch is also True, handler will be called with a list of entities rather than a single entity.
+	"""
+
+	Entity.event_manager.add_subscriber(event, handler, asynchronous, batch)
+
+
+def flush_events():
+	"""Block until all published events have been delivered to asynchronous subscribers, raising the first exception raised by any of them since the last flush"""
+
+	Entity.event_manager.flush()
+
+
+def as_of(date):
+	"""Return a context manager within which entities are read as they were stored at the specified date (see Entity.as_of)"""
+
+	return Entity.as_of(date)
+
+
+def disable_write_behind():
+	"""Write any pending buffered saves to the database and return to writing each save immediately"""
+
+	Entity.disable_write_behind()
+
+
+def enable_write_behind(batch_size=1000):
+	"""Buffer saves of existing entities and write them to the database in batches of batch_size (see Entity.save)"""
+
+	Entity.enable_write_behind(batch_size)
+
+
+def flush_writes():
+	"""Write any pending buffered saves to the database"""
 
-	Entity.event_manager.add_subscriber(event, handler)
\ No newline at end of file
+	Entity.flush_writes()
@@ -1,16 +1,45 @@
+from contextlib import contextmanager
 from datetime import datetime
+import os
+import threading
 
-from jtgpy.events import EventManager
+from .event_dispatcher import EventDispatcher
+from .write_buffer import WriteBuffer
 
 
 class Entity(dict):
 	"""Common functionality for racing entities"""
 
+	COLLECTION_NAME = None
+	SCRAPED = True
 	SESSION_ID = datetime.now()
 
+	as_of_state = threading.local()
 	database = None
-	event_manager = EventManager()
+	database_handles = None
+	database_lock = threading.Lock()
+	event_manager = EventDispatcher()
+	read_preference = None
 	scraper = None
+	versioned = False
+	write_buffer = None
+	write_concern = None
+
+	@classmethod
+	@contextmanager
+	def as_of(cls, date):
+		"""Return a context manager within which entities are read as they were stored at the specified date
+
+		Within the context, only entities scraped on or before date (and, if versioning is enabled, not superseded until after date) are found, and find_or_scrape methods never delete, scrape or save entities.
+		The as-of date applies to the current thread only, and does not affect entities or related objects that were already loaded and cached before entering the context.
+		"""
+
+		previous_date = getattr(Entity.as_of_state, 'date', None)
+		Entity.as_of_state.date = date
+		try:
+			yield
+		finally:
+			Entity.as_of_state.date = previous_date
 
 	@classmethod
 	def create_index(cls, index):
@@ -20,30 +49,92 @@ class Entity(dict):
 
 	@classmethod
 	def delete_expired(cls, filter, expiry_date):
-		"""Delete entities matching the specified filter with a scraped_at date prior to expiry_date"""
+		"""Delete entities matching the specified filter with a scraped_at date prior to expiry_date
+
+		If versioning is enabled, the expired entities are superseded rather than deleted, so that they remain available to as-of reads.
+		"""
 
 		if expiry_date is not None:
 			for entity in cls.find(dict({'scraped_at': {'$lt': expiry_date}, 'session_id': {'$ne': cls.SESSION_ID}}, **filter)):
-				entity.delete()
+				if cls.versioned:
+					entity.supersede()
+				else:
+					entity.delete()
+
+	@classmethod
+	def disable_write_behind(cls):
+		"""Flush any pending writes and return to writing each save to the database immediately"""
+
+		if Entity.write_buffer is not None:
+			write_buffer = Entity.write_buffer
+			Entity.write_buffer = None
+			write_buffer.flush()
+
+	@classmethod
+	def enable_write_behind(cls, batch_size=1000):
+		"""Collect saves of existing entities in a WriteBuffer and write them to the database in batches of batch_size"""
+
+		if Entity.write_buffer is None:
+			Entity.write_buffer = WriteBuffer(batch_size)
+		else:
+			Entity.write_buffer.batch_size = batch_size
 
 	@classmethod
-	def find(cls, filter):
+	def find(cls, filter, sort=None):
 		"""Get a list of entities matching the specified filter from the database"""
 
-		return [cls(values) for values in cls.get_database_collection().find(filter)]
+		return list(cls.iter_find(filter, sort=sort))
 
 	@classmethod
 	def find_one(cls, filter):
 		"""Get a single entity matching filter from the database"""
 
-		values = cls.get_database_collection().find_one(filter)
+		if cls.get_as_of(filter) is not None:
+			for entity in cls.iter_find(filter, sort=[('scraped_at', -1)]):
+				return entity
+			return None
+
+		cls.flush_writes(cls)
+		values = cls.get_database_collection().find_one(cls.get_version_filter(filter))
 		if values is not None:
 			return cls(values)
 
+	@classmethod
+	def iter_documents(cls, filter, sort=None, batch_size=None):
+		"""Get a generator yielding the raw database documents for the entities matching the specified filter
+
+		This method implements iter_find (see below) without creating entities from the documents, so that other representations of an entity type's documents (such as CompactPerformance) can be read with the same version and as-of rules.
+		"""
+
+		as_of = cls.get_as_of(filter)
+
+		cls.flush_writes(cls)
+		cursor = cls.get_database_collection().find(cls.get_version_filter(filter))
+		if sort is not None:
+			cursor = cursor.sort(sort)
+		if batch_size is not None:
+			cursor = cursor.batch_size(batch_size)
+
+		return (values for values in cursor if as_of is None or cls.is_visible(values, as_of))
+
+	@classmethod
+	def iter_find(cls, filter, sort=None, batch_size=None):
+		"""Get a generator yielding entities matching the specified filter from the database
+
+		Entities are created as the underlying database cursor is consumed, so the full result set is never held in memory at once.
+		sort must be a list of (key, direction) tuples as accepted by pymongo, and batch_size specifies the number of documents to fetch from the database per round trip.
+		The as-of date and pending buffered writes are applied when this method is called rather than when the generator is first consumed, so a generator created within an as_of context reads as of that date even if it is consumed after the context has exited.
+		"""
+
+		return (cls(values) for values in cls.iter_documents(filter, sort=sort, batch_size=batch_size))
+
 	@classmethod
 	def find_or_scrape(cls, filter, scrape, scrape_args=None, scrape_kwargs=None, expiry_date=None):
 		"""Get a list of entities by finding them in the database or scraping them from the web"""
 
+		if cls.get_as_of(filter) is not None:
+			return cls.find(filter)
+
 		cls.delete_expired(filter, expiry_date)
 		entities = cls.find(filter)
 
@@ -62,6 +153,9 @@ class Entity(dict):
 	def find_or_scrape_one(cls, filter, scrape, scrape_args=None, scrape_kwargs=None, expiry_date=None):
 		"""Get a single entity by finding it in the database or scraping it from the web"""
 
+		if cls.get_as_of(filter) is not None:
+			return cls.find_one(filter)
+
 		cls.delete_expired(filter, expiry_date)
 		entity = cls.find_one(filter)
 
@@ -77,34 +171,244 @@ class Entity(dict):
 
 		return entity
 
+	@classmethod
+	def flush_writes(cls, entity_type=None):
+		"""Write any pending buffered saves to the database
+
+		If entity_type is specified, only pending saves for that entity type are written. Pending saves for an entity type are always written before it is read from the database, so reads never return stale values.
+		"""
+
+		if Entity.write_buffer is not None:
+			if entity_type is not None:
+				Entity.write_buffer.flush_entity_type(entity_type)
+			else:
+				Entity.write_buffer.flush()
+
+	@classmethod
+	def get_as_of(cls, filter=None):
+		"""Get the as-of date for reads in the current thread (see as_of), or None if entities are read as currently stored
+
+		If filter is specified, None is also returned when the filter does not apply to versioned reads, i.e. for entity types that are not scraped and for filters that select entities by database ID.
+		"""
+
+		if filter is not None and (not cls.SCRAPED or '_id' in filter):
+			return None
+		return getattr(Entity.as_of_state, 'date', None)
+
+	@classmethod
+	def get_collection_name(cls):
+		"""Get the name of the database collection for this specific entity type"""
+
+		if cls.COLLECTION_NAME is not None:
+			return cls.COLLECTION_NAME
+		else:
+			return cls.__name__.lower() + 's'
+
+	@classmethod
+	def get_database(cls):
+		"""Get the database for the current process"""
+
+		return cls.get_database_handles()['database']
+
 	@classmethod
 	def get_database_collection(cls):
-		"""Get the database collection for this specific entity type"""
+		"""Get the database collection for this specific entity type
+
+		Collection handles are created once per process and entity type, applying the entity type's read_preference and write_concern (if any).
+		"""
+
+		collections = cls.get_database_handles()['collections']
+		if not cls in collections:
+			collection = cls.get_database()[cls.get_collection_name()]
+			if cls.read_preference is not None or cls.write_concern is not None:
+				collection = collection.with_options(read_preference=cls.read_preference, write_concern=cls.write_concern)
+			collections[cls] = collection
+		return collections[cls]
+
+	@classmethod
+	def get_database_handles(cls):
+		"""Get a dictionary containing the database and cached collection handles for the current process
 
-		return cls.database[cls.__name__.lower() + 's']
+		If Entity.database is a factory (i.e. a callable that does not support item access), it is called to create a new database the first time it is needed in each process, so that forked worker processes never share a client created by their parent.
+		The same handles are shared by all threads in a process, as pymongo clients are thread-safe and pool their own connections.
+		"""
+
+		handles = Entity.database_handles
+		pid = os.getpid()
+
+		if handles is None or handles['source'] is not Entity.database or handles['pid'] != pid:
+			with Entity.database_lock:
+				handles = Entity.database_handles
+				if handles is None or handles['source'] is not Entity.database or handles['pid'] != pid:
+					database = Entity.database
+					if callable(database) and not hasattr(database, '__getitem__'):
+						database = database()
+					handles = Entity.database_handles = {'source': Entity.database, 'pid': pid, 'database': database, 'collections': {}}
+
+		return handles
+
+	@classmethod
+	def get_version_filter(cls, filter):
+		"""Return filter augmented to exclude entity versions that are not visible to the current thread's reads
+
+		Entities scraped after the as-of date are excluded within an as_of context, while superseded entities are excluded outside one if versioning is enabled.
+		"""
+
+		if not cls.SCRAPED or '_id' in filter:
+			return filter
+
+		as_of = cls.get_as_of()
+		if as_of is not None:
+			if not 'scraped_at' in filter:
+				filter = dict(filter, scraped_at={'$lte': as_of})
+		elif cls.versioned:
+			filter = dict(filter, superseded_at=None)
+		return filter
+
+	@classmethod
+	def is_visible(cls, values, as_of):
+		"""Return True if the entity version with the specified values was current at the as-of date"""
+
+		if values.get('scraped_at') is None or values['scraped_at'] > as_of:
+			return False
+		return values.get('superseded_at') is None or values['superseded_at'] > as_of
+
+	@classmethod
+	def set_collection_options(cls, read_preference=None, write_concern=None):
+		"""Set the read preference and write concern for this specific entity type's database collection
+
+		The options are passed to pymongo's Collection.with_options, so read_preference must be a pymongo read preference (e.g. ReadPreference.SECONDARY_PREFERRED) and write_concern must be a pymongo WriteConcern.
+		"""
+
+		cls.read_preference = read_preference
+		cls.write_concern = write_concern
+
+		if Entity.database_handles is not None:
+			Entity.database_handles['collections'].clear()
 
 	def __init__(self, *args, **kwargs):
 		"""Initialize instance dependencies"""
 		super().__init__(*args, **kwargs)
 
 		self.cache = {}
+		self.changed_keys = set()
+
+	def __delitem__(self, key):
+		"""Delete the value for key and mark it as changed"""
+
+		super().__delitem__(key)
+		self.mark_changed(key)
+
+	def __reduce__(self):
+		"""Pickle only the entity's values and changed keys
+
+		The cache is discarded, so that pickling an entity never pickles the related entities it has loaded. They are loaded again on first access after unpickling.
+		"""
+
+		return self.__class__, (dict(self),), {'changed_keys': set(getattr(self, 'changed_keys', ()))}
+
+	def __setitem__(self, key, value):
+		"""Set the value for key and mark it as changed"""
+
+		super().__setitem__(key, value)
+		self.mark_changed(key)
+
+	def clear(self):
+		"""Remove all keys and mark them as changed"""
+
+		keys = list(self.keys())
+		super().clear()
+		self.mark_changed(*keys)
 
 	def delete(self):
 		"""Remove the entity from the database"""
 
 		if '_id' in self and self['_id'] is not None:
 			self.event_manager.publish_event('deleting_' + self.__class__.__name__.lower(), [self])
+			if self.write_buffer is not None:
+				self.write_buffer.discard(self.__class__, self['_id'])
 			self.get_database_collection().delete_one({'_id': self['_id']})
 			self.event_manager.publish_event('deleted_' + self.__class__.__name__.lower(), [self])
 
+	def get_changes(self):
+		"""Return an update document containing $set and/or $unset operators for the keys changed since the entity was loaded or last saved"""
+
+		update = {}
+		for key in getattr(self, 'changed_keys', ()):
+			if key == '_id':
+				continue
+			if key in self:
+				update.setdefault('$set', {})[key] = self[key]
+			else:
+				update.setdefault('$unset', {})[key] = ''
+		return update
+
+	def mark_changed(self, *keys):
+		"""Mark the specified keys as changed so that they are written by the next save
+
+		This is only necessary when a mutable value (such as a list) has been modified in place. If no keys are specified, all keys are marked as changed.
+		"""
+
+		changed_keys = getattr(self, 'changed_keys', None)
+		if changed_keys is None:
+			changed_keys = self.changed_keys = set()
+		changed_keys.update(keys if len(keys) > 0 else self.keys())
+
+	def pop(self, key, *args):
+		"""Remove key and return its value, marking it as changed"""
+
+		if key in self:
+			self.mark_changed(key)
+		return super().pop(key, *args)
+
+	def popitem(self):
+		"""Remove and return an arbitrary (key, value) pair, marking the key as changed"""
+
+		key, value = super().popitem()
+		self.mark_changed(key)
+		return key, value
+
 	def save(self):
-		"""Save the entity to the database"""
+		"""Save the entity to the database
+
+		New entities are inserted in full. For entities that already exist in the database, only the keys changed since the entity was loaded or last saved are written (using $set and $unset), and no write is made at all if nothing has changed.
+		If write-behind is enabled (see enable_write_behind), writes to entities that already exist in the database are buffered until the next flush_writes, while new entities are still inserted immediately so that they receive a database ID.
+		The saved_<entity> event is published when this method completes, so for buffered writes it is published before the write reaches the database.
+		"""
 
 		self.event_manager.publish_event('saving_' + self.__class__.__name__.lower(), [self])
 
 		if '_id' in self and self['_id'] is not None:
-			self.get_database_collection().replace_one({'_id': self['_id']}, self)
+			update = self.get_changes()
+			if len(update) > 0:
+				if self.write_buffer is not None:
+					self.write_buffer.add(self.__class__, self['_id'], update)
+				else:
+					self.get_database_collection().update_one({'_id': self['_id']}, update)
 		else:
 			self['_id'] = self.get_database_collection().insert_one(self).inserted_id
 
-		self.event_manager.publish_event('saved_' + self.__class__.__name__.lower(), [self])
\ No newline at end of file
+		self.changed_keys = set()
+
+		self.event_manager.publish_event('saved_' + self.__class__.__name__.lower(), [self])
+
+	def setdefault(self, key, default=None):
+		"""Return the value for key, first setting it to default (and marking it as changed) if it is not present"""
+
+		if not key in self:
+			self[key] = default
+		return self[key]
+
+	def supersede(self):
+		"""Mark this version of the entity as superseded, so that it is only found by as-of reads for earlier dates"""
+
+		self.event_manager.publish_event('superseding_' + self.__class__.__name__.lower(), [self])
+
+		self['superseded_at'] = datetime.now()
+		self.save()
+
+	def update(self, *args, **kwargs):
+		"""Update the entity with the specified values, marking each updated key as changed"""
+
+		for key, value in dict(*args, **kwargs).items():
+			self[key] = value
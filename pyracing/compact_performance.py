@@ -0,0 +1,157 @@
+class CompactPerformance:
+	"""A CompactPerformance is a memory-efficient, read-only representation of a performance for analytical loads
+
+	CompactPerformance objects support the same key access and calculated values as Performance objects, so they can be used in a PerformanceList.
+	Only the keys listed in FIELDS are retained, and the calculated values are computed once when the object is created.
+	"""
+
+	FIELDS = (
+		'_id',
+		'result',
+		'starters',
+		'track',
+		'date',
+		'distance',
+		'track_condition',
+		'runner_prize_money',
+		'race_prize_money',
+		'barrier',
+		'winning_time',
+		'starting_price',
+		'horse_url',
+		'jockey_url',
+		'weight',
+		'carried',
+		'lengths',
+		'scraped_at',
+		'session_id'
+		)
+
+	__slots__ = FIELDS + ('actual_distance', 'actual_weight', 'momentum', 'speed', 'track_condition_category')
+
+	@classmethod
+	def find(cls, filter, sort=None):
+		"""Get a list of compact performances matching the specified filter from the database"""
+
+		return list(cls.iter_find(filter, sort=sort))
+
+	@classmethod
+	def get_performances_by_horse(cls, horse):
+		"""Get a list of compact performances for the specified horse from the database in descending date order"""
+
+		return cls.find({'horse_url': horse['url']}, sort=[('date', -1)])
+
+	@classmethod
+	def get_performances_by_jockey(cls, jockey):
+		"""Get a list of compact performances for the specified jockey from the database in descending date order"""
+
+		return cls.find({'jockey_url': jockey['url']}, sort=[('date', -1)])
+
+	@classmethod
+	def iter_find(cls, filter, sort=None, batch_size=None):
+		"""Get a generator yielding compact performances matching the specified filter from the database (see Entity.iter_find)"""
+
+		return (cls(values) for values in Performance.iter_documents(filter, sort=sort, batch_size=batch_size))
+
+	def __init__(self, values):
+		"""Copy the relevant keys from values and calculate derived values"""
+
+		for key in self.FIELDS:
+			if key in values:
+				object.__setattr__(self, key, values[key])
+
+		actual_distance = Performance.calculate_actual_distance(self.get('distance'), self.get('lengths'))
+		object.__setattr__(self, 'actual_distance', actual_distance)
+
+		actual_weight = Performance.calculate_actual_weight(self.get('carried'))
+		object.__setattr__(self, 'actual_weight', actual_weight)
+
+		speed = Performance.calculate_speed(actual_distance, self.get('winning_time'))
+		object.__setattr__(self, 'speed', speed)
+
+		object.__setattr__(self, 'momentum', Performance.calculate_momentum(actual_weight, speed))
+
+		track_condition_category = values.get('track_condition_category')
+		if track_condition_category is None:
+			track_condition_category = Performance.categorise_track_condition(self.get('track_condition'))
+		object.__setattr__(self, 'track_condition_category', track_condition_category)
+
+	def __contains__(self, key):
+
+		return key in self.FIELDS and hasattr(self, key)
+
+	def __getitem__(self, key):
+
+		if key in self.FIELDS:
+			try:
+				return getattr(self, key)
+			except AttributeError:
+				pass
+		raise KeyError(key)
+
+	def __iter__(self):
+
+		return iter(self.keys())
+
+	def __len__(self):
+
+		return len(self.keys())
+
+	def __reduce__(self):
+		"""Pickle only the stored keys, as the calculated values are recalculated when unpickling"""
+
+		return self.__class__, (dict(self.items()),)
+
+	def __setattr__(self, name, value):
+
+		raise AttributeError('CompactPerformance objects are read-only')
+
+	def __str__(self):
+
+		return 'compact performance for {horse_url} at {track} on {date}'.format(horse_url=self.get('horse_url'), track=self.get('track'), date=self.get('date'))
+
+	@property
+	def horse(self):
+		"""Return the actual horse involved in this performance
+
+		As compact performances are read-only, the horse is looked up each time this property is accessed rather than being cached.
+		"""
+
+		return Horse.get_horse_by_performance(self)
+
+	@property
+	def jockey(self):
+		"""Return the actual jockey involved in this performance
+
+		As compact performances are read-only, the jockey is looked up each time this property is accessed rather than being cached.
+		"""
+
+		return Jockey.get_jockey_by_performance(self)
+
+	def get(self, key, default=None):
+		"""Return the value for key if present, else default"""
+
+		try:
+			return self[key]
+		except KeyError:
+			return default
+
+	def items(self):
+		"""Return a list of (key, value) tuples for the keys present in this performance"""
+
+		return [(key, getattr(self, key)) for key in self.keys()]
+
+	def keys(self):
+		"""Return a list of the keys present in this performance"""
+
+		return [key for key in self.FIELDS if hasattr(self, key)]
+
+	def to_performance(self):
+		"""Return a full Performance object containing the same values as this compact performance"""
+
+		return Performance(self.items())
+
+
+from .horse import Horse
+from .jockey import Jockey
+from .performance import Performance
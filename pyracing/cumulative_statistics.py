@@ -0,0 +1,112 @@
+from bisect import bisect_left
+
+
+class CumulativeStatistics:
+	"""CumulativeStatistics provide point-in-time statistics for a collection of performances using prefix sums over date-sorted performances
+
+	Statistics for any date range or any number of most recent starts are calculated in O(log n) time, and use the same definitions as the corresponding PerformanceList properties.
+	"""
+
+	TOTALS = (
+		'wins',
+		'seconds',
+		'thirds',
+		'fourths',
+		'prize_money',
+		'prize_money_count',
+		'starting_price',
+		'starting_price_count',
+		'winning_starting_price',
+		'winning_starting_price_count',
+		'momentum',
+		'momentum_count'
+		)
+
+	def __init__(self, performances):
+		"""Calculate prefix sums for the specified performances"""
+
+		performances = sorted(performances, key=lambda performance: performance['date'])
+
+		self.dates = [performance['date'] for performance in performances]
+
+		self.totals = dict((total, [0]) for total in self.TOTALS)
+		for performance in performances:
+			values = dict((total, 0) for total in self.TOTALS)
+			for index, total in enumerate(('wins', 'seconds', 'thirds', 'fourths'), 1):
+				if performance['result'] == index:
+					values[total] = 1
+			if performance['runner_prize_money'] is not None:
+				values['prize_money'] = performance['runner_prize_money']
+				values['prize_money_count'] = 1
+			if performance['starting_price'] is not None:
+				values['starting_price'] = performance['starting_price']
+				values['starting_price_count'] = 1
+				if performance['result'] == 1:
+					values['winning_starting_price'] = performance['starting_price']
+					values['winning_starting_price_count'] = 1
+			momentum = performance.momentum
+			if momentum is not None:
+				values['momentum'] = momentum
+				values['momentum_count'] = 1
+			for total in self.TOTALS:
+				self.totals[total].append(self.totals[total][-1] + values[total])
+
+	def get_statistics(self, date_from=None, date_to=None):
+		"""Return a dictionary of statistics for performances occurring on or after date_from and before date_to
+
+		If date_from or date_to is None, the range is unbounded in that direction.
+		"""
+
+		start = 0
+		if date_from is not None:
+			start = bisect_left(self.dates, date_from)
+
+		end = len(self.dates)
+		if date_to is not None:
+			end = bisect_left(self.dates, date_to)
+
+		return self.calculate_statistics(start, max(start, end))
+
+	def get_statistics_as_of(self, date):
+		"""Return a dictionary of statistics for all performances occurring before the specified date"""
+
+		return self.get_statistics(date_to=date)
+
+	def get_statistics_for_last(self, starts, date=None):
+		"""Return a dictionary of statistics for the specified number of most recent performances occurring before the specified date"""
+
+		end = len(self.dates)
+		if date is not None:
+			end = bisect_left(self.dates, date)
+
+		return self.calculate_statistics(max(0, end - starts), end)
+
+	def calculate_statistics(self, start, end):
+		"""Return a dictionary of statistics for the performances between the specified positions in date order"""
+
+		totals = dict((total, self.totals[total][end] - self.totals[total][start]) for total in self.TOTALS)
+		starts = end - start
+
+		def calculate_percentage(value):
+			if value is not None and starts > 0:
+				return value / starts
+
+		statistics = {
+			'starts':	starts,
+			'wins':		totals['wins'],
+			'seconds':	totals['seconds'],
+			'thirds':	totals['thirds'],
+			'fourths':	totals['fourths'],
+			'places':	totals['wins'] + totals['seconds'] + totals['thirds']
+			}
+
+		for statistic in ('win', 'second', 'third', 'fourth', 'place'):
+			statistics[statistic + '_pct'] = calculate_percentage(statistics[statistic + 's'])
+
+		statistics['total_prize_money'] = totals['prize_money'] if totals['prize_money_count'] > 0 else None
+		statistics['average_prize_money'] = calculate_percentage(statistics['total_prize_money'])
+		statistics['average_starting_price'] = calculate_percentage(totals['starting_price']) if totals['starting_price_count'] > 0 else None
+		statistics['roi'] = calculate_percentage(totals['winning_starting_price'] - starts) if totals['winning_starting_price_count'] > 0 else None
+		statistics['average_momentum'] = calculate_percentage(totals['momentum']) if totals['momentum_count'] > 0 else None
+
+		return statistics
@@ -0,0 +1,125 @@
+import atexit
+import logging
+import queue
+import threading
+
+from jtgpy.events import EventManager
+
+
+class EventDispatcher:
+	"""An EventDispatcher publishes events to synchronous subscribers immediately and to asynchronous subscribers from a background thread
+
+	Synchronous subscribers are managed by a jtgpy EventManager exactly as before, so handlers such as cascading deletes run before publish_event returns.
+	Asynchronous subscribers are called from a single background thread in the order events were published. Batch subscribers receive a list of entities instead of a single entity, delivered when batch_size entities have accumulated, when no events have been published for flush_interval seconds, or when flush is called.
+	Events are queued with references to the published entities rather than copies, so asynchronous subscribers see each entity's state at the time the event is delivered, which may include changes made after the event was published.
+	"""
+
+	def __init__(self, batch_size=100, flush_interval=1.0):
+		"""Initialize instance dependencies"""
+
+		self.batch_size = batch_size
+		self.flush_interval = flush_interval
+
+		self.event_manager = EventManager()
+		self.asynchronous_subscribers = {}
+
+		self.queue = queue.Queue()
+		self.pending_batches = {}
+		self.thread = None
+		self.lock = threading.Lock()
+		self.exceptions = []
+
+	def add_subscriber(self, event, handler, asynchronous=False, batch=False):
+		"""Add handler to the list of subscribers to event
+
+		If asynchronous is True, handler will be called from a background thread with the entity as it is when the event is delivered (not as it was when the event was published). If batch is also True, handler will be called with a list of entities rather than a single entity.
+		"""
+
+		if batch and not asynchronous:
+			raise ValueError('Batch subscribers must be asynchronous')
+
+		if asynchronous:
+			with self.lock:
+				if event not in self.asynchronous_subscribers:
+					self.asynchronous_subscribers[event] = []
+				self.asynchronous_subscribers[event].append((handler, batch))
+		else:
+			self.event_manager.add_subscriber(event, handler)
+
+	def flush(self):
+		"""Block until all published events have been delivered to asynchronous subscribers, including any partial batches
+
+		If any asynchronous subscribers raised exceptions since the last flush, the first of them is raised here. Every exception is also logged when it is raised by the subscriber, so later exceptions are never lost.
+		"""
+
+		if self.thread is not None and self.thread.is_alive():
+			flushed = threading.Event()
+			self.queue.put(flushed)
+			flushed.wait()
+
+		with self.lock:
+			exceptions = self.exceptions
+			self.exceptions = []
+		if len(exceptions) > 0:
+			raise exceptions[0]
+
+	def publish_event(self, event, args=None):
+		"""Publish event to all synchronous subscribers, and queue it for all asynchronous subscribers"""
+
+		self.event_manager.publish_event(event, args)
+
+		if event in self.asynchronous_subscribers:
+			self.start()
+			self.queue.put((event, list(args) if args is not None else []))
+
+	def start(self):
+		"""Start the background delivery thread if it is not already running"""
+
+		with self.lock:
+			if self.thread is None or not self.thread.is_alive():
+				self.thread = threading.Thread(target=self.run, name='pyracing-events', daemon=True)
+				self.thread.start()
+				atexit.register(self.flush)
+
+	def run(self):
+		"""Deliver queued events to asynchronous subscribers until the process exits"""
+
+		while True:
+			try:
+				item = self.queue.get(timeout=self.flush_interval)
+			except queue.Empty:
+				self.deliver_batches()
+				continue
+
+			if isinstance(item, threading.Event):
+				self.deliver_batches()
+				item.set()
+			else:
+				event, args = item
+				for handler, batch in list(self.asynchronous_subscribers.get(event, [])):
+					if batch:
+						key = (event, handler)
+						if key not in self.pending_batches:
+							self.pending_batches[key] = []
+						self.pending_batches[key].extend(args)
+						if len(self.pending_batches[key]) >= self.batch_size:
+							self.deliver(handler, [self.pending_batches.pop(key)])
+					else:
+						self.deliver(handler, args)
+
+	def deliver(self, handler, args):
+		"""Call handler with args, logging any exception and recording it for the next flush"""
+
+		try:
+			handler(*args)
+		except Exception as e:
+			logging.getLogger(__name__).exception('Asynchronous event subscriber %r raised an exception', handler)
+			with self.lock:
+				self.exceptions.append(e)
+
+	def deliver_batches(self):
+		"""Deliver all pending partial batches"""
+
+		for (event, handler), entities in list(self.pending_batches.items()):
+			del self.pending_batches[(event, handler)]
+			self.deliver(handler, [entities])
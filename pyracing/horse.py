@@ -48,6 +48,49 @@ class Horse(Entity):
 
 		return 'horse {name}'.format(name=self['name'])
 
+	def get_performance_indices_by_up(self, rest_period):
+		"""Return a dictionary mapping each UP number to the indices of the horse's performances run at that UP number (see get_preparations)"""
+
+		key = ('performance_indices_by_up', rest_period)
+		if not key in self.cache:
+			indices_by_up = {}
+			for index, (preparation, up) in enumerate(self.get_preparations(rest_period)):
+				if up not in indices_by_up:
+					indices_by_up[up] = []
+				indices_by_up[up].append(index)
+			self.cache[key] = indices_by_up
+		return self.cache[key]
+
+	def get_performance_by_track_and_date(self, track, date):
+		"""Return the horse's performance at the specified track on the specified date if available"""
+
+		if not 'performances_by_track_and_date' in self.cache:
+			self.cache['performances_by_track_and_date'] = dict(((performance['track'], performance['date']), performance) for performance in reversed(self.performances))
+		return self.cache['performances_by_track_and_date'].get((track, date))
+
+	def get_preparations(self, rest_period):
+		"""Return a list of (preparation number, UP number) tuples corresponding to each of the horse's performances
+
+		A new preparation begins whenever the horse has not run for rest_period or more. Preparations are numbered from 1 for the horse's earliest performance, and UP numbers are numbered from 1 for the first performance in each preparation.
+		"""
+
+		key = ('preparations', rest_period)
+		if not key in self.cache:
+			preparations = [None] * len(self.performances)
+			preparation = 0
+			up = 0
+			previous_date = None
+			for index in range(len(self.performances) - 1, -1, -1):
+				if previous_date is None or (self.performances[index]['date'] - previous_date) >= rest_period:
+					preparation += 1
+					up = 1
+				else:
+					up += 1
+				preparations[index] = (preparation, up)
+				previous_date = self.performances[index]['date']
+			self.cache[key] = preparations
+		return self.cache[key]
+
 	@property
 	def performances(self):
 		"""Return a list of performances involving this horse"""
@@ -4,6 +4,17 @@ from .common import Entity
 class Jockey(Entity):
 	"""A jockey represents the human riding a runner"""
 
+	cumulative_statistics_cache = {}
+
+	@classmethod
+	def clear_cumulative_statistics(cls, url=None):
+		"""Discard the shared cumulative statistics for the jockey with the specified profile URL, or for all jockeys if url is None"""
+
+		if url is None:
+			cls.cumulative_statistics_cache.clear()
+		else:
+			cls.cumulative_statistics_cache.pop(url, None)
+
 	@classmethod
 	def get_jockey_by_id(cls, id):
 		"""Get the single jockey with the specified database ID"""
@@ -39,6 +50,17 @@ class Jockey(Entity):
 	def initialize(cls):
 		"""Initialize class dependencies"""
 
+		def handle_changed_jockey(jockey):
+			cls.clear_cumulative_statistics(jockey['url'])
+
+		def handle_changed_performance(performance):
+			if 'jockey_url' in performance and performance['jockey_url'] is not None:
+				cls.clear_cumulative_statistics(performance['jockey_url'])
+
+		cls.event_manager.add_subscriber('deleted_jockey', handle_changed_jockey)
+		for event in ('saved_performance', 'deleted_performance'):
+			cls.event_manager.add_subscriber(event, handle_changed_performance)
+
 		cls.create_index([('url', 1)])
 		cls.create_index([('url', 1), ('scraped_at', 1)])
 
@@ -46,6 +68,19 @@ class Jockey(Entity):
 
 		return 'jockey {name}'.format(name=self['name'])
 
+	@property
+	def cumulative_statistics(self):
+		"""Return CumulativeStatistics for all of this jockey's performances
+
+		The statistics are shared by all Jockey objects with the same profile URL (read at the same as-of date) until one of the jockey's performances is saved or deleted.
+		Only the statistics for the most recently requested as-of date are kept for each profile URL, so stepping the as-of date through a range of dates never keeps more than one CumulativeStatistics object per jockey.
+		"""
+
+		as_of = self.get_as_of()
+		if not self['url'] in self.cumulative_statistics_cache or self.cumulative_statistics_cache[self['url']][0] != as_of:
+			self.cumulative_statistics_cache[self['url']] = (as_of, CumulativeStatistics(self.performances))
+		return self.cumulative_statistics_cache[self['url']][1]
+
 	@property
 	def performances(self):
 		"""Return a list of performances involving this jockey"""
@@ -55,4 +90,5 @@ class Jockey(Entity):
 		return self.cache['performances']
 
 
+from .cumulative_statistics import CumulativeStatistics
 from .performance import Performance
\ No newline at end of file
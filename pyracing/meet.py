@@ -23,6 +23,18 @@ class Meet(Entity):
 			expiry_date=date
 			), key=lambda meet: meet['track'])
 
+	@classmethod
+	def get_meets_between(cls, date_from, date_to):
+		"""Get a list of meets occurring between date_from and date_to (inclusive) with their races and runners preloaded
+
+		Meets, races and runners are each loaded from the database with a single query, and the races, runners and meet caches of the resulting objects are populated in memory.
+		Only data already stored in the database is loaded - meets, races or runners that have not yet been scraped will be scraped on first access via the usual properties.
+		"""
+
+		meets = cls.find({'date': {'$gte': date_from, '$lte': date_to}}, sort=[('date', 1), ('track', 1)])
+		Runner.get_runners_by_races(Race.get_races_by_meets(meets))
+		return meets
+
 	@classmethod
 	def initialize(cls):
 		"""Initialize class dependencies"""
@@ -44,3 +56,4 @@ class Meet(Entity):
 
 
 from .race import Race
+from .runner import Runner
@@ -0,0 +1,344 @@
+from itertools import count
+import threading
+
+
+class MemoryDatabase(dict):
+	"""A MemoryDatabase is an in-process substitute for a pymongo database, holding each collection in a MemoryCollection
+
+	MemoryDatabase supports the subset of the pymongo API used by pyracing, so it can be passed to pyracing.initialize in place of a pymongo database to run tests, backfills and benchmarks without a database server.
+	"""
+
+	def __init__(self):
+		"""Initialize instance dependencies"""
+		super().__init__()
+
+		self.ids = count(1)
+		self.lock = threading.Lock()
+
+	def __missing__(self, name):
+
+		with self.lock:
+			if not name in self:
+				super().__setitem__(name, MemoryCollection(name, self))
+			return super().__getitem__(name)
+
+	def get_collection(self, name):
+		"""Get the collection with the specified name, creating it if necessary"""
+
+		return self[name]
+
+	def generate_id(self):
+		"""Generate a new unique database ID"""
+
+		with self.lock:
+			return next(self.ids)
+
+
+class MemoryCollection:
+	"""A MemoryCollection holds the documents for a single collection in a MemoryDatabase
+
+	Documents are stored keyed by _id. Filters support equality and the $in, $ne, $lt, $lte, $gt and $gte operators on top-level keys, and updates support $set and $unset.
+	Indexes created via create_index are maintained as hash indexes on their first key, and are used to narrow equality and $in filters on that key.
+	Nested lists and dictionaries are copied when documents are written and read, so changes to returned documents never affect the stored documents (or vice versa).
+	"""
+
+	def __init__(self, name, database):
+		"""Initialize instance dependencies"""
+
+		self.name = name
+		self.database = database
+
+		self.documents = {}
+		self.indexes = {}
+		self.lock = threading.RLock()
+
+	def create_index(self, index, **kwargs):
+		"""Create a hash index on the first key of the specified index specification"""
+
+		if isinstance(index, str):
+			key = index
+		else:
+			key = index[0][0]
+
+		with self.lock:
+			if not key in self.indexes:
+				self.indexes[key] = {}
+				for document in self.documents.values():
+					self.add_to_index(key, document)
+
+		return '_'.join('{key}_{direction}'.format(key=key, direction=direction) for key, direction in ([(index, 1)] if isinstance(index, str) else index))
+
+	def delete_many(self, filter):
+		"""Delete all documents matching filter"""
+
+		with self.lock:
+			documents = list(self.find_documents(filter))
+			for document in documents:
+				self.remove_document(document)
+
+		return MemoryResult(deleted_count=len(documents))
+
+	def delete_one(self, filter):
+		"""Delete the first document matching filter"""
+
+		with self.lock:
+			for document in self.find_documents(filter):
+				self.remove_document(document)
+				return MemoryResult(deleted_count=1)
+
+		return MemoryResult(deleted_count=0)
+
+	def find(self, filter=None, sort=None):
+		"""Get a cursor over the documents matching filter"""
+
+		cursor = MemoryCursor(self, filter)
+		if sort is not None:
+			cursor = cursor.sort(sort)
+		return cursor
+
+	def find_one(self, filter=None):
+		"""Get a copy of the first document matching filter, or None if there are no matching documents"""
+
+		with self.lock:
+			for document in self.find_documents(filter):
+				return copy_document(document)
+
+	def insert_one(self, document):
+		"""Insert a copy of document, adding a new _id to document if it does not already have one"""
+
+		if not '_id' in document:
+			document['_id'] = self.database.generate_id()
+
+		with self.lock:
+			if document['_id'] in self.documents:
+				raise ValueError('Duplicate _id: {id}'.format(id=document['_id']))
+			self.add_document(copy_document(document))
+
+		return MemoryResult(inserted_id=document['_id'])
+
+	def replace_one(self, filter, replacement, upsert=False):
+		"""Replace the first document matching filter with a copy of replacement"""
+
+		with self.lock:
+			for document in self.find_documents(filter):
+				replacement = copy_document(replacement)
+				replacement['_id'] = document['_id']
+				self.remove_document(document)
+				self.add_document(replacement)
+				return MemoryResult(matched_count=1, modified_count=1)
+
+			if upsert:
+				self.insert_one(copy_document(replacement))
+
+		return MemoryResult(matched_count=0, modified_count=0)
+
+	def update_many(self, filter, update):
+		"""Apply the $set and $unset operators in update to all documents matching filter"""
+
+		with self.lock:
+			documents = list(self.find_documents(filter))
+			for document in documents:
+				self.update_document(document, update)
+
+		return MemoryResult(matched_count=len(documents), modified_count=len(documents))
+
+	def update_one(self, filter, update):
+		"""Apply the $set and $unset operators in update to the first document matching filter"""
+
+		with self.lock:
+			for document in self.find_documents(filter):
+				self.update_document(document, update)
+				return MemoryResult(matched_count=1, modified_count=1)
+
+		return MemoryResult(matched_count=0, modified_count=0)
+
+	def with_options(self, **kwargs):
+		"""Return this collection, as read preferences and write concerns have no meaning in memory"""
+
+		return self
+
+	def add_document(self, document):
+		"""Store document and add it to all indexes"""
+
+		self.documents[document['_id']] = document
+		for key in self.indexes:
+			self.add_to_index(key, document)
+
+	def add_to_index(self, key, document):
+		"""Add document to the index on the specified key"""
+
+		try:
+			self.indexes[key].setdefault(document.get(key), set()).add(document['_id'])
+		except TypeError:
+			self.indexes[key].setdefault(None, set()).add(document['_id'])
+
+	def find_documents(self, filter):
+		"""Generate the stored documents matching filter
+
+		As with MongoDB, the order of the generated documents is unspecified unless the results are sorted by a cursor.
+		"""
+
+		filter = filter or {}
+
+		candidate_ids = None
+		for key, condition in filter.items():
+			if key in self.indexes:
+				values = None
+				if isinstance(condition, dict) and len(condition) == 1 and '$in' in condition:
+					values = condition['$in']
+				elif not isinstance(condition, (dict, list)):
+					values = [condition]
+				if values is not None:
+					try:
+						ids = set()
+						for value in values:
+							ids.update(self.indexes[key].get(value, ()))
+						ids.update(self.indexes[key].get(None, ()))
+					except TypeError:
+						continue
+					candidate_ids = ids if candidate_ids is None else candidate_ids & ids
+
+		if candidate_ids is None:
+			documents = list(self.documents.values())
+		else:
+			documents = [self.documents[id] for id in candidate_ids if id in self.documents]
+
+		for document in documents:
+			if matches(document, filter):
+				yield document
+
+	def remove_document(self, document):
+		"""Remove document from storage and all indexes"""
+
+		del self.documents[document['_id']]
+		for key in self.indexes:
+			self.remove_from_index(key, document)
+
+	def remove_from_index(self, key, document):
+		"""Remove document from the index on the specified key"""
+
+		try:
+			ids = self.indexes[key].get(document.get(key))
+		except TypeError:
+			ids = self.indexes[key].get(None)
+		if ids is not None:
+			ids.discard(document['_id'])
+
+	def update_document(self, document, update):
+		"""Apply the $set and $unset operators in update to the stored document"""
+
+		updated = dict(document)
+		for key, value in update.get('$set', {}).items():
+			updated[key] = copy_value(value)
+		for key in update.get('$unset', {}):
+			updated.pop(key, None)
+
+		self.remove_document(document)
+		self.add_document(updated)
+
+
+class MemoryCursor:
+	"""A MemoryCursor iterates over copies of the documents in a MemoryCollection matching a filter"""
+
+	def __init__(self, collection, filter):
+		"""Initialize instance dependencies"""
+
+		self.collection = collection
+		self.filter = filter
+		self.sort_keys = []
+		self.limit_count = 0
+
+	def __iter__(self):
+
+		with self.collection.lock:
+			documents = list(self.collection.find_documents(self.filter))
+
+		for key, direction in reversed(self.sort_keys):
+			documents.sort(key=lambda document: sort_value(document.get(key)), reverse=direction < 0)
+
+		if self.limit_count > 0:
+			documents = documents[:self.limit_count]
+
+		for document in documents:
+			yield copy_document(document)
+
+	def batch_size(self, batch_size):
+		"""Return this cursor, as documents are not fetched in batches from memory"""
+
+		return self
+
+	def limit(self, limit):
+		"""Limit the number of documents returned by this cursor"""
+
+		self.limit_count = limit
+		return self
+
+	def sort(self, key, direction=1):
+		"""Sort the documents returned by this cursor by a list of (key, direction) tuples, or by a single key and direction"""
+
+		if isinstance(key, str):
+			self.sort_keys = [(key, direction)]
+		else:
+			self.sort_keys = list(key)
+		return self
+
+
+class MemoryResult:
+	"""A MemoryResult holds the result of a write operation on a MemoryCollection"""
+
+	def __init__(self, **kwargs):
+		"""Initialize instance dependencies"""
+
+		self.__dict__.update(kwargs)
+
+
+OPERATORS = {
+	'$gt':	lambda value, operand: value is not None and value > operand,
+	'$gte':	lambda value, operand: value is not None and value >= operand,
+	'$in':	lambda value, operand: value in operand,
+	'$lt':	lambda value, operand: value is not None and value < operand,
+	'$lte':	lambda value, operand: value is not None and value <= operand,
+	'$ne':	lambda value, operand: value != operand
+	}
+
+
+def copy_document(document):
+	"""Return a copy of document in which nested lists and dictionaries are also copied"""
+
+	return dict((key, copy_value(value)) for key, value in document.items())
+
+
+def copy_value(value):
+	"""Return a copy of value if it is a list or dictionary, or value itself otherwise"""
+
+	if isinstance(value, dict):
+		return copy_document(value)
+	elif isinstance(value, list):
+		return [copy_value(item) for item in value]
+	else:
+		return value
+
+
+def matches(document, filter):
+	"""Return True if document matches all conditions in filter"""
+
+	for key, condition in filter.items():
+		value = document.get(key)
+		if isinstance(condition, dict) and len(condition) > 0 and all(operator.startswith('$') for operator in condition):
+			for operator, operand in condition.items():
+				if not operator in OPERATORS:
+					raise ValueError('Unsupported query operator: {operator}'.format(operator=operator))
+				try:
+					if not OPERATORS[operator](value, operand):
+						return False
+				except TypeError:
+					return False
+		elif value != condition:
+			return False
+	return True
+
+
+def sort_value(value):
+	"""Return a key for sorting value in which None sorts before all other values"""
+
+	return (value is not None, value if value is not None else 0)
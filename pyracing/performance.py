@@ -6,7 +6,49 @@ from .common import Entity
 class Performance(Entity):
 	"""A performance represents a the result of a past run for a horse and jockey"""
 
+	DERIVED_VALUES = ('actual_distance', 'actual_weight', 'momentum', 'speed', 'track_condition_category')
 	METRES_PER_LENGTH = 2.4
+	TRACK_CONDITIONS = ('firm', 'good', 'heavy', 'soft', 'synthetic')
+
+	store = None
+
+	@classmethod
+	def calculate_actual_distance(cls, distance, lengths):
+		"""Return the actual distance run in the winning time by a horse beaten by lengths over distance, or None if either is unknown"""
+
+		if distance is not None and lengths is not None:
+			return distance - (lengths * cls.METRES_PER_LENGTH)
+
+	@classmethod
+	def calculate_actual_weight(cls, carried):
+		"""Return the weight carried plus the average weight of a racehorse, or None if the weight carried is unknown"""
+
+		if carried is not None:
+			return carried + Horse.AVERAGE_WEIGHT
+
+	@classmethod
+	def calculate_momentum(cls, actual_weight, speed):
+		"""Return the momentum of a horse with the specified actual weight and speed, or None if either is unknown"""
+
+		if actual_weight is not None and speed is not None:
+			return actual_weight * speed
+
+	@classmethod
+	def calculate_speed(cls, actual_distance, winning_time):
+		"""Return the average speed of a horse running actual_distance in winning_time, or None if either is unknown (or the winning time is not positive)"""
+
+		if actual_distance is not None and winning_time is not None and winning_time > 0:
+			return actual_distance / winning_time
+
+	@classmethod
+	def categorise_track_condition(cls, track_condition):
+		"""Return the member of TRACK_CONDITIONS that the specified track condition description belongs to, or None if it matches none of them"""
+
+		if track_condition is not None:
+			track_condition = track_condition.upper()
+			for category in cls.TRACK_CONDITIONS:
+				if track_condition.startswith(category.upper()):
+					return category
 
 	@classmethod
 	def get_performance_by_id(cls, id):
@@ -15,8 +57,16 @@ class Performance(Entity):
 		return cls.find_one({'_id': id})
 
 	@classmethod
-	def get_performances_by_horse(cls, horse):
-		"""Get a list of performances for the specified horse"""
+	def get_performances_by_horse(cls, horse, use_store=True):
+		"""Get a list of performances for the specified horse
+
+		If use_store is True and a PerformanceStore has been configured that contains the horse's current performances (see PerformanceStore.get_performances_by_horse), a read-only sequence of CompactPerformance objects is read from the store instead of the database (except within an as_of context).
+		"""
+
+		if use_store and cls.store is not None and cls.get_as_of() is None:
+			performances = cls.store.get_performances_by_horse(horse)
+			if performances is not None:
+				return performances
 
 		return sorted(cls.find_or_scrape(
 			filter={'horse_url': horse['url']},
@@ -26,22 +76,70 @@ class Performance(Entity):
 
 	@classmethod
 	def get_performances_by_jockey(cls, jockey):
-		"""Get a list of performances for the specified jockey"""
+		"""Get a list of performances for the specified jockey
+
+		If a PerformanceStore has been configured and contains the jockey, a read-only sequence of CompactPerformance objects is read from the store instead of the database (except within an as_of context). Performances stored since the store was built are not included.
+		"""
+
+		if cls.store is not None and cls.get_as_of() is None:
+			performances = cls.store.get_performances_by_jockey(jockey)
+			if performances is not None:
+				return performances
 
 		return sorted(cls.find({'jockey_url': jockey['url']}), key=lambda performance: performance['date'], reverse=True)
 
+	@classmethod
+	def iter_performances_between(cls, date_from, date_to, batch_size=None):
+		"""Get a generator yielding all performances occurring between date_from and date_to (inclusive) in date order from the database"""
+
+		return cls.iter_find({'date': {'$gte': date_from, '$lte': date_to}}, sort=[('date', 1)], batch_size=batch_size)
+
+	@classmethod
+	def iter_performances_by_jockey(cls, jockey, batch_size=None):
+		"""Get a generator yielding the performances for the specified jockey in descending date order from the database"""
+
+		return cls.iter_find({'jockey_url': jockey['url']}, sort=[('date', -1)], batch_size=batch_size)
+
 	@classmethod
 	def initialize(cls):
 		"""Initialize class dependencies"""
 
 		def handle_deleting_horse(horse):
-			for performance in horse.performances:
+			for performance in cls.find({'horse_url': horse['url']}):
 				performance.delete()
 
 		cls.event_manager.add_subscriber('deleting_horse', handle_deleting_horse)
 
+		def handle_superseding_horse(horse):
+			for performance in cls.find({'horse_url': horse['url']}):
+				performance.supersede()
+
+		cls.event_manager.add_subscriber('superseding_horse', handle_superseding_horse)
+
+		def handle_saving_performance(performance):
+			if performance.get('_id') is None or 'track_condition' in performance.changed_keys:
+				track_condition_category = performance.track_condition_category
+				if performance.get('track_condition_category') != track_condition_category:
+					performance['track_condition_category'] = track_condition_category
+
+		cls.event_manager.add_subscriber('saving_performance', handle_saving_performance)
+
 		cls.create_index([('horse_url', 1)])
 		cls.create_index([('horse_url', 1), ('scraped_at', 1)])
+		cls.create_index([('jockey_url', 1), ('date', -1)])
+		cls.create_index([('date', 1)])
+
+	def __delitem__(self, key):
+		"""Delete the value for key and discard any derived values calculated from it"""
+
+		super().__delitem__(key)
+		self.clear_derived_values()
+
+	def __setitem__(self, key, value):
+		"""Set the value for key and discard any derived values calculated from it"""
+
+		super().__setitem__(key, value)
+		self.clear_derived_values()
 
 	def __str__(self):
 
@@ -51,15 +149,17 @@ class Performance(Entity):
 	def actual_distance(self):
 		"""Return the actual distance run by the horse in the winning time"""
 
-		if 'distance' in self and self['distance'] is not None and 'lengths' in self and self['lengths'] is not None:
-			return self['distance'] - (self['lengths'] * self.METRES_PER_LENGTH)
+		if not 'actual_distance' in self.cache:
+			self.cache['actual_distance'] = self.calculate_actual_distance(self.get('distance'), self.get('lengths'))
+		return self.cache['actual_distance']
 
 	@property
 	def actual_weight(self):
 		"""Return the weight carried by the horse plus the average weight of a racehorse"""
 
-		if 'carried' in self and self['carried'] is not None:
-			return self['carried'] + Horse.AVERAGE_WEIGHT
+		if not 'actual_weight' in self.cache:
+			self.cache['actual_weight'] = self.calculate_actual_weight(self.get('carried'))
+		return self.cache['actual_weight']
 
 	@property
 	def horse(self):
@@ -81,15 +181,39 @@ class Performance(Entity):
 	def momentum(self):
 		"""Return the average momentum achieved by the horse during this performance"""
 
-		if self.actual_weight is not None and self.speed is not None:
-			return self.actual_weight * self.speed
+		if not 'momentum' in self.cache:
+			self.cache['momentum'] = self.calculate_momentum(self.actual_weight, self.speed)
+		return self.cache['momentum']
 
 	@property
 	def speed(self):
 		"""Return the average speed run by the horse during this performance"""
 
-		if self.actual_distance is not None and 'winning_time' in self and self['winning_time'] is not None and self['winning_time'] > 0:
-			return self.actual_distance / self['winning_time']
+		if not 'speed' in self.cache:
+			self.cache['speed'] = self.calculate_speed(self.actual_distance, self.get('winning_time'))
+		return self.cache['speed']
+
+	@property
+	def track_condition_category(self):
+		"""Return the normalised track condition (one of TRACK_CONDITIONS) for this performance
+
+		The category is stored with the performance when it is first saved or its track condition is changed, so it is only calculated here for performances saved before it was stored or whose track condition has changed since they were saved.
+		"""
+
+		if not 'track_condition_category' in self.cache:
+			if self.get('track_condition_category') is not None and not 'track_condition' in self.changed_keys:
+				self.cache['track_condition_category'] = self['track_condition_category']
+			else:
+				self.cache['track_condition_category'] = self.categorise_track_condition(self.get('track_condition'))
+		return self.cache['track_condition_category']
+
+	def clear_derived_values(self):
+		"""Discard the memoised DERIVED_VALUES so they are recalculated on next access"""
+
+		cache = getattr(self, 'cache', None)
+		if cache is not None:
+			for key in self.DERIVED_VALUES:
+				cache.pop(key, None)
 
 
 from .horse import Horse
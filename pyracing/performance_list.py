@@ -1,21 +1,77 @@
+from bisect import bisect_left, bisect_right
+
+
 class PerformanceList(list):
 	"""A PerformanceList represents a filtered list of performances decorated with statistical calculations"""
 
-	def __init__(self, *args, **kwargs):
-		"""Create PerformanceList and ensure it is sorted by date in descending order"""
-		super().__init__(*args, **kwargs)
+	STATISTICS = (
+		'average_momentum',
+		'average_prize_money',
+		'average_starting_price',
+		'fourths',
+		'fourth_pct',
+		'maximum_momentum',
+		'minimum_momentum',
+		'places',
+		'place_pct',
+		'roi',
+		'seconds',
+		'second_pct',
+		'starts',
+		'thirds',
+		'third_pct',
+		'total_prize_money',
+		'wins',
+		'win_pct'
+		)
+
+	def __init__(self, *args, presorted=False):
+		"""Create PerformanceList and ensure it is sorted by date in descending order
+
+		If presorted is True, the performances must already be sorted by date in descending order and will not be sorted again.
+		"""
+		super().__init__(*args)
 
-		self.sort(key=lambda performance: performance['date'], reverse=True)
+		self.cache = {}
+
+		if not presorted:
+			self.sort(key=lambda performance: performance['date'], reverse=True)
 
 		self.calculate_average = self.calculate_percentage
 
+	def __delitem__(self, key):
+
+		super().__delitem__(key)
+		self.cache = {}
+
+	def __getitem__(self, key):
+
+		if isinstance(key, slice) and (key.step is None or key.step > 0):
+			return PerformanceList(super().__getitem__(key), presorted=True)
+		return super().__getitem__(key)
+
+	def __iadd__(self, other):
+
+		self.cache = {}
+		return super().__iadd__(other)
+
+	def __reduce__(self):
+		"""Pickle only the performances, discarding the cache"""
+
+		return self.__class__, (list(self),)
+
+	def __setitem__(self, key, value):
+
+		super().__setitem__(key, value)
+		self.cache = {}
+
 	@property
 	def average_momentum(self):
 		"""Return the average momentum per start in this performance list"""
 
-		momentums = self.get_momentums()
-		if len(momentums) > 0:
-			return self.calculate_average(sum(momentums))
+		aggregates = self.get_aggregates()
+		if aggregates['momentum_count'] > 0:
+			return self.calculate_average(aggregates['momentum'])
 
 	@property
 	def average_prize_money(self):
@@ -27,9 +83,17 @@ class PerformanceList(list):
 	def average_starting_price(self):
 		"""Return the average starting price per start in this performance list"""
 
-		starting_prices = [performance['starting_price'] for performance in self if performance['starting_price'] is not None]
-		if len(starting_prices) > 0:
-			return self.calculate_average(sum(starting_prices))
+		aggregates = self.get_aggregates()
+		if aggregates['starting_price_count'] > 0:
+			return self.calculate_average(aggregates['starting_price'])
+
+	@property
+	def cumulative_statistics(self):
+		"""Return CumulativeStatistics for the performances in this list"""
+
+		if not 'cumulative_statistics' in self.cache:
+			self.cache['cumulative_statistics'] = CumulativeStatistics(self)
+		return self.cache['cumulative_statistics']
 
 	@property
 	def fourths(self):
@@ -47,17 +111,13 @@ class PerformanceList(list):
 	def maximum_momentum(self):
 		"""Return the maximum momentum achieved for any performance in this list"""
 
-		momentums = self.get_momentums()
-		if len(momentums) > 0:
-			return max(momentums)
+		return self.get_aggregates()['maximum_momentum']
 
 	@property
 	def minimum_momentum(self):
 		"""Return the minimum momentum achieved for any performance in this list"""
 
-		momentums = self.get_momentums()
-		if len(momentums) > 0:
-			return min(momentums)
+		return self.get_aggregates()['minimum_momentum']
 
 	@property
 	def places(self):
@@ -76,9 +136,9 @@ class PerformanceList(list):
 	def roi(self):
 		"""Return the total starting price for winning performances less the total number of performances in the list, expressed as a percentage of the number of starts"""
 
-		winning_starting_prices = [performance['starting_price'] for performance in self if performance['result'] == 1 and performance['starting_price'] is not None]
-		if len(winning_starting_prices) > 0:
-			return self.calculate_percentage(sum(winning_starting_prices) - self.starts)
+		aggregates = self.get_aggregates()
+		if aggregates['winning_starting_price_count'] > 0:
+			return self.calculate_percentage(aggregates['winning_starting_price'] - self.starts)
 
 	@property
 	def seconds(self):
@@ -114,9 +174,9 @@ class PerformanceList(list):
 	def total_prize_money(self):
 		"""Return the total prize money earned in this performance list"""
 
-		runner_prize_monies = [performance['runner_prize_money'] for performance in self if performance['runner_prize_money'] is not None]
-		if len(runner_prize_monies) > 0:
-			return sum(runner_prize_monies)
+		aggregates = self.get_aggregates()
+		if aggregates['prize_money_count'] > 0:
+			return aggregates['prize_money']
 
 	@property
 	def wins(self):
@@ -130,6 +190,30 @@ class PerformanceList(list):
 
 		return self.calculate_percentage(self.wins)
 
+	def add(self, performance):
+		"""Insert the specified performance into this list at the correct position by date, updating running aggregates incrementally"""
+
+		low = 0
+		high = len(self)
+		while low < high:
+			middle = (low + high) // 2
+			if self[middle]['date'] < performance['date']:
+				high = middle
+			else:
+				low = middle + 1
+
+		aggregates = self.cache.get('aggregates')
+		super().insert(low, performance)
+		self.cache = {}
+		if aggregates is not None:
+			self.update_aggregates(aggregates, performance)
+			self.cache['aggregates'] = aggregates
+
+	def append(self, performance):
+
+		super().append(performance)
+		self.cache = {}
+
 	def calculate_percentage(self, value, divide_by_zero=None):
 		"""Return the specified value expressed as a percentage of the number of starts
 
@@ -142,12 +226,203 @@ class PerformanceList(list):
 			else:
 				return divide_by_zero
 
+	def clear(self):
+
+		super().clear()
+		self.cache = {}
+
 	def count_results(self, result):
 		"""Return the number of performances in this list with the specified result"""
 
-		return len([performance for performance in self if performance['result'] == result])
+		return self.get_aggregates()['results'].get(result, 0)
+
+	def extend(self, performances):
+
+		super().extend(performances)
+		self.cache = {}
+
+	def filter(self, predicate):
+		"""Return a PerformanceList containing the performances in this list for which predicate(performance) is True, without sorting them again"""
+
+		return PerformanceList([performance for performance in self if predicate(performance)], presorted=True)
+
+	def get_aggregates(self):
+		"""Return a dictionary of running totals for the performances in this list, calculated in a single pass"""
+
+		if not 'aggregates' in self.cache:
+			aggregates = {
+				'results':						{},
+				'prize_money':					0,
+				'prize_money_count':			0,
+				'starting_price':				0,
+				'starting_price_count':			0,
+				'winning_starting_price':		0,
+				'winning_starting_price_count':	0,
+				'momentum':						0,
+				'momentum_count':				0,
+				'minimum_momentum':				None,
+				'maximum_momentum':				None
+				}
+			for performance in self:
+				self.update_aggregates(aggregates, performance)
+			self.cache['aggregates'] = aggregates
+		return self.cache['aggregates']
+
+	def get_decayed_statistics(self, half_life, date):
+		"""Return a dictionary of exponentially-decayed statistics for the performances in this list prior to the specified date
+
+		Each performance is weighted by 0.5 ** (age / half_life), where age is the time between the performance and date, and half_life is a timedelta.
+		The resulting dictionary contains the weighted number of starts along with the weighted win_pct, place_pct and average_momentum.
+		"""
+
+		totals = {'starts': 0.0, 'wins': 0.0, 'places': 0.0, 'momentum': 0.0, 'momentum_starts': 0.0}
+		half_life = half_life.total_seconds()
+
+		for performance in self:
+			age = (date - performance['date']).total_seconds()
+			if age > 0:
+				weight = 0.5 ** (age / half_life)
+				totals['starts'] += weight
+				if performance['result'] == 1:
+					totals['wins'] += weight
+				if performance['result'] in (1, 2, 3):
+					totals['places'] += weight
+				momentum = performance.momentum
+				if momentum is not None:
+					totals['momentum'] += weight * momentum
+					totals['momentum_starts'] += weight
+
+		statistics = {'starts': totals['starts'], 'win_pct': None, 'place_pct': None, 'average_momentum': None}
+		if totals['starts'] > 0:
+			statistics['win_pct'] = totals['wins'] / totals['starts']
+			statistics['place_pct'] = totals['places'] / totals['starts']
+		if totals['momentum_starts'] > 0:
+			statistics['average_momentum'] = totals['momentum'] / totals['momentum_starts']
+		return statistics
 
 	def get_momentums(self):
 		"""Return an array containing the momentums for all performances in this list"""
 
-		return [performance.momentum for performance in self if performance.momentum is not None]
\ No newline at end of file
+		return [momentum for momentum in (performance.momentum for performance in self) if momentum is not None]
+
+	def get_distance_positions(self, distance, window):
+		"""Return a sorted list of the positions in this list of performances run within window metres of the specified distance
+
+		The performances are indexed by distance the first time this method is called, so subsequent queries for any distance and window are binary searches.
+		"""
+
+		if not 'distances' in self.cache:
+			index = sorted((performance['distance'], position) for position, performance in enumerate(self) if performance['distance'] is not None)
+			self.cache['distances'] = ([item[0] for item in index], [item[1] for item in index])
+
+		distances, positions = self.cache['distances']
+		return sorted(positions[bisect_left(distances, distance - window):bisect_right(distances, distance + window)])
+
+	def get_performances_at_distance(self, distance, window):
+		"""Return a PerformanceList containing the performances in this list run within window metres of the specified distance"""
+
+		return self.where(distance=distance, distance_within=window).performances
+
+	def get_performances_at_positions(self, positions):
+		"""Return a PerformanceList containing the performances at the specified sorted positions in this list"""
+
+		return PerformanceList([self[position] for position in positions], presorted=True)
+
+	def get_performances_by_track_condition(self, track_condition):
+		"""Return a PerformanceList containing the performances in this list on the specified track condition"""
+
+		return self.where(condition=track_condition).performances
+
+	def get_statistics(self):
+		"""Return a dictionary containing the values of all STATISTICS for this performance list"""
+
+		return dict((statistic, getattr(self, statistic)) for statistic in self.STATISTICS)
+
+	def get_statistics_for_last(self, starts, date=None):
+		"""Return a dictionary of statistics for the specified number of most recent performances in this list prior to date (if specified)
+
+		The statistics are looked up from the list's cumulative_statistics, so windows of any size are calculated without creating a new list.
+		"""
+
+		return self.cumulative_statistics.get_statistics_for_last(starts, date)
+
+	def get_statistics_within(self, period, date):
+		"""Return a dictionary of statistics for the performances in this list occurring within the specified period (a timedelta) prior to date"""
+
+		return self.cumulative_statistics.get_statistics(date - period, date)
+
+	def get_track_condition_buckets(self):
+		"""Return a dictionary mapping each of Performance.TRACK_CONDITIONS to a PerformanceList of the performances in this list on that track condition
+
+		All performances are partitioned into the track condition categories in a single pass the first time this method is called.
+		"""
+
+		if not 'track_conditions' in self.cache:
+			track_conditions = dict((category, []) for category in Performance.TRACK_CONDITIONS)
+			for performance in self:
+				category = performance.track_condition_category
+				if category is not None:
+					track_conditions[category].append(performance)
+			self.cache['track_conditions'] = dict((category, PerformanceList(track_conditions[category], presorted=True)) for category in track_conditions)
+		return self.cache['track_conditions']
+
+	def insert(self, index, performance):
+
+		super().insert(index, performance)
+		self.cache = {}
+
+	def pop(self, *args):
+
+		self.cache = {}
+		return super().pop(*args)
+
+	def remove(self, performance):
+
+		super().remove(performance)
+		self.cache = {}
+
+	def reverse(self):
+
+		super().reverse()
+		self.cache = {}
+
+	def sort(self, *args, **kwargs):
+
+		super().sort(*args, **kwargs)
+		self.cache = {}
+
+	def update_aggregates(self, aggregates, performance):
+		"""Add the specified performance to the running totals in aggregates"""
+
+		result = performance['result']
+		aggregates['results'][result] = aggregates['results'].get(result, 0) + 1
+
+		if performance['runner_prize_money'] is not None:
+			aggregates['prize_money'] += performance['runner_prize_money']
+			aggregates['prize_money_count'] += 1
+
+		if performance['starting_price'] is not None:
+			aggregates['starting_price'] += performance['starting_price']
+			aggregates['starting_price_count'] += 1
+			if result == 1:
+				aggregates['winning_starting_price'] += performance['starting_price']
+				aggregates['winning_starting_price_count'] += 1
+
+		momentum = performance.momentum
+		if momentum is not None:
+			aggregates['momentum'] += momentum
+			aggregates['momentum_count'] += 1
+			if aggregates['minimum_momentum'] is None or momentum < aggregates['minimum_momentum']:
+				aggregates['minimum_momentum'] = momentum
+			if aggregates['maximum_momentum'] is None or momentum > aggregates['maximum_momentum']:
+				aggregates['maximum_momentum'] = momentum
+
+	def where(self, **criteria):
+		"""Return a lazy PerformanceQuery over this list with the specified criteria (see PerformanceQuery)"""
+
+		return PerformanceQuery(self, criteria)
+
+
+from .cumulative_statistics import CumulativeStatistics
+from .performance import Performance
+from .performance_query import PerformanceQuery
\ No newline at end of file
@@ -0,0 +1,152 @@
+class PerformanceQuery:
+	"""A PerformanceQuery represents a lazy, composable filter over a PerformanceList
+
+	Criteria added via where are fused into a single pass over the source list, which is only made when the query's performances or a statistic are requested.
+	Distance, position and track condition criteria are resolved through the source list's distance index, positions and track condition buckets, and materialised results are shared by all equivalent queries on the same source list.
+
+	The following criteria are supported:
+	track - the performance's track must equal the specified value
+	jockey - the performance's jockey_url must equal the specified value
+	condition - the performance's track condition must start with the specified value (e.g. 'good')
+	distance - the performance's distance must be within distance_within metres (default 0) of the specified value
+	before - the performance's date must be earlier than the specified value
+	since - the performance's date must be equal to or later than the specified value
+	positions - the performance's position in the source list must be one of the specified values (e.g. a range or frozenset)
+	"""
+
+	CRITERIA = ('before', 'condition', 'distance', 'distance_within', 'jockey', 'positions', 'since', 'track')
+
+	def __init__(self, performance_list, criteria=None):
+		"""Create a query over performance_list with the specified criteria"""
+
+		self.performance_list = performance_list
+		self.criteria = {}
+		if criteria is not None:
+			for criterion in criteria:
+				if criterion not in self.CRITERIA:
+					raise TypeError('Unsupported performance query criterion: {criterion}'.format(criterion=criterion))
+			self.criteria.update(criteria)
+		if 'distance_within' in self.criteria and 'distance' not in self.criteria:
+			raise TypeError('The distance_within criterion requires a distance')
+
+	def __getattr__(self, name):
+
+		if name.startswith('__'):
+			raise AttributeError(name)
+		return getattr(self.performances, name)
+
+	def __getitem__(self, key):
+
+		return self.performances[key]
+
+	def __iter__(self):
+
+		return iter(self.performances)
+
+	def __len__(self):
+
+		return len(self.performances)
+
+	def __reduce__(self):
+		"""Pickle the source list and criteria rather than the query's results"""
+
+		return self.__class__, (self.performance_list, self.criteria)
+
+	@property
+	def performances(self):
+		"""Return a PerformanceList containing the performances matching this query"""
+
+		queries = self.performance_list.cache.setdefault('queries', {})
+		key = tuple(sorted(self.criteria.items()))
+		if not key in queries:
+			queries[key] = self.execute()
+		return queries[key]
+
+	def execute(self):
+		"""Evaluate this query against the source list in a single pass"""
+
+		criteria = dict(self.criteria)
+		candidates = self.performance_list
+		positions = None
+
+		if 'distance' in criteria:
+			positions = self.performance_list.get_distance_positions(criteria.pop('distance'), criteria.pop('distance_within', 0))
+
+		if 'positions' in criteria:
+			allowed_positions = criteria.pop('positions')
+			if positions is None:
+				positions = sorted(position for position in allowed_positions if 0 <= position < len(self.performance_list))
+			else:
+				positions = [position for position in positions if position in allowed_positions]
+
+		if positions is not None:
+			candidates = self.performance_list.get_performances_at_positions(positions)
+		elif 'condition' in criteria and criteria['condition'].lower() in Performance.TRACK_CONDITIONS:
+			candidates = self.performance_list.get_track_condition_buckets()[criteria.pop('condition').lower()]
+
+		predicates = self.get_predicates(criteria)
+		if len(predicates) > 0:
+			return candidates.filter(lambda performance: all(predicate(performance) for predicate in predicates))
+		elif candidates is self.performance_list:
+			return candidates[:]
+		else:
+			return candidates
+
+	def get_matcher(self):
+		"""Return a function(position, performance) returning True if the performance at the specified position in the source list satisfies this query's criteria
+
+		This tests the same criteria as execute without materialising the query's performances, so that several queries over the same source list can be evaluated in a single pass.
+		"""
+
+		predicates = self.get_predicates()
+		positions = self.criteria.get('positions')
+
+		return lambda position, performance: (positions is None or position in positions) and all(predicate(performance) for predicate in predicates)
+
+	def get_predicates(self, criteria=None):
+		"""Return a list of functions testing whether a performance satisfies each of the specified criteria (default this query's criteria), excluding positions"""
+
+		if criteria is None:
+			criteria = self.criteria
+
+		predicates = []
+
+		if 'distance' in criteria:
+			minimum_distance = criteria['distance'] - criteria.get('distance_within', 0)
+			maximum_distance = criteria['distance'] + criteria.get('distance_within', 0)
+			predicates.append(lambda performance: performance['distance'] is not None and minimum_distance <= performance['distance'] <= maximum_distance)
+
+		if 'condition' in criteria:
+			condition = criteria['condition']
+			if condition.lower() in Performance.TRACK_CONDITIONS:
+				predicates.append(lambda performance: performance.track_condition_category == condition.lower())
+			else:
+				predicates.append(lambda performance: performance['track_condition'].upper().startswith(condition.upper()))
+
+		if 'track' in criteria:
+			track = criteria['track']
+			predicates.append(lambda performance: performance['track'] == track)
+
+		if 'jockey' in criteria:
+			jockey = criteria['jockey']
+			predicates.append(lambda performance: performance['jockey_url'] == jockey)
+
+		if 'before' in criteria:
+			before = criteria['before']
+			predicates.append(lambda performance: performance['date'] < before)
+
+		if 'since' in criteria:
+			since = criteria['since']
+			predicates.append(lambda performance: performance['date'] >= since)
+
+		return predicates
+
+	def where(self, **criteria):
+		"""Return a new PerformanceQuery combining this query's criteria with the specified criteria"""
+
+		combined_criteria = dict(self.criteria)
+		combined_criteria.update(criteria)
+		return PerformanceQuery(self.performance_list, combined_criteria)
+
+
+from .performance import Performance
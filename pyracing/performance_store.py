@@ -0,0 +1,125 @@
+from collections.abc import Sequence
+from datetime import datetime
+import json
+import os
+
+
+class PerformanceStore:
+	"""A PerformanceStore is a read-only, memory-mapped copy of all stored performances, laid out for fast access by horse and by jockey
+
+	Performances are stored in the same columnar format as a Snapshot, sorted by horse and then by date in descending order, so each horse's performances occupy a contiguous range of rows.
+	A jockey order column holds a permutation of the rows sorted by jockey and then by date in descending order, so each jockey's performances occupy a contiguous range of positions in it.
+	The ranges are recorded in a SnapshotIndex for horses and another (which also holds the jockey order) for jockeys, each consisting of a memory-mapped column of sorted URLs (searched by bisection) and columns of the corresponding start and end positions.
+	As all of these columns are memory-mapped, the pages of a store are shared by all worker processes using it rather than copied into each process, and the performances for a horse or jockey are returned as a StoredPerformances sequence that decodes rows as they are accessed.
+
+	When a store is configured via pyracing.initialize, Performance.get_performances_by_horse and Performance.get_performances_by_jockey (and hence the performances properties of horses and jockeys) read from the store, falling back to the database for horses and jockeys that are not in the store.
+	A store is a copy of the performances as they were when it was built, so horses that have been scraped again since then (and whose performances have therefore been scraped again) are also read from the database, while jockeys' performances only include those stored when the store was built. Rebuild the store to include newer performances.
+	"""
+
+	MANIFEST = 'manifest.json'
+	VERSION = 3
+
+	@classmethod
+	def build(cls, path):
+		"""Build a new store at path from all performances in the database
+
+		Performances are read unsorted and sorted by horse and date as they are written, so the database does not need to sort the whole collection.
+		"""
+
+		performances = SnapshotCollection(path, 'performances', SnapshotCollection.write(path, 'performances', Performance.iter_find({}), sort=[('horse_url', 1), ('date', -1)]))
+
+		manifest = {
+			'version':		cls.VERSION,
+			'built_at':		datetime.now().strftime('%Y-%m-%dT%H:%M:%S.%f'),
+			'performances':	performances.description,
+			'horses':		performances.write_index(os.path.join('indexes', 'horses'), 'horse_url'),
+			'jockeys':		performances.write_index(os.path.join('indexes', 'jockeys'), 'jockey_url', 'date')
+			}
+
+		with open(os.path.join(path, cls.MANIFEST), 'w') as manifest_file:
+			json.dump(manifest, manifest_file)
+
+		return cls(path)
+
+	def __init__(self, path):
+		"""Load the store at path"""
+
+		self.path = path
+
+		with open(os.path.join(path, self.MANIFEST)) as manifest_file:
+			self.manifest = json.load(manifest_file)
+		if self.manifest['version'] != self.VERSION:
+			raise ValueError('Unsupported performance store version: {version}'.format(version=self.manifest['version']))
+
+		self.built_at = datetime.strptime(self.manifest['built_at'], '%Y-%m-%dT%H:%M:%S.%f')
+		self.performances = SnapshotCollection(path, 'performances', self.manifest['performances'])
+		self.horses = SnapshotIndex(path, self.manifest['horses'])
+		self.jockeys = SnapshotIndex(path, self.manifest['jockeys'])
+
+	def __reduce__(self):
+		"""Pickle the store by path, so that unpickling memory-maps the same files"""
+
+		return self.__class__, (self.path,)
+
+	def get_performances_by_horse(self, horse):
+		"""Get a sequence of the stored performances for the specified horse in descending date order, or None if the horse is not in the store or has been scraped again since the store was built"""
+
+		if horse.get('scraped_at') is None or horse['scraped_at'] <= self.built_at:
+			positions = self.horses.find_range(horse['url'])
+			if positions is not None:
+				return StoredPerformances(self.performances, positions, built_at=self.built_at)
+
+	def get_performances_by_jockey(self, jockey):
+		"""Get a sequence of the stored performances for the specified jockey in descending date order, or None if the jockey is not in the store"""
+
+		positions = self.jockeys.find_range(jockey['url'])
+		if positions is not None:
+			return StoredPerformances(self.performances, positions, self.jockeys.order, self.built_at)
+
+	def has_horse(self, url):
+		"""Return True if the store contains performances for the horse with the specified profile URL"""
+
+		return self.horses.find_range(url) is not None
+
+
+class StoredPerformances(Sequence):
+	"""A StoredPerformances object is a read-only sequence of the CompactPerformance objects for a range of positions in the memory-mapped performances of a PerformanceStore or Snapshot
+
+	Creating the sequence copies nothing, as each performance is decoded from the memory-mapped columns when it is first accessed. Decoded performances are cached by the sequence (and shared with its slices), so repeatedly indexing the same sequence (e.g. a horse's performances) decodes each row only once. Slicing the sequence returns another StoredPerformances object.
+	The built_at attribute holds the time at which the store was built or the snapshot exported, as the performances are a copy of those stored at that time.
+	"""
+
+	def __init__(self, rows, positions, order=None, built_at=None, cache=None):
+		"""Create a sequence of the performances at the specified range of positions in rows (a SnapshotCollection), or in the order column of an index of rows if specified
+
+		If cache is specified, it is used to share decoded performances with another sequence over the same rows and order.
+		"""
+
+		self.rows = rows
+		self.positions = positions
+		self.order = order
+		self.built_at = built_at
+		self.cache = {} if cache is None else cache
+
+	def __getitem__(self, index):
+
+		if isinstance(index, slice):
+			return StoredPerformances(self.rows, self.positions[index], self.order, self.built_at, self.cache)
+
+		position = self.positions[index]
+		if not position in self.cache:
+			self.cache[position] = CompactPerformance(self.rows[self.order[position] if self.order is not None else position])
+		return self.cache[position]
+
+	def __len__(self):
+
+		return len(self.positions)
+
+	def __reduce__(self):
+		"""Pickle the sequence's location, discarding the cache"""
+
+		return self.__class__, (self.rows, self.positions, self.order, self.built_at)
+
+from .compact_performance import CompactPerformance
+from .performance import Performance
+from .snapshot import SnapshotCollection, SnapshotIndex
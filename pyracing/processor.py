@@ -63,6 +63,9 @@ class Processor:
 			if self.worker_queue.exception is not None:
 				raise self.worker_queue.exception
 
+			pyracing.flush_writes()
+			pyracing.flush_events()
+
 		if hasattr(self, 'post_process_date'):
 			self.post_process_date(date)
 
@@ -152,7 +155,10 @@ class Processor:
 			self.pre_process_horse(horse)
 
 		if self.must_process_performances:
-			for performance in horse.performances:
+			performances = horse.performances
+			if pyracing.Performance.store is not None:
+				performances = pyracing.Performance.get_performances_by_horse(horse, use_store=False)
+			for performance in performances:
 				self.worker_queue.add_item(
 					target=log_time,
 					target_kwargs={
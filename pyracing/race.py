@@ -28,6 +28,28 @@ class Race(Entity):
 
 		return races
 
+	@classmethod
+	def get_races_by_meets(cls, meets):
+		"""Get a list of races occurring at any of the specified meets using a single database query
+
+		The races cache of each meet with stored races and the meet cache of each race are populated in memory.
+		"""
+
+		meets_by_id = dict((meet['_id'], meet) for meet in meets)
+		races = cls.find({'meet_id': {'$in': list(meets_by_id.keys())}}, sort=[('meet_id', 1), ('number', 1)])
+
+		races_by_meet_id = {}
+		for race in races:
+			race.cache['meet'] = meets_by_id[race['meet_id']]
+			if race['meet_id'] not in races_by_meet_id:
+				races_by_meet_id[race['meet_id']] = []
+			races_by_meet_id[race['meet_id']].append(race)
+
+		for meet_id in races_by_meet_id:
+			meets_by_id[meet_id].cache['races'] = races_by_meet_id[meet_id]
+
+		return races
+
 	@classmethod
 	def initialize(cls):
 		"""Initialize class dependencies"""
@@ -38,6 +60,12 @@ class Race(Entity):
 
 		cls.event_manager.add_subscriber('deleting_meet', handle_deleting_meet)
 
+		def handle_superseding_meet(meet):
+			for race in cls.find({'meet_id': meet['_id']}):
+				race.supersede()
+
+		cls.event_manager.add_subscriber('superseding_meet', handle_superseding_meet)
+
 		cls.create_index([('meet_id', 1)])
 		cls.create_index([('meet_id', 1), ('scraped_at', 1)])
 
@@ -50,8 +78,12 @@ class Race(Entity):
 		"""Return the product of the starting price of all runners finishing in the first four"""
 
 		importance = 1.0
-		for starting_price in [runner.starting_price for runner in self.runners if runner.result is not None and 1 <= runner.result <= 4 and runner.starting_price is not None and runner.starting_price > 0]:
-			importance *= starting_price
+		for runner in self.runners:
+			result = runner.result
+			if result is not None and 1 <= result <= 4:
+				starting_price = runner.starting_price
+				if starting_price is not None and starting_price > 0:
+					importance *= starting_price
 		return importance
 
 	@property
@@ -70,6 +102,43 @@ class Race(Entity):
 			self.cache['runners'] = Runner.get_runners_by_race(self)
 		return self.cache['runners']
 
+	def calculate_field_statistics(self, performance_list='career'):
+		"""Return a table comparing the runners in this race based on the specified performance list
+
+		The horses and performances for the whole field are loaded with one query per collection (see Runner.load_horses).
+		The result is a dictionary containing:
+		runners - a list containing one dictionary per runner with the runner's win_pct, expected_speed (based on average momentum) and total_prize_money, along with the runner's rank within the field for each (1 being the highest, None if not available)
+		field - a dictionary summarising the field's size and the average and maximum of each value
+		"""
+
+		Runner.load_horses(self.runners)
+
+		rows = []
+		for runner in self.runners:
+			performances = getattr(runner, performance_list)
+			rows.append({
+				'runner_id':			runner['_id'],
+				'number':				runner['number'],
+				'win_pct':				performances.win_pct,
+				'expected_speed':		runner.calculate_expected_speed(performance_list)[2],
+				'total_prize_money':	performances.total_prize_money
+				})
+
+		field = {'size': len(rows)}
+		for value in ('win_pct', 'expected_speed', 'total_prize_money'):
+			values = sorted([row[value] for row in rows if row[value] is not None], reverse=True)
+			for row in rows:
+				row[value + '_rank'] = values.index(row[value]) + 1 if row[value] is not None else None
+			field['average_' + value] = sum(values) / len(values) if len(values) > 0 else None
+			field['maximum_' + value] = values[0] if len(values) > 0 else None
+
+		return {'runners': rows, 'field': field}
+
+	def calculate_expected_speeds(self, performance_lists=None):
+		"""Return a table of expected speeds for all runners in this race (see Runner.calculate_expected_speeds)"""
+
+		return Runner.calculate_expected_speeds(self.runners, performance_lists)
+
 
 from .meet import Meet
 from .runner import Runner
\ No newline at end of file
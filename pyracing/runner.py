@@ -7,6 +7,30 @@ from .performance_list import PerformanceList
 class Runner(Entity):
 	"""A runner represents a combination of horse, jockey and trainer competing in a given race"""
 
+	PERFORMANCE_LISTS = (
+		'at_distance',
+		'at_distance_on_track',
+		'career',
+		'firm',
+		'good',
+		'heavy',
+		'jockey_at_distance',
+		'jockey_at_distance_on_track',
+		'jockey_career',
+		'jockey_firm',
+		'jockey_good',
+		'jockey_heavy',
+		'jockey_on_track',
+		'jockey_soft',
+		'jockey_synthetic',
+		'on_track',
+		'on_up',
+		'since_rest',
+		'soft',
+		'synthetic',
+		'with_jockey'
+		)
+	DISTANCE_WINDOW = 100
 	REST_PERIOD = timedelta(days=90)
 
 	@classmethod
@@ -33,6 +57,63 @@ class Runner(Entity):
 
 		return runners
 
+	@classmethod
+	def get_runners_by_races(cls, races):
+		"""Get a list of runners competing in any of the specified races using a single database query
+
+		The runners cache of each race with stored runners and the race cache of each runner are populated in memory.
+		"""
+
+		races_by_id = dict((race['_id'], race) for race in races)
+		runners = cls.find({'race_id': {'$in': list(races_by_id.keys())}}, sort=[('race_id', 1), ('number', 1)])
+
+		runners_by_race_id = {}
+		for runner in runners:
+			runner.cache['race'] = races_by_id[runner['race_id']]
+			if runner['race_id'] not in runners_by_race_id:
+				runners_by_race_id[runner['race_id']] = []
+			runners_by_race_id[runner['race_id']].append(runner)
+
+		for race_id in runners_by_race_id:
+			races_by_id[race_id].cache['runners'] = runners_by_race_id[race_id]
+
+		return runners
+
+	@classmethod
+	def load_horses(cls, runners):
+		"""Populate the horse cache of each of the specified runners, and the performances cache of each horse, using one database query per collection
+
+		Runners whose horse or performances are not yet stored in the database (or have expired) are left to load them individually on first access.
+		"""
+
+		runners = [runner for runner in runners if not 'horse' in runner.cache and runner.get('horse_url') is not None]
+		urls = list(set(runner['horse_url'] for runner in runners))
+
+		horses_by_url = {}
+		for horse in Horse.find({'url': {'$in': urls}}, sort=[('scraped_at', 1)]):
+			horses_by_url[horse['url']] = horse
+
+		performances_by_url = {}
+		if Performance.store is not None and Performance.get_as_of() is None:
+			for url in horses_by_url:
+				performances = Performance.store.get_performances_by_horse(horses_by_url[url])
+				if performances is not None:
+					performances_by_url[url] = performances
+			urls = [url for url in urls if url not in performances_by_url]
+		for performance in Performance.find({'horse_url': {'$in': urls}}, sort=[('horse_url', 1), ('date', -1)]):
+			if performance['horse_url'] not in performances_by_url:
+				performances_by_url[performance['horse_url']] = []
+			performances_by_url[performance['horse_url']].append(performance)
+
+		for url in horses_by_url:
+			if url in performances_by_url:
+				horses_by_url[url].cache['performances'] = performances_by_url[url]
+
+		for runner in runners:
+			horse = horses_by_url.get(runner['horse_url'])
+			if horse is not None and ((horse.get('scraped_at') is not None and horse['scraped_at'] >= runner.race['start_time']) or horse.get('session_id') == cls.SESSION_ID):
+				runner.cache['horse'] = horse
+
 	@classmethod
 	def initialize(cls):
 		"""Initialize class dependencies"""
@@ -43,6 +124,12 @@ class Runner(Entity):
 
 		cls.event_manager.add_subscriber('deleting_race', handle_deleting_race)
 
+		def handle_superseding_race(race):
+			for runner in cls.find({'race_id': race['_id']}):
+				runner.supersede()
+
+		cls.event_manager.add_subscriber('superseding_race', handle_superseding_race)
+
 		cls.create_index([('race_id', 1)])
 		cls.create_index([('race_id', 1), ('scraped_at', 1)])
 
@@ -70,7 +157,7 @@ class Runner(Entity):
 		"""Return a PerformanceList containing all of the horse's prior performances within 100m of the current race's distance"""
 
 		if not 'at_distance' in self.cache:
-			self.cache['at_distance'] = PerformanceList([performance for performance in self.career if self.race['distance'] - 100 <= performance['distance'] <= self.race['distance'] + 100])
+			self.cache['at_distance'] = self.get_performance_list_query('at_distance').performances
 		return self.cache['at_distance']
 
 	@property
@@ -78,7 +165,7 @@ class Runner(Entity):
 		"""Return a PerformanceList containing all of the horse's prior performances within 100m of the current race's distance on the current track"""
 
 		if not 'at_distance_on_track' in self.cache:
-			self.cache['at_distance_on_track'] = PerformanceList([performance for performance in self.at_distance if performance in self.on_track])
+			self.cache['at_distance_on_track'] = self.get_performance_list_query('at_distance_on_track').performances
 		return self.cache['at_distance_on_track']
 
 	@property
@@ -86,9 +173,15 @@ class Runner(Entity):
 		"""Return a PerformanceList containing all of the horse's performances prior to the current race"""
 
 		if not 'career' in self.cache:
-			self.cache['career'] = PerformanceList([performance for performance in self.horse.performances if performance['date'] < self.race.meet['date']])
+			self.cache['career'] = PerformanceList([performance for performance in self.horse.performances if performance['date'] < self.race.meet['date']], presorted=True)
 		return self.cache['career']
 
+	@property
+	def career_offset(self):
+		"""Return the index of the horse's most recent prior performance within the horse's full list of performances"""
+
+		return len(self.horse.performances) - len(self.career)
+
 	@property
 	def carrying(self):
 		"""Return the official listed weight less allowances for the runner"""
@@ -100,16 +193,26 @@ class Runner(Entity):
 	def current_performance(self):
 		"""Return the horse's performance for the current race if available"""
 
-		for performance in self.horse.performances:
-			if performance['track'] == self.race.meet['track'] and performance['date'] == self.race.meet['date']:
-				return performance
+		if not 'current_performance' in self.cache:
+			self.cache['current_performance'] = None
+			if self.horse is not None:
+				self.cache['current_performance'] = self.horse.get_performance_by_track_and_date(self.race.meet['track'], self.race.meet['date'])
+		return self.cache['current_performance']
+
+	@property
+	def features(self):
+		"""Return the materialised RunnerFeatures for this runner if runner features are enabled"""
+
+		if not 'features' in self.cache:
+			self.cache['features'] = RunnerFeatures.get_features_by_runner(self)
+		return self.cache['features']
 
 	@property
 	def firm(self):
 		"""Return a PerformanceList containing all of the horse's prior performances on firm tracks"""
 
 		if not 'firm' in self.cache:
-			self.cache['firm'] = self.get_performances_by_track_condition('firm')
+			self.cache['firm'] = self.get_performance_list_query('firm').performances
 		return self.cache['firm']
 
 	@property
@@ -117,7 +220,7 @@ class Runner(Entity):
 		"""Return a PerformanceList containing all of the horse's prior performances on good tracks"""
 
 		if not 'good' in self.cache:
-			self.cache['good'] = self.get_performances_by_track_condition('good')
+			self.cache['good'] = self.get_performance_list_query('good').performances
 		return self.cache['good']
 
 	@property
@@ -125,7 +228,7 @@ class Runner(Entity):
 		"""Return a PerformanceList containing all of the horse's prior performances on heavy tracks"""
 
 		if not 'heavy' in self.cache:
-			self.cache['heavy'] = self.get_performances_by_track_condition('heavy')
+			self.cache['heavy'] = self.get_performance_list_query('heavy').performances
 		return self.cache['heavy']
 
 	@property
@@ -149,7 +252,7 @@ class Runner(Entity):
 		"""Return a PerformanceList containing all of the jockey's prior performances within 100m of the current race's distance"""
 
 		if not 'jockey_at_distance' in self.cache:
-			self.cache['jockey_at_distance'] = PerformanceList([performance for performance in self.jockey_career if self.race['distance'] - 100 <= performance['distance'] <= self.race['distance'] + 100])
+			self.cache['jockey_at_distance'] = self.get_performance_list_query('jockey_at_distance').performances
 		return self.cache['jockey_at_distance']
 
 	@property
@@ -157,7 +260,7 @@ class Runner(Entity):
 		"""Return a PerformanceList containing all of the jockey's prior performances within 100m of the current race's distance on the current track"""
 
 		if not 'jockey_at_distance_on_track' in self.cache:
-			self.cache['jockey_at_distance_on_track'] = PerformanceList([performance for performance in self.jockey_at_distance if performance in self.jockey_on_track])
+			self.cache['jockey_at_distance_on_track'] = self.get_performance_list_query('jockey_at_distance_on_track').performances
 		return self.cache['jockey_at_distance_on_track']
 
 	@property
@@ -166,17 +269,27 @@ class Runner(Entity):
 
 		if not 'jockey_career' in self.cache:
 			if self.jockey is not None:
-				self.cache['jockey_career'] = PerformanceList([performance for performance in self.jockey.performances if performance['date'] < self.race.meet['date']])
+				self.cache['jockey_career'] = PerformanceList([performance for performance in self.jockey.performances if performance['date'] < self.race.meet['date']], presorted=True)
 			else:
 				self.cache['jockey_career'] = PerformanceList()
 		return self.cache['jockey_career']
 
+	@property
+	def jockey_statistics(self):
+		"""Return a dictionary of statistics for all of the jockey's performances prior to the current race, calculated from the jockey's cumulative statistics"""
+
+		if not 'jockey_statistics' in self.cache:
+			self.cache['jockey_statistics'] = None
+			if self.jockey is not None:
+				self.cache['jockey_statistics'] = self.jockey.cumulative_statistics.get_statistics_as_of(self.race.meet['date'])
+		return self.cache['jockey_statistics']
+
 	@property
 	def jockey_firm(self):
 		"""Return a PerformanceList containing all of the jockey's prior performances on firm tracks"""
 
 		if not 'jockey_firm' in self.cache:
-			self.cache['jockey_firm'] = self.get_jockey_performances_by_track_condition('firm')
+			self.cache['jockey_firm'] = self.get_performance_list_query('jockey_firm').performances
 		return self.cache['jockey_firm']
 
 	@property
@@ -184,7 +297,7 @@ class Runner(Entity):
 		"""Return a PerformanceList containing all of the jockey's prior performances on good tracks"""
 
 		if not 'jockey_good' in self.cache:
-			self.cache['jockey_good'] = self.get_jockey_performances_by_track_condition('good')
+			self.cache['jockey_good'] = self.get_performance_list_query('jockey_good').performances
 		return self.cache['jockey_good']
 
 	@property
@@ -192,7 +305,7 @@ class Runner(Entity):
 		"""Return a PerformanceList containing all of the jockey's prior performances on heavy tracks"""
 
 		if not 'jockey_heavy' in self.cache:
-			self.cache['jockey_heavy'] = self.get_jockey_performances_by_track_condition('heavy')
+			self.cache['jockey_heavy'] = self.get_performance_list_query('jockey_heavy').performances
 		return self.cache['jockey_heavy']
 
 	@property
@@ -200,7 +313,7 @@ class Runner(Entity):
 		"""Return a PerformanceList containing all of the jockey's prior performances on the current track"""
 
 		if not 'jockey_on_track' in self.cache:
-			self.cache['jockey_on_track'] = PerformanceList([performance for performance in self.jockey_career if performance['track'] == self.race.meet['track']])
+			self.cache['jockey_on_track'] = self.get_performance_list_query('jockey_on_track').performances
 		return self.cache['jockey_on_track']
 
 	@property
@@ -208,7 +321,7 @@ class Runner(Entity):
 		"""Return a PerformanceList containing all of the jockey's prior performances on soft tracks"""
 
 		if not 'jockey_soft' in self.cache:
-			self.cache['jockey_soft'] = self.get_jockey_performances_by_track_condition('soft')
+			self.cache['jockey_soft'] = self.get_performance_list_query('jockey_soft').performances
 		return self.cache['jockey_soft']
 
 	@property
@@ -216,7 +329,7 @@ class Runner(Entity):
 		"""Return a PerformanceList containing all of the jockey's prior performances on synthetic tracks"""
 
 		if not 'jockey_synthetic' in self.cache:
-			self.cache['jockey_synthetic'] = self.get_jockey_performances_by_track_condition('synthetic')
+			self.cache['jockey_synthetic'] = self.get_performance_list_query('jockey_synthetic').performances
 		return self.cache['jockey_synthetic']
 
 	@property
@@ -224,7 +337,7 @@ class Runner(Entity):
 		"""Return a PerformanceList containing all of the horse's prior performances on the current track"""
 
 		if not 'on_track' in self.cache:
-			self.cache['on_track'] = PerformanceList([performance for performance in self.career if performance['track'] == self.race.meet['track']])
+			self.cache['on_track'] = self.get_performance_list_query('on_track').performances
 		return self.cache['on_track']
 
 	@property
@@ -232,21 +345,7 @@ class Runner(Entity):
 		"""Return a PerformanceList containing all of the horse's prior performances with the same UP number"""
 
 		if not 'on_up' in self.cache:
-
-			performances = []
-			previous_date = None
-			up = 0
-			for index in range(len(self.career) - 1, 0, -1):
-				if previous_date is None or ((self.career[index]['date'] - previous_date) < self.REST_PERIOD):
-					up += 1
-				else:
-					up = 1
-				if up == self.up:
-					performances.append(self.career[index])
-				previous_date = self.career[index]['date']
-
-			self.cache['on_up'] = PerformanceList(performances)
-
+			self.cache['on_up'] = self.get_performance_list_query('on_up').performances
 		return self.cache['on_up']
 
 	@property
@@ -261,29 +360,19 @@ class Runner(Entity):
 	def result(self):
 		"""Return the final result for this runner if available"""
 
-		if self.current_performance is not None:
-			if self.current_performance['result'] is not None:
-				return self.current_performance['result']
+		current_performance = self.current_performance
+		if current_performance is not None:
+			if current_performance['result'] is not None:
+				return current_performance['result']
 			else:
-				return self.current_performance['starters']
+				return current_performance['starters']
 
 	@property
 	def since_rest(self):
 		"""Return a PerformanceList containing the horse's prior performances since the last spell of 90 days or more"""
 
 		if not 'since_rest' in self.cache:
-
-			performances = []
-			next_date = self.race.meet['date']
-			for index in range(len(self.career)):
-				if (next_date - self.career[index]['date']) < self.REST_PERIOD:
-					performances.append(self.career[index])
-					next_date = self.career[index]['date']
-				else:
-					break
-
-			self.cache['since_rest'] = PerformanceList(performances)
-
+			self.cache['since_rest'] = self.get_performance_list_query('since_rest').performances
 		return self.cache['since_rest']
 
 	@property
@@ -291,7 +380,7 @@ class Runner(Entity):
 		"""Return a PerformanceList containing all of the horse's prior performances on soft tracks"""
 
 		if not 'soft' in self.cache:
-			self.cache['soft'] = self.get_performances_by_track_condition('soft')
+			self.cache['soft'] = self.get_performance_list_query('soft').performances
 		return self.cache['soft']
 
 	@property
@@ -305,16 +394,17 @@ class Runner(Entity):
 	def starting_price(self):
 		"""Return the starting price for this runner if available"""
 
-		if self.current_performance is not None:
-			if 'starting_price' in self.current_performance:
-				return self.current_performance['starting_price']
+		current_performance = self.current_performance
+		if current_performance is not None:
+			if 'starting_price' in current_performance:
+				return current_performance['starting_price']
 
 	@property
 	def synthetic(self):
 		"""Return a PerformanceList containing all of the horse's prior performances on synthetic tracks"""
 
 		if not 'synthetic' in self.cache:
-			self.cache['synthetic'] = self.get_performances_by_track_condition('synthetic')
+			self.cache['synthetic'] = self.get_performance_list_query('synthetic').performances
 		return self.cache['synthetic']
 
 	@property
@@ -329,56 +419,169 @@ class Runner(Entity):
 	def up(self):
 		"""Return the number of races run by the horse (including this one) since the last rest period of 90 days or more"""
 
-		up = 1
-
-		next_date = self.race.meet['date']
-		for index in range(len(self.career)):
-			if (next_date - self.career[index]['date']) < self.REST_PERIOD:
-				up += 1
-				next_date = self.career[index]['date']
-			else:
-				break
-
-		return up
+		if not 'up' in self.cache:
+			self.cache['up'] = 1
+			if len(self.career) > 0 and (self.race.meet['date'] - self.career[0]['date']) < self.REST_PERIOD:
+				self.cache['up'] = self.horse.get_preparations(self.REST_PERIOD)[self.career_offset][1] + 1
+		return self.cache['up']
 
 	@property
 	def with_jockey(self):
 		"""Return a PerformanceList containing all of the horse's prior performances with the same jockey"""
 
 		if not 'with_jockey' in self.cache:
-			self.cache['with_jockey'] = PerformanceList([performance for performance in self.career if performance['jockey_url'] == self['jockey_url']])
+			self.cache['with_jockey'] = self.get_performance_list_query('with_jockey').performances
 		return self.cache['with_jockey']
 
+	@classmethod
+	def calculate_expected_speeds(cls, runners, performance_lists=None):
+		"""Return a table of expected speeds for all of the specified runners across the specified performance lists (default PERFORMANCE_LISTS)
+
+		The horses and performances for all of the runners are loaded with one query per collection (see load_horses), and each runner's expected speeds are calculated with get_expected_speeds.
+		The table is a list containing one dictionary per runner (in the same order as runners), mapping each performance list name to a tuple of minimum, maximum and average expected speeds as returned by calculate_expected_speed.
+		"""
+
+		if performance_lists is None:
+			performance_lists = cls.PERFORMANCE_LISTS
+
+		cls.load_horses(runners)
+
+		return [runner.get_expected_speeds(performance_lists) for runner in runners]
+
 	def calculate_expected_speed(self, performance_list):
 		"""Return a tuple containing expected speeds based on the minimum, maximum and average momentums for the specified performance list"""
 
 		performance_list = getattr(self, performance_list)
 		if performance_list is not None:
+			return self.divide_momentums((performance_list.minimum_momentum, performance_list.maximum_momentum, performance_list.average_momentum))
+
+	def divide_momentums(self, momentums):
+		"""Return a tuple containing the specified momentums divided by the runner's actual weight (or None for momentums that are None)"""
+
+		expected_speeds = [None] * len(momentums)
+
+		actual_weight = self.actual_weight
+		if actual_weight is not None and actual_weight > 0:
+			for index, momentum in enumerate(momentums):
+				if momentum is not None:
+					expected_speeds[index] = momentum / actual_weight
+
+		return tuple(expected_speeds)
 
-			expected_speeds = [None, None, None]
+	def get_expected_speeds(self, performance_lists=None):
+		"""Return a dictionary mapping each of the specified performance list names (default PERFORMANCE_LISTS) to the runner's expected speeds for that list
 
-			if self.actual_weight is not None and self.actual_weight > 0:
-				if performance_list.minimum_momentum is not None:
-					expected_speeds[0] = performance_list.minimum_momentum / self.actual_weight
-				if performance_list.maximum_momentum is not None:
-					expected_speeds[1] = performance_list.maximum_momentum / self.actual_weight
-				if performance_list.average_momentum is not None:
-					expected_speeds[2] = performance_list.average_momentum / self.actual_weight
+		The momentums for all of the lists are gathered by get_momentums_by_performance_list without building the lists themselves, so the result is the same as calling calculate_expected_speed for each list.
+		"""
 
-			return tuple(expected_speeds)
+		if performance_lists is None:
+			performance_lists = self.PERFORMANCE_LISTS
+
+		momentums = self.get_momentums_by_performance_list(performance_lists)
+
+		return dict((performance_list, self.divide_momentums(momentums[performance_list]) if performance_list in momentums else self.calculate_expected_speed(performance_list)) for performance_list in performance_lists)
+
+	def get_momentums_by_performance_list(self, performance_lists):
+		"""Return a dictionary mapping each of the specified performance list names to a tuple of the minimum, maximum and average momentums for that list
+
+		The momentums for all of the horse's lists are gathered in a single pass over the runner's career, and those for all of the jockey's lists in a single pass over the jockey's career, by testing each performance against the lists' queries (see get_performance_list_query).
+		Names that are not in PERFORMANCE_LISTS are omitted from the result.
+		"""
+
+		matchers_by_source = []
+		for performance_list in performance_lists:
+			if performance_list in self.PERFORMANCE_LISTS:
+				query = self.get_performance_list_query(performance_list)
+				for source, matchers in matchers_by_source:
+					if source is query.performance_list:
+						break
+				else:
+					matchers = {}
+					matchers_by_source.append((query.performance_list, matchers))
+				matchers[performance_list] = query.get_matcher()
+
+		momentums = {}
+		for performances, matchers in matchers_by_source:
+			totals = dict((performance_list, [None, None, 0, 0, 0]) for performance_list in matchers)
+			for position, performance in enumerate(performances):
+				momentum = performance.momentum
+				for performance_list, matcher in matchers.items():
+					if matcher(position, performance):
+						total = totals[performance_list]
+						total[4] += 1
+						if momentum is not None:
+							if total[0] is None or momentum < total[0]:
+								total[0] = momentum
+							if total[1] is None or momentum > total[1]:
+								total[1] = momentum
+							total[2] += momentum
+							total[3] += 1
+			for performance_list, (minimum, maximum, momentum, momentum_count, starts) in totals.items():
+				momentums[performance_list] = (minimum, maximum, momentum / starts if momentum_count > 0 else None)
+
+		return momentums
+
+	def get_performance_list_query(self, performance_list):
+		"""Return a PerformanceQuery selecting the specified member of PERFORMANCE_LISTS from the runner's career (or the jockey's career for jockey_ lists)
+
+		This is the single definition of the performance lists, used both by the performance list properties and by get_momentums_by_performance_list.
+		"""
+
+		if performance_list.startswith('jockey_'):
+			source = self.jockey_career
+			performance_list = performance_list[len('jockey_'):]
+		else:
+			source = self.career
+
+		if performance_list == 'career':
+			return source.where()
+		elif performance_list == 'at_distance':
+			return source.where(distance=self.race['distance'], distance_within=self.DISTANCE_WINDOW)
+		elif performance_list == 'at_distance_on_track':
+			return source.where(distance=self.race['distance'], distance_within=self.DISTANCE_WINDOW, track=self.race.meet['track'])
+		elif performance_list == 'on_track':
+			return source.where(track=self.race.meet['track'])
+		elif performance_list in Performance.TRACK_CONDITIONS:
+			return source.where(condition=performance_list)
+		elif performance_list == 'with_jockey':
+			return source.where(jockey=self['jockey_url'])
+		elif performance_list == 'since_rest':
+			return source.where(positions=range(self.up - 1))
+		elif performance_list == 'on_up':
+			career_offset = self.career_offset
+			indices = self.horse.get_performance_indices_by_up(self.REST_PERIOD).get(self.up, [])
+			return source.where(positions=frozenset(index - career_offset for index in indices if index > career_offset))
+		else:
+			raise ValueError('Unknown performance list: {performance_list}'.format(performance_list=performance_list))
+
+	def get_performances_at_distance(self, window=None):
+		"""Return a PerformanceList containing all prior performances for the horse within window metres (default DISTANCE_WINDOW) of the current race's distance"""
+
+		if window is None:
+			window = self.DISTANCE_WINDOW
+		return self.career.get_performances_at_distance(self.race['distance'], window)
+
+	def get_jockey_performances_at_distance(self, window=None):
+		"""Return a PerformanceList containing all prior performances for the jockey within window metres (default DISTANCE_WINDOW) of the current race's distance"""
+
+		if window is None:
+			window = self.DISTANCE_WINDOW
+		return self.jockey_career.get_performances_at_distance(self.race['distance'], window)
 
 	def get_performances_by_track_condition(self, track_condition):
 		"""Return a PerformanceList containing all prior performances for the horse on the specified track condition"""
 
-		return PerformanceList([performance for performance in self.career if performance['track_condition'].upper().startswith(track_condition.upper())])
+		return self.career.get_performances_by_track_condition(track_condition)
 
 	def get_jockey_performances_by_track_condition(self, track_condition):
 		"""Return a PerformanceList containing all prior performances for the jockey on the specified track condition"""
 
-		return PerformanceList([performance for performance in self.jockey_career if performance['track_condition'].upper().startswith(track_condition.upper())])
+		return self.jockey_career.get_performances_by_track_condition(track_condition)
 
 
 from .race import Race
 from .horse import Horse
 from .jockey import Jockey
 from .trainer import Trainer
+from .performance import Performance
+from .runner_features import RunnerFeatures
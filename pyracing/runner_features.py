@@ -0,0 +1,146 @@
+from datetime import datetime
+
+from .common import Entity
+
+
+class RunnerFeatures(Entity):
+	"""Runner features represent a materialised snapshot of the statistics calculated for a runner
+
+	Runner features are only stored when enabled via pyracing.initialize, and are discarded whenever the runner, race, horse, jockey or relevant performances change.
+	"""
+
+	COLLECTION_NAME = 'runner_features'
+	SCRAPED = False
+
+	enabled = False
+
+	@classmethod
+	def calculate_features(cls, runner):
+		"""Calculate a new RunnerFeatures object for the specified runner"""
+
+		features = cls({
+			'runner_id':			runner['_id'],
+			'race_id':				runner['race_id'],
+			'horse_url':			runner.get('horse_url'),
+			'jockey_url':			runner.get('jockey_url'),
+			'date':					runner.race.meet['date'],
+			'age':					runner.age,
+			'spell':				runner.spell,
+			'up':					runner.up,
+			'performance_lists':	{},
+			'expected_speeds':		{}
+			})
+
+		for performance_list in runner.PERFORMANCE_LISTS:
+			features['performance_lists'][performance_list] = getattr(runner, performance_list).get_statistics()
+			features['expected_speeds'][performance_list] = list(runner.calculate_expected_speed(performance_list))
+
+		return features
+
+	@classmethod
+	def delete_features(cls, filter):
+		"""Delete all stored runner features matching the specified filter"""
+
+		if cls.enabled:
+			cls.get_database_collection().delete_many(filter)
+
+	@classmethod
+	def get_features_by_race(cls, race):
+		"""Get a list of the stored runner features for all runners in the specified race
+
+		Within an as_of context, features are calculated for each runner with complete inputs instead, as stored features reflect the current data.
+		"""
+
+		if cls.get_as_of() is not None:
+			features = []
+			for runner in race.runners:
+				runner_features = cls.get_features_by_runner(runner)
+				if runner_features is not None:
+					features.append(runner_features)
+			return features
+
+		return cls.find({'race_id': race['_id']})
+
+	@classmethod
+	def get_features_by_runner(cls, runner):
+		"""Get the runner features for the specified runner, calculating and storing them if they are not already stored and the runner's inputs are complete"""
+
+		if cls.enabled:
+
+			if cls.get_as_of() is not None:
+				if cls.has_complete_inputs(runner):
+					return cls.calculate_features(runner)
+				return None
+
+			features = cls.find_one({'runner_id': runner['_id']})
+
+			if features is None and cls.has_complete_inputs(runner):
+				features = cls.calculate_features(runner)
+				features['calculated_at'] = datetime.now()
+				features.save()
+
+			return features
+
+	@classmethod
+	def has_complete_inputs(cls, runner):
+		"""Return True if all of the inputs required to calculate features for the specified runner are available
+
+		The runner's race date must have been reached, its horse and (if it has one) its jockey must be available, and the performances of both must have been loaded as of the race's start time or later.
+		Performances read from a PerformanceStore built (or a Snapshot exported) before the race started are therefore not complete, as performances scraped for the race's horses since the store was built would be missing from them.
+		"""
+
+		if runner.race.meet['date'] > datetime.now() or runner.horse is None:
+			return False
+
+		performance_lists = [runner.horse.performances]
+		if runner.get('jockey_url') is not None:
+			if runner.jockey is None:
+				return False
+			performance_lists.append(runner.jockey.performances)
+
+		for performances in performance_lists:
+			if isinstance(performances, StoredPerformances) and performances.built_at < runner.race['start_time']:
+				return False
+
+		return True
+
+	@classmethod
+	def initialize(cls):
+		"""Initialize class dependencies"""
+
+		def handle_changed_horse(horse):
+			cls.delete_features({'horse_url': horse['url']})
+
+		def handle_changed_jockey(jockey):
+			cls.delete_features({'jockey_url': jockey['url']})
+
+		def handle_changed_performance(performance):
+			for key in ('horse_url', 'jockey_url'):
+				if key in performance and performance[key] is not None:
+					cls.delete_features({key: performance[key], 'date': {'$gt': performance['date']}})
+
+		def handle_changed_race(race):
+			cls.delete_features({'race_id': race['_id']})
+
+		def handle_changed_runner(runner):
+			cls.delete_features({'runner_id': runner['_id']})
+
+		for event in ('saved_horse', 'deleting_horse'):
+			cls.event_manager.add_subscriber(event, handle_changed_horse)
+		for event in ('saved_jockey', 'deleting_jockey'):
+			cls.event_manager.add_subscriber(event, handle_changed_jockey)
+		for event in ('saved_performance', 'deleting_performance'):
+			cls.event_manager.add_subscriber(event, handle_changed_performance)
+		for event in ('saved_race', 'deleting_race'):
+			cls.event_manager.add_subscriber(event, handle_changed_race)
+		for event in ('saved_runner', 'deleting_runner'):
+			cls.event_manager.add_subscriber(event, handle_changed_runner)
+
+		if cls.enabled:
+			cls.create_index([('runner_id', 1)])
+			cls.create_index([('race_id', 1)])
+			cls.create_index([('horse_url', 1), ('date', 1)])
+			cls.create_index([('jockey_url', 1), ('date', 1)])
+
+
+from .performance_store import StoredPerformances
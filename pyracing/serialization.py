@@ -0,0 +1,102 @@
+"""Compact msgpack serialization of racing entities and performance lists
+
+This module requires the optional msgpack package. Entities are encoded as their class name and values only (never their caches), datetimes as microseconds since the epoch, and PerformanceList and CompactPerformance objects as their contents, so work units can be sent between processes or machines cheaply.
+"""
+
+from datetime import datetime, timedelta
+
+try:
+	import msgpack
+except ImportError:
+	msgpack = None
+
+
+DATETIME = 1
+ENTITY = 2
+PERFORMANCE_LIST = 3
+COMPACT_PERFORMANCE = 4
+OBJECT_ID = 5
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def pack(value):
+	"""Encode value (which may contain entities, performance lists, compact performances and datetimes) as msgpack bytes"""
+
+	if msgpack is None:
+		raise ImportError('The msgpack package is required for pyracing.serialization')
+
+	return msgpack.packb(value, default=encode, use_bin_type=True, strict_types=True)
+
+
+def unpack(data):
+	"""Decode msgpack bytes created by pack"""
+
+	if msgpack is None:
+		raise ImportError('The msgpack package is required for pyracing.serialization')
+
+	return msgpack.unpackb(data, ext_hook=decode, raw=False)
+
+
+def decode(code, data):
+	"""Decode a msgpack extension type created by encode"""
+
+	if code == DATETIME:
+		return EPOCH + timedelta(microseconds=int.from_bytes(data, 'big', signed=True))
+	elif code == ENTITY:
+		class_name, values, changed_keys = unpack(data)
+		entity = get_entity_type(class_name)(values)
+		entity.changed_keys = set(changed_keys)
+		return entity
+	elif code == PERFORMANCE_LIST:
+		return PerformanceList(unpack(data))
+	elif code == COMPACT_PERFORMANCE:
+		return CompactPerformance(unpack(data))
+	elif code == OBJECT_ID:
+		from bson import ObjectId
+		return ObjectId(data)
+	else:
+		return msgpack.ExtType(code, data)
+
+
+def encode(value):
+	"""Encode a value that msgpack does not support natively as a msgpack extension type
+
+	As subclasses of dict and list are not packed natively (so that entities and performance lists are not mistaken for plain dictionaries and lists), other subclasses and tuples are converted to plain dictionaries and lists.
+	"""
+
+	if isinstance(value, datetime):
+		delta = value.replace(tzinfo=None) - EPOCH
+		return msgpack.ExtType(DATETIME, ((delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds).to_bytes(8, 'big', signed=True))
+	elif isinstance(value, Entity):
+		return msgpack.ExtType(ENTITY, pack([value.__class__.__name__, dict(value), sorted(getattr(value, 'changed_keys', ()), key=str)]))
+	elif isinstance(value, PerformanceList):
+		return msgpack.ExtType(PERFORMANCE_LIST, pack(list(value)))
+	elif isinstance(value, CompactPerformance):
+		return msgpack.ExtType(COMPACT_PERFORMANCE, pack(dict(value.items())))
+	elif value.__class__.__name__ == 'ObjectId':
+		return msgpack.ExtType(OBJECT_ID, value.binary)
+	elif isinstance(value, dict):
+		return dict(value)
+	elif isinstance(value, (list, tuple)):
+		return list(value)
+	else:
+		raise TypeError('Cannot serialize object of type {type}'.format(type=value.__class__.__name__))
+
+
+def get_entity_type(class_name):
+	"""Get the Entity subclass with the specified name"""
+
+	entity_types = [Entity]
+	while len(entity_types) > 0:
+		entity_type = entity_types.pop()
+		if entity_type.__name__ == class_name:
+			return entity_type
+		entity_types.extend(entity_type.__subclasses__())
+
+	raise TypeError('Unknown entity type: {class_name}'.format(class_name=class_name))
+
+
+from .common import Entity
+from .compact_performance import CompactPerformance
+from .performance_list import PerformanceList
@@ -0,0 +1,533 @@
+from array import array
+import ast
+from bisect import bisect_left
+from datetime import datetime, timedelta
+import json
+import math
+import mmap
+import os
+import sys
+
+
+class Snapshot:
+	"""A Snapshot is a read-only, columnar copy of the racing database stored in a directory of NumPy .npy files
+
+	Each collection is stored as one .npy file per key, described by a manifest.json file in the snapshot directory:
+	- numeric keys are stored as 64-bit integers, or as 64-bit floats with NaN representing missing values
+	- datetime keys are stored as NumPy datetime64[us] values, with NaT representing missing values
+	- all other keys are dictionary-encoded, storing 32-bit codes in the .npy file and the distinct values in two further .npy files (see SnapshotColumn)
+
+	Snapshots are created with Snapshot.export and loaded by creating a Snapshot with the snapshot directory's path.
+	The manifest only describes the columns, and columns (including the distinct values of dictionary-encoded keys) are memory-mapped rather than read into memory, so loading a snapshot is fast regardless of its size and its pages are shared by all processes using it. The .npy files can also be loaded directly with numpy.load(path, mmap_mode='r').
+	Indexes of the performances by horse and by jockey (see SnapshotIndex) are written when the snapshot is exported, so looking up a horse's or jockey's performances reads only their rows.
+	"""
+
+	MANIFEST = 'manifest.json'
+	PERFORMANCE_INDEXES = ('horse_url', 'jockey_url')
+	VERSION = 3
+
+	@classmethod
+	def export(cls, path, entity_types=None, race_runners=True):
+		"""Export the specified entity types (by default all racing entity types) from the database to a new snapshot at path
+
+		Entities are read in the same way as by find, so only current versions are exported, or the versions current at the as-of date within an as_of context.
+		If race_runners is True, a denormalised race_runners collection is also exported, containing each runner's values together with the values of its race (prefixed with 'race_') and meet (prefixed with 'meet_').
+		"""
+
+		if entity_types is None:
+			entity_types = (Meet, Race, Runner, Horse, Jockey, Trainer, Performance)
+
+		manifest = {'version': cls.VERSION, 'exported_at': datetime.now().strftime('%Y-%m-%dT%H:%M:%S.%f'), 'collections': {}}
+
+		for entity_type in entity_types:
+			name = entity_type.get_collection_name()
+			manifest['collections'][name] = SnapshotCollection.write(path, name, entity_type.iter_find({}))
+			if entity_type is Performance:
+				collection = SnapshotCollection(path, name, manifest['collections'][name])
+				for key in cls.PERFORMANCE_INDEXES:
+					manifest['collections'][name]['indexes'][key] = collection.write_index(os.path.join(name, 'indexes', key), key, 'date')
+
+		if race_runners:
+			manifest['collections']['race_runners'] = SnapshotCollection.write(path, 'race_runners', cls.iter_race_runners())
+
+		with open(os.path.join(path, cls.MANIFEST), 'w') as manifest_file:
+			json.dump(manifest, manifest_file, indent='\t')
+
+		return cls(path)
+
+	@classmethod
+	def iter_race_runners(cls):
+		"""Get a generator yielding runner documents joined with the values of their race and meet"""
+
+		excluded_keys = ('_id', 'scraped_at', 'session_id')
+
+		meets = dict((meet['_id'], meet) for meet in Meet.iter_find({}))
+		races = dict((race['_id'], race) for race in Race.iter_find({}))
+
+		for runner in Runner.iter_find({}):
+			values = dict(runner)
+			race = races.get(runner.get('race_id'))
+			if race is not None:
+				for key, value in race.items():
+					if key not in excluded_keys and key != 'meet_id':
+						values['race_' + key] = value
+				meet = meets.get(race.get('meet_id'))
+				if meet is not None:
+					for key, value in meet.items():
+						if key not in excluded_keys:
+							values['meet_' + key] = value
+			yield values
+
+	def __init__(self, path):
+		"""Load the manifest for the snapshot at path"""
+
+		self.path = path
+
+		with open(os.path.join(path, self.MANIFEST)) as manifest_file:
+			self.manifest = json.load(manifest_file)
+		if self.manifest['version'] != self.VERSION:
+			raise ValueError('Unsupported snapshot version: {version}'.format(version=self.manifest['version']))
+
+		self.exported_at = datetime.strptime(self.manifest['exported_at'], '%Y-%m-%dT%H:%M:%S.%f')
+		self.collections = dict((name, SnapshotCollection(path, name, description)) for name, description in self.manifest['collections'].items())
+		self.cache = {}
+
+	def __getitem__(self, name):
+
+		return self.collections[name]
+
+	def __reduce__(self):
+		"""Pickle the snapshot by path, so that unpickling memory-maps the same files"""
+
+		return self.__class__, (self.path,)
+
+	def get_performances(self):
+		"""Get a sequence of all performances in the snapshot, decoded as they are accessed"""
+
+		collection = self[Performance.get_collection_name()]
+		return StoredPerformances(collection, range(len(collection)), built_at=self.exported_at)
+
+	def get_performances_by_horse(self, horse):
+		"""Get a sequence of the snapshot's performances for the specified horse in descending date order"""
+
+		return self.get_performances_by_key('horse_url', horse['url'])
+
+	def get_performances_by_jockey(self, jockey):
+		"""Get a sequence of the snapshot's performances for the specified jockey in descending date order"""
+
+		return self.get_performances_by_key('jockey_url', jockey['url'])
+
+	def get_performances_by_key(self, key, value):
+		"""Get a sequence of the snapshot's performances with the specified value for key (one of PERFORMANCE_INDEXES) in descending date order, decoded as they are accessed"""
+
+		collection = self[Performance.get_collection_name()]
+		index = collection.get_index(key)
+		return StoredPerformances(collection, index.find_range(value) or range(0), index.order, self.exported_at)
+
+
+class SnapshotCollection:
+	"""A SnapshotCollection provides access to the rows of a single collection in a snapshot
+
+	Rows are returned as SnapshotRow objects, which read their values from the memory-mapped columns on access.
+	"""
+
+	@classmethod
+	def write(cls, path, name, documents, sort=None):
+		"""Write the specified documents to columns in the snapshot at path, and return the collection's description for the manifest
+
+		If sort is specified as a list of (key, direction) tuples (as for Entity.iter_find), the rows are sorted locally before they are written, with missing values sorted first in ascending order. This avoids sorting the whole collection in the database when no index supports the sort.
+		"""
+
+		directory = os.path.join(path, name)
+		os.makedirs(directory, exist_ok=True)
+
+		columns = {}
+		rows = 0
+		for document in documents:
+			for key in document:
+				if not key in columns:
+					columns[key] = [None] * rows
+			for key, values in columns.items():
+				values.append(document.get(key))
+			rows += 1
+
+		if sort is not None:
+			order = list(range(rows))
+			for key, direction in reversed(sort):
+				values = columns.get(key, [None] * rows)
+				order.sort(key=lambda index: (values[index] is not None, values[index]), reverse=direction < 0)
+			for key in columns:
+				columns[key] = [columns[key][index] for index in order]
+
+		description = {'rows': rows, 'columns': {}, 'indexes': {}}
+		for key, values in sorted(columns.items()):
+			filename = os.path.join(name, '{index}.npy'.format(index=len(description['columns'])))
+			description['columns'][key] = SnapshotColumn.write(os.path.join(path, filename), values)
+			description['columns'][key]['file'] = filename
+
+		return description
+
+	def __init__(self, path, name, description):
+		"""Initialize instance dependencies"""
+
+		self.path = path
+		self.name = name
+		self.description = description
+
+		self.columns = {}
+		self.cache = {}
+
+	def __getitem__(self, index):
+
+		if index < 0:
+			index += len(self)
+		if not 0 <= index < len(self):
+			raise IndexError('Snapshot row index out of range')
+		return SnapshotRow(self, index)
+
+	def __iter__(self):
+
+		for index in range(len(self)):
+			yield SnapshotRow(self, index)
+
+	def __len__(self):
+
+		return self.description['rows']
+
+	def __reduce__(self):
+		"""Pickle the collection's location and description rather than its memory-mapped columns"""
+
+		return self.__class__, (self.path, self.name, self.description)
+
+	@property
+	def keys(self):
+		"""Return a list of the keys stored in this collection"""
+
+		return sorted(self.description['columns'].keys())
+
+	def get_column(self, key):
+		"""Get the memory-mapped column for key"""
+
+		if not key in self.columns:
+			self.columns[key] = SnapshotColumn(os.path.join(self.path, self.description['columns'][key]['file']), self.description['columns'][key])
+		return self.columns[key]
+
+	def get_index(self, key):
+		"""Get the index of this collection's rows by key"""
+
+		if not 'indexes' in self.cache:
+			self.cache['indexes'] = {}
+		if not key in self.cache['indexes']:
+			self.cache['indexes'][key] = SnapshotIndex(self.path, self.description['indexes'][key])
+		return self.cache['indexes'][key]
+
+	def write_index(self, prefix, key, order_key=None):
+		"""Write an index of this collection's rows by key to columns whose filenames begin with prefix, and return the index's description for the manifest
+
+		If order_key is None, the rows must already be sorted by key. Otherwise the index includes a permutation of the rows sorted by key and then by the (numeric or datetime) value of order_key in descending order.
+		"""
+
+		os.makedirs(os.path.dirname(os.path.join(self.path, prefix)), exist_ok=True)
+
+		keys = [self.get_column(key)[index] for index in range(len(self))] if key in self.description['columns'] else [None] * len(self)
+		if order_key is None:
+			return SnapshotIndex.write(self.path, prefix, keys)
+
+		order_values = self.get_column(order_key).values if order_key in self.description['columns'] else None
+		order = sorted(range(len(self)), key=lambda index: (keys[index] is not None, keys[index] or '', -order_values[index] if order_values is not None else 0))
+		return SnapshotIndex.write(self.path, prefix, [keys[index] for index in order], order)
+
+
+class SnapshotColumn:
+	"""A SnapshotColumn decodes the values stored in a single memory-mapped .npy file
+
+	The distinct values of a dictionary-encoded column are stored next to its .npy file, as JSON encoded in UTF-8 and concatenated into a .values.npy file of bytes, with a .offsets.npy file holding the offset of each value in the bytes (plus the total length).
+	Both files are memory-mapped along with the column's codes, and values are decoded as they are accessed.
+	"""
+
+	BYTE_TYPECODE = 'B'
+	CODE_TYPECODE = [typecode for typecode in 'hilq' if array(typecode).itemsize == 4][0]
+	FLOAT_TYPECODE = 'd'
+	INTEGER_TYPECODE = [typecode for typecode in 'lq' if array(typecode).itemsize == 8][0]
+	MISSING_DATETIME = -2 ** 63
+	EPOCH = datetime(1970, 1, 1)
+
+	@classmethod
+	def write(cls, filename, values):
+		"""Write values to a .npy file (plus the .offsets.npy and .values.npy files of a dictionary-encoded column) and return the column's description for the manifest"""
+
+		present = [value for value in values if value is not None]
+
+		if len(present) > 0 and all(isinstance(value, datetime) for value in present):
+			description = {'type': 'datetime', 'descr': '<M8[us]'}
+			data = array(cls.INTEGER_TYPECODE, (cls.MISSING_DATETIME if value is None else cls.encode_datetime(value) for value in values))
+
+		elif len(present) > 0 and all(isinstance(value, int) and not isinstance(value, bool) for value in present) and len(present) == len(values):
+			description = {'type': 'integer', 'descr': '<i8'}
+			data = array(cls.INTEGER_TYPECODE, values)
+
+		elif len(present) > 0 and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+			description = {'type': 'number', 'descr': '<f8', 'integer': all(isinstance(value, int) for value in present)}
+			data = array(cls.FLOAT_TYPECODE, (math.nan if value is None else float(value) for value in values))
+
+		else:
+			description = {'type': 'category', 'descr': '<i4'}
+			codes = {}
+			offsets = array(cls.INTEGER_TYPECODE, [0])
+			category_data = bytearray()
+			data = array(cls.CODE_TYPECODE)
+			for value in values:
+				key = json.dumps(cls.encode_category(value), sort_keys=True)
+				if not key in codes:
+					codes[key] = len(codes)
+					category_data.extend(key.encode('utf-8'))
+					offsets.append(len(category_data))
+				data.append(codes[key])
+			cls.write_npy(cls.get_offsets_filename(filename), '<i8', offsets)
+			cls.write_npy(cls.get_values_filename(filename), '|u1', array(cls.BYTE_TYPECODE, category_data))
+
+		cls.write_npy(filename, description['descr'], data)
+
+		return description
+
+	@classmethod
+	def encode_category(cls, value):
+		"""Return value in a form that can be encoded as JSON"""
+
+		if value is None or isinstance(value, (str, bool, int, float)):
+			return value
+		elif isinstance(value, dict):
+			return dict((str(key), cls.encode_category(item)) for key, item in value.items())
+		elif isinstance(value, (list, tuple)):
+			return [cls.encode_category(item) for item in value]
+		else:
+			return str(value)
+
+	@classmethod
+	def encode_datetime(cls, value):
+		"""Return the number of microseconds between the epoch and value"""
+
+		delta = value.replace(tzinfo=None) - cls.EPOCH
+		return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+	@classmethod
+	def get_offsets_filename(cls, filename):
+		"""Return the filename of the offsets of the distinct values of the dictionary-encoded column at filename"""
+
+		return filename[:-len('.npy')] + '.offsets.npy'
+
+	@classmethod
+	def get_values_filename(cls, filename):
+		"""Return the filename of the distinct values of the dictionary-encoded column at filename"""
+
+		return filename[:-len('.npy')] + '.values.npy'
+
+	@classmethod
+	def map_npy(cls, filename):
+		"""Memory-map the .npy file at filename and return a tuple of the memory map and a sequence of the values it contains"""
+
+		with open(filename, 'rb') as npy_file:
+			npy_mmap = mmap.mmap(npy_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+		header_length = int.from_bytes(npy_mmap[8:10], 'little')
+		header = ast.literal_eval(npy_mmap[10:10 + header_length].decode('latin1'))
+
+		typecode = {'<M8[us]': cls.INTEGER_TYPECODE, '<i8': cls.INTEGER_TYPECODE, '<f8': cls.FLOAT_TYPECODE, '<i4': cls.CODE_TYPECODE, '|u1': cls.BYTE_TYPECODE}[header['descr']]
+		data = memoryview(npy_mmap)[10 + header_length:]
+		if sys.byteorder == 'little' or typecode == cls.BYTE_TYPECODE:
+			values = data.cast('B').cast(typecode)
+		else:
+			values = array(typecode, data.tobytes())
+			values.byteswap()
+
+		if len(values) != header['shape'][0]:
+			raise ValueError('Snapshot column {filename} is truncated'.format(filename=filename))
+
+		return npy_mmap, values
+
+	@classmethod
+	def write_npy(cls, filename, descr, data):
+		"""Write the values in the array data to a .npy file with the specified NumPy type description"""
+
+		if sys.byteorder != 'little':
+			data.byteswap()
+
+		header = "{{'descr': '{descr}', 'fortran_order': False, 'shape': ({rows},), }}".format(descr=descr, rows=len(data))
+		header += ' ' * (63 - (10 + len(header)) % 64) + '\n'
+
+		with open(filename, 'wb') as npy_file:
+			npy_file.write(b'\x93NUMPY\x01\x00')
+			npy_file.write(len(header).to_bytes(2, 'little'))
+			npy_file.write(header.encode('latin1'))
+			npy_file.write(data.tobytes())
+
+	def __init__(self, filename, description):
+		"""Memory-map the .npy file at filename (and the distinct values of a dictionary-encoded column)"""
+
+		self.filename = filename
+		self.description = description
+
+		self.mmap, self.values = self.map_npy(filename)
+		if description['type'] == 'category':
+			self.offsets_mmap, self.offsets = self.map_npy(self.get_offsets_filename(filename))
+			self.category_mmap, self.category_data = self.map_npy(self.get_values_filename(filename))
+
+	def __getitem__(self, index):
+
+		value = self.values[index]
+		column_type = self.description['type']
+
+		if column_type == 'category':
+			return self.get_category(value)
+		elif column_type == 'datetime':
+			return None if value == self.MISSING_DATETIME else self.EPOCH + timedelta(microseconds=value)
+		elif column_type == 'number':
+			if math.isnan(value):
+				return None
+			return int(value) if self.description['integer'] else value
+		else:
+			return value
+
+	def __len__(self):
+
+		return len(self.values)
+
+	def __reduce__(self):
+		"""Pickle the column's location and description rather than its memory maps"""
+
+		return self.__class__, (self.filename, self.description)
+
+	def get_category(self, code):
+		"""Decode the distinct value with the specified code in a dictionary-encoded column"""
+
+		return json.loads(self.category_data[self.offsets[code]:self.offsets[code + 1]].tobytes().decode('utf-8'))
+
+
+class SnapshotIndex:
+	"""A SnapshotIndex records the range of positions occupied by each key in a sequence of rows sorted by key
+
+	The sorted distinct keys (searched by bisection) and the start and end positions of their ranges are stored in memory-mapped columns, so nothing is read into memory when an index is loaded.
+	If the rows themselves are not sorted by key, the index also stores an order column holding the permutation of the rows that is sorted by key, and its ranges are positions in that column.
+	"""
+
+	@classmethod
+	def calculate_offsets(cls, keys):
+		"""Return a dictionary mapping each key to the [start, end) range of positions it occupies in the sorted sequence keys"""
+
+		offsets = {}
+		for position, key in enumerate(keys):
+			if key is not None:
+				if key in offsets:
+					offsets[key][1] = position + 1
+				else:
+					offsets[key] = [position, position + 1]
+		return offsets
+
+	@classmethod
+	def write(cls, path, prefix, keys, order=None):
+		"""Write an index of the ranges occupied by each key in the sorted sequence keys (and the permutation of the rows in that order, if any) to columns at path whose filenames begin with prefix, and return the index's description for the manifest"""
+
+		offsets = cls.calculate_offsets(keys)
+		sorted_keys = sorted(offsets)
+
+		columns = {
+			'keys':		sorted_keys,
+			'starts':	[offsets[key][0] for key in sorted_keys],
+			'ends':		[offsets[key][1] for key in sorted_keys]
+			}
+		if order is not None:
+			columns['order'] = order
+
+		description = {}
+		for name, values in columns.items():
+			filename = '{prefix}_{name}.npy'.format(prefix=prefix, name=name)
+			description[name] = SnapshotColumn.write(os.path.join(path, filename), values)
+			description[name]['file'] = filename
+		return description
+
+	def __init__(self, path, description):
+		"""Memory-map the columns of the index with the specified description"""
+
+		self.path = path
+		self.description = description
+
+		self.keys, self.starts, self.ends = (SnapshotColumn(os.path.join(path, description[name]['file']), description[name]) for name in ('keys', 'starts', 'ends'))
+		self.order = SnapshotColumn(os.path.join(path, description['order']['file']), description['order']) if 'order' in description else None
+
+	def __reduce__(self):
+		"""Pickle the index's location and description rather than its memory-mapped columns"""
+
+		return self.__class__, (self.path, self.description)
+
+	def find_range(self, key):
+		"""Return a range of the positions occupied by key, or None if key is not in the index"""
+
+		position = bisect_left(self.keys, key)
+		if position < len(self.keys) and self.keys[position] == key:
+			return range(self.starts[position], self.ends[position])
+
+
+class SnapshotRow:
+	"""A SnapshotRow provides dictionary-style, read-only access to a single row of a SnapshotCollection
+
+	Every row contains all keys stored in its collection, with None as the value of keys that were missing from the original document. Rows can be passed anywhere a document is expected (e.g. to create a CompactPerformance).
+	"""
+
+	__slots__ = ('collection', 'index')
+
+	def __init__(self, collection, index):
+		"""Initialize instance dependencies"""
+
+		self.collection = collection
+		self.index = index
+
+	def __contains__(self, key):
+
+		return key in self.collection.description['columns']
+
+	def __getitem__(self, key):
+
+		if key in self.collection.description['columns']:
+			return self.collection.get_column(key)[self.index]
+		raise KeyError(key)
+
+	def __iter__(self):
+
+		return iter(self.keys())
+
+	def __len__(self):
+
+		return len(self.keys())
+
+	def __reduce__(self):
+		"""Pickle the row by collection and index rather than by value"""
+
+		return self.__class__, (self.collection, self.index)
+
+	def get(self, key, default=None):
+		"""Return the value for key if present, else default"""
+
+		try:
+			return self[key]
+		except KeyError:
+			return default
+
+	def items(self):
+		"""Return a list of (key, value) tuples for the keys present in this row"""
+
+		return [(key, self[key]) for key in self.keys()]
+
+	def keys(self):
+		"""Return a list of the keys present in this row"""
+
+		return self.collection.keys
+
+
+from .horse import Horse
+from .jockey import Jockey
+from .meet import Meet
+from .performance import Performance
+from .performance_store import StoredPerformances
+from .race import Race
+from .runner import Runner
+from .trainer import Trainer
@@ -0,0 +1,419 @@
+from datetime import datetime
+import json
+import sqlite3
+import threading
+import uuid
+
+
+class SQLiteDatabase:
+	"""A SQLiteDatabase is an embedded, file-backed substitute for a pymongo database
+
+	Each collection is stored in its own table with one row per document, holding the document's _id in an indexed column and the document itself as JSON.
+	Filters, sorts and indexes are translated to SQL using json_extract, so create_index creates real expression indexes that are used by matching queries.
+	Datetimes are stored as tagged strings that sort in date order, and values of other types not supported by JSON (such as ObjectIds) are stored as strings.
+
+	All access to the underlying connection is serialized, so a SQLiteDatabase can be shared by the threads of a Processor. To use SQLite from multiple processes, pass a factory function (e.g. lambda: pyracing.SQLiteDatabase(path)) to pyracing.initialize so that each process opens its own connection.
+	"""
+
+	def __init__(self, path, mmap_size=256 * 1024 * 1024):
+		"""Open or create the database at the specified path
+
+		mmap_size specifies the maximum number of bytes of the database file to access via memory-mapped I/O.
+		"""
+
+		self.path = path
+		self.collections = {}
+		self.lock = threading.RLock()
+
+		self.connection = sqlite3.connect(path, check_same_thread=False)
+		self.connection.execute('PRAGMA journal_mode = WAL')
+		self.connection.execute('PRAGMA synchronous = NORMAL')
+		self.connection.execute('PRAGMA mmap_size = {mmap_size}'.format(mmap_size=int(mmap_size)))
+
+	def __getitem__(self, name):
+
+		with self.lock:
+			if not name in self.collections:
+				self.collections[name] = SQLiteCollection(name, self)
+			return self.collections[name]
+
+	def close(self):
+		"""Close the underlying connection"""
+
+		with self.lock:
+			self.connection.close()
+
+	def copy_from(self, database, collection_names, batch_size=1000):
+		"""Bulk load all documents in the named collections of another database (e.g. a pymongo database) into this database"""
+
+		for name in collection_names:
+			collection = self[name]
+			documents = []
+			for document in database[name].find({}):
+				documents.append(document)
+				if len(documents) >= batch_size:
+					collection.insert_many(documents)
+					documents = []
+			if len(documents) > 0:
+				collection.insert_many(documents)
+
+	def get_collection(self, name):
+		"""Get the collection with the specified name, creating it if necessary"""
+
+		return self[name]
+
+	def list_collection_names(self):
+		"""Get a list of the names of all collections in this database"""
+
+		with self.lock:
+			return [row[0] for row in self.connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+
+class SQLiteCollection:
+	"""A SQLiteCollection stores the documents for a single collection in a SQLiteDatabase table
+
+	Filters support equality and the $in, $ne, $lt, $lte, $gt and $gte operators, and updates support $set and $unset.
+	"""
+
+	def __init__(self, name, database):
+		"""Create the collection's table if it does not already exist"""
+
+		self.name = name
+		self.database = database
+		self.table = quote_identifier(name)
+
+		with self.database.lock, self.database.connection:
+			self.database.connection.execute('CREATE TABLE IF NOT EXISTS {table} (id TEXT PRIMARY KEY, document TEXT NOT NULL)'.format(table=self.table))
+
+	def create_index(self, index, **kwargs):
+		"""Create an expression index on the keys in the specified index specification"""
+
+		if isinstance(index, str):
+			index = [(index, 1)]
+
+		name = '_'.join(['{name}'.format(name=self.name)] + ['{key}_{direction}'.format(key=key, direction=direction) for key, direction in index])
+		expressions = ', '.join('{expression} {order}'.format(expression=extract(key), order='DESC' if direction < 0 else 'ASC') for key, direction in index)
+
+		with self.database.lock, self.database.connection:
+			self.database.connection.execute('CREATE INDEX IF NOT EXISTS {name} ON {table} ({expressions})'.format(name=quote_identifier(name), table=self.table, expressions=expressions))
+
+		return name
+
+	def delete_many(self, filter):
+		"""Delete all documents matching filter"""
+
+		where, parameters = translate_filter(filter)
+		with self.database.lock, self.database.connection:
+			cursor = self.database.connection.execute('DELETE FROM {table} WHERE {where}'.format(table=self.table, where=where), parameters)
+
+		return SQLiteResult(deleted_count=cursor.rowcount)
+
+	def delete_one(self, filter):
+		"""Delete the first document matching filter"""
+
+		where, parameters = translate_filter(filter)
+		with self.database.lock, self.database.connection:
+			cursor = self.database.connection.execute('DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {where} LIMIT 1)'.format(table=self.table, where=where), parameters)
+
+		return SQLiteResult(deleted_count=cursor.rowcount)
+
+	def find(self, filter=None, sort=None):
+		"""Get a cursor over the documents matching filter"""
+
+		cursor = SQLiteCursor(self, filter)
+		if sort is not None:
+			cursor = cursor.sort(sort)
+		return cursor
+
+	def find_one(self, filter=None):
+		"""Get the first document matching filter, or None if there are no matching documents"""
+
+		for document in self.find(filter).limit(1):
+			return document
+
+	def insert_many(self, documents):
+		"""Insert documents in a single transaction, adding a new _id to each document that does not already have one"""
+
+		rows = []
+		for document in documents:
+			if not '_id' in document:
+				document['_id'] = uuid.uuid4().hex
+			rows.append((encode_id(document['_id']), encode_document(document)))
+
+		with self.database.lock, self.database.connection:
+			self.database.connection.executemany('INSERT INTO {table} (id, document) VALUES (?, ?)'.format(table=self.table), rows)
+
+		return SQLiteResult(inserted_ids=[document['_id'] for document in documents])
+
+	def insert_one(self, document):
+		"""Insert document, adding a new _id to document if it does not already have one"""
+
+		return SQLiteResult(inserted_id=self.insert_many([document]).inserted_ids[0])
+
+	def replace_one(self, filter, replacement, upsert=False):
+		"""Replace the first document matching filter with replacement"""
+
+		with self.database.lock, self.database.connection:
+			for id, document in self.find_rows(filter, 1):
+				replacement = dict(replacement)
+				replacement['_id'] = document['_id']
+				self.write_row(id, replacement)
+				return SQLiteResult(matched_count=1, modified_count=1)
+
+			if upsert:
+				self.insert_one(dict(replacement))
+
+		return SQLiteResult(matched_count=0, modified_count=0)
+
+	def update_many(self, filter, update):
+		"""Apply the $set and $unset operators in update to all documents matching filter"""
+
+		return self.update_rows(filter, update, None)
+
+	def update_one(self, filter, update):
+		"""Apply the $set and $unset operators in update to the first document matching filter"""
+
+		return self.update_rows(filter, update, 1)
+
+	def with_options(self, **kwargs):
+		"""Return this collection, as read preferences and write concerns have no meaning for an embedded database"""
+
+		return self
+
+	def find_rows(self, filter, limit=None):
+		"""Get a list of (id, document) tuples for the stored documents matching filter"""
+
+		where, parameters = translate_filter(filter)
+		sql = 'SELECT id, document FROM {table} WHERE {where}'.format(table=self.table, where=where)
+		if limit is not None:
+			sql += ' LIMIT {limit}'.format(limit=int(limit))
+
+		with self.database.lock:
+			return [(id, decode_document(document)) for id, document in self.database.connection.execute(sql, parameters)]
+
+	def update_rows(self, filter, update, limit):
+		"""Apply the $set and $unset operators in update to the documents matching filter, up to limit documents"""
+
+		with self.database.lock, self.database.connection:
+			rows = self.find_rows(filter, limit)
+			for id, document in rows:
+				for key, value in update.get('$set', {}).items():
+					document[key] = value
+				for key in update.get('$unset', {}):
+					document.pop(key, None)
+				self.write_row(id, document)
+
+		return SQLiteResult(matched_count=len(rows), modified_count=len(rows))
+
+	def write_row(self, id, document):
+		"""Overwrite the stored document with the specified id"""
+
+		self.database.connection.execute('UPDATE {table} SET document = ? WHERE id = ?'.format(table=self.table), (encode_document(document), id))
+
+
+class SQLiteCursor:
+	"""A SQLiteCursor iterates over the documents in a SQLiteCollection matching a filter
+
+	Matching rows are fetched from the database in batches of batch_count rows as the cursor is consumed, and each document is decoded from JSON as it is consumed, so the full result set is never held in memory at once.
+	The database's lock is only held while each batch is fetched, so other threads can use the database while a cursor is being consumed.
+	"""
+
+	DEFAULT_BATCH_SIZE = 1000
+
+	def __init__(self, collection, filter):
+		"""Initialize instance dependencies"""
+
+		self.collection = collection
+		self.filter = filter
+		self.sort_keys = []
+		self.limit_count = 0
+		self.batch_count = self.DEFAULT_BATCH_SIZE
+
+	def __iter__(self):
+
+		where, parameters = translate_filter(self.filter)
+		sql = 'SELECT document FROM {table} WHERE {where}'.format(table=self.collection.table, where=where)
+		if len(self.sort_keys) > 0:
+			sql += ' ORDER BY ' + ', '.join('{expression} {order}'.format(expression=extract(key), order='DESC' if direction < 0 else 'ASC') for key, direction in self.sort_keys)
+		if self.limit_count > 0:
+			sql += ' LIMIT {limit}'.format(limit=int(self.limit_count))
+
+		with self.collection.database.lock:
+			cursor = self.collection.database.connection.execute(sql, parameters)
+
+		try:
+			while True:
+				with self.collection.database.lock:
+					rows = cursor.fetchmany(self.batch_count)
+				if len(rows) < 1:
+					break
+				for row in rows:
+					yield decode_document(row[0])
+		finally:
+			with self.collection.database.lock:
+				cursor.close()
+
+	def batch_size(self, batch_size):
+		"""Set the number of rows fetched from the database per batch"""
+
+		self.batch_count = max(1, int(batch_size))
+		return self
+
+	def limit(self, limit):
+		"""Limit the number of documents returned by this cursor"""
+
+		self.limit_count = limit
+		return self
+
+	def sort(self, key, direction=1):
+		"""Sort the documents returned by this cursor by a list of (key, direction) tuples, or by a single key and direction"""
+
+		if isinstance(key, str):
+			self.sort_keys = [(key, direction)]
+		else:
+			self.sort_keys = list(key)
+		return self
+
+
+class SQLiteResult:
+	"""A SQLiteResult holds the result of a write operation on a SQLiteCollection"""
+
+	def __init__(self, **kwargs):
+		"""Initialize instance dependencies"""
+
+		self.__dict__.update(kwargs)
+
+
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+DATETIME_TAG = '$date:'
+
+OPERATORS = {
+	'$gt':	'>',
+	'$gte':	'>=',
+	'$lt':	'<',
+	'$lte':	'<='
+	}
+
+
+def decode_document(text):
+	"""Decode a document stored as JSON"""
+
+	return decode_value(json.loads(text))
+
+
+def decode_value(value):
+	"""Decode a stored value, converting tagged strings back to datetimes"""
+
+	if isinstance(value, str) and value.startswith(DATETIME_TAG):
+		return datetime.strptime(value[len(DATETIME_TAG):], DATETIME_FORMAT)
+	elif isinstance(value, dict):
+		return dict((key, decode_value(item)) for key, item in value.items())
+	elif isinstance(value, list):
+		return [decode_value(item) for item in value]
+	else:
+		return value
+
+
+def encode_document(document):
+	"""Encode a document as JSON"""
+
+	return json.dumps(encode_value(document), separators=(',', ':'))
+
+
+def encode_id(id):
+	"""Encode a database ID for storage in the id column"""
+
+	return json.dumps(encode_value(id))
+
+
+def encode_value(value):
+	"""Encode a value for storage as JSON, converting datetimes to tagged strings that sort in date order"""
+
+	if isinstance(value, datetime):
+		return DATETIME_TAG + value.strftime(DATETIME_FORMAT)
+	elif isinstance(value, dict):
+		return dict((str(key), encode_value(item)) for key, item in value.items())
+	elif isinstance(value, (list, tuple)):
+		return [encode_value(item) for item in value]
+	elif value is None or isinstance(value, (str, int, float)):
+		return value
+	else:
+		return str(value)
+
+
+def extract(key):
+	"""Return a SQL expression extracting the value for key from the document column"""
+
+	return "json_extract(document, '$.{path}')".format(path='.'.join('"{part}"'.format(part=part.replace("'", "''").replace('"', '')) for part in key.split('.')))
+
+
+def quote_identifier(identifier):
+	"""Quote identifier for use in SQL"""
+
+	return '"{identifier}"'.format(identifier=identifier.replace('"', '""'))
+
+
+def translate_condition(key, condition):
+	"""Translate the filter condition for key to a tuple of (SQL expression, parameters)"""
+
+	if key == '_id':
+		expression = 'id'
+		encode = encode_id
+	else:
+		expression = extract(key)
+		encode = encode_value
+
+	if not (isinstance(condition, dict) and len(condition) > 0 and all(operator.startswith('$') for operator in condition)):
+		condition = {'$eq': condition}
+
+	clauses = []
+	parameters = []
+	for operator, operand in condition.items():
+		if operator == '$eq':
+			if operand is None:
+				clauses.append('{expression} IS NULL'.format(expression=expression))
+			else:
+				clauses.append('{expression} = ?'.format(expression=expression))
+				parameters.append(encode(operand))
+		elif operator == '$ne':
+			if operand is None:
+				clauses.append('{expression} IS NOT NULL'.format(expression=expression))
+			else:
+				clauses.append('({expression} IS NULL OR {expression} != ?)'.format(expression=expression))
+				parameters.append(encode(operand))
+		elif operator == '$in':
+			values = [value for value in operand if value is not None]
+			options = []
+			if len(values) > 0:
+				options.append('{expression} IN ({placeholders})'.format(expression=expression, placeholders=', '.join('?' for value in values)))
+				parameters.extend(encode(value) for value in values)
+			if len(values) < len(operand):
+				options.append('{expression} IS NULL'.format(expression=expression))
+			clauses.append('({options})'.format(options=' OR '.join(options)) if len(options) > 0 else '0')
+		elif operator in OPERATORS:
+			clauses.append('{expression} {operator} ?'.format(expression=expression, operator=OPERATORS[operator]))
+			parameters.append(encode(operand))
+		else:
+			raise ValueError('Unsupported query operator: {operator}'.format(operator=operator))
+
+	for operand in parameters:
+		if isinstance(operand, (dict, list)):
+			raise ValueError('Queries on list or dictionary values are not supported')
+
+	return ' AND '.join(clauses), parameters
+
+
+def translate_filter(filter):
+	"""Translate a pymongo-style filter to a tuple of (SQL WHERE clause, parameters)"""
+
+	clauses = []
+	parameters = []
+	for key, condition in (filter or {}).items():
+		clause, condition_parameters = translate_condition(key, condition)
+		clauses.append(clause)
+		parameters.extend(condition_parameters)
+
+	if len(clauses) > 0:
+		return ' AND '.join(clauses), parameters
+	else:
+		return '1', []
@@ -5,5 +5,16 @@ from .horses import *
 from .jockeys import *
 from .trainers import *
 from .performances import *
+from .compact_performances import *
 from .performance_lists import *
+from .cumulative_statistics import *
+from .runner_features import *
 from .processor import *
+from .event_dispatcher import *
+from .entities import *
+from .write_buffer import *
+from .memory_database import *
+from .sqlite_database import *
+from .snapshots import *
+from .performance_stores import *
+from .serialization import *
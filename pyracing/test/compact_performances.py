@@ -0,0 +1,69 @@
+from .common import *
+
+
+class CompactPerformanceTest(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+
+		cls.values = {
+			'result':				3,
+			'starters':				12,
+			'track':				'Echuca',
+			'date':					datetime(2016, 4, 10),
+			'distance':				1209,
+			'track_condition':		'Good 4',
+			'runner_prize_money':	1600.00,
+			'race_prize_money':		20000.00,
+			'barrier':				15,
+			'winning_time':			73.2,
+			'starting_price':		6.50,
+			'horse_url':			'/horses/Tycoon-Tony_395471/',
+			'jockey_url':			'/jockeys/Mark-Pegus_980/',
+			'weight':				60.5,
+			'carried':				60.5,
+			'lengths':				0.30
+		}
+		cls.performance = pyracing.Performance(cls.values)
+		cls.compact_performance = pyracing.CompactPerformance(cls.values)
+
+	def test_key_access(self):
+		"""CompactPerformance objects should support the same key access as Performance objects"""
+
+		for key in self.values:
+			self.assertIn(key, self.compact_performance)
+			self.assertEqual(self.performance[key], self.compact_performance[key])
+
+	def test_missing_key(self):
+		"""CompactPerformance objects should raise a KeyError for keys that are not present"""
+
+		self.assertNotIn('_id', self.compact_performance)
+		with self.assertRaises(KeyError):
+			self.compact_performance['_id']
+
+	def test_read_only(self):
+		"""CompactPerformance objects should not allow their values to be changed"""
+
+		with self.assertRaises(TypeError):
+			self.compact_performance['result'] = 1
+		with self.assertRaises(AttributeError):
+			self.compact_performance.result = 1
+
+	def test_calculated_values(self):
+		"""CompactPerformance objects should expose the same calculated values as Performance objects"""
+
+		for name in ('actual_distance', 'actual_weight', 'momentum', 'speed'):
+			self.assertEqual(getattr(self.performance, name), getattr(self.compact_performance, name))
+
+	def test_performance_list(self):
+		"""CompactPerformance objects should be usable in a PerformanceList"""
+
+		performance_list = pyracing.PerformanceList([self.compact_performance])
+
+		self.assertEqual(self.performance.momentum, performance_list.average_momentum)
+		self.assertEqual(1, performance_list.thirds)
+
+	def test_to_performance(self):
+		"""The to_performance method should return a Performance object containing the same values"""
+
+		self.assertEqual(self.performance, self.compact_performance.to_performance())
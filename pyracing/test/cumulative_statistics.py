@@ -0,0 +1,77 @@
+from .common import *
+from .performance_lists import create_performances
+
+
+class CumulativeStatisticsTest(unittest.TestCase):
+
+	UNSUPPORTED_STATISTICS = ('maximum_momentum', 'minimum_momentum')
+
+	@classmethod
+	def setUpClass(cls):
+
+		cls.performances = create_performances()
+		cls.cumulative_statistics = pyracing.CumulativeStatistics(cls.performances)
+
+	def test_get_statistics_as_of(self):
+		"""The get_statistics_as_of method should return the same statistics as a PerformanceList of all performances prior to the specified date"""
+
+		for date in [performance['date'] for performance in self.performances] + [datetime(2015, 1, 1), datetime(2017, 1, 1)]:
+			self.check_statistics(pyracing.PerformanceList([performance for performance in self.performances if performance['date'] < date]), self.cumulative_statistics.get_statistics_as_of(date))
+
+	def test_get_statistics(self):
+		"""The get_statistics method should return the same statistics as a PerformanceList of all performances within the specified date range"""
+
+		date_from = datetime(2015, 9, 1)
+		date_to = datetime(2016, 3, 1)
+
+		self.check_statistics(pyracing.PerformanceList([performance for performance in self.performances if date_from <= performance['date'] < date_to]), self.cumulative_statistics.get_statistics(date_from, date_to))
+
+	def test_get_statistics_for_last(self):
+		"""The get_statistics_for_last method should return the same statistics as a PerformanceList of the specified number of most recent performances"""
+
+		date = datetime(2016, 2, 17)
+
+		self.check_statistics(pyracing.PerformanceList(pyracing.PerformanceList([performance for performance in self.performances if performance['date'] < date])[:4]), self.cumulative_statistics.get_statistics_for_last(4, date))
+
+	def check_statistics(self, performance_list, statistics):
+		"""Check that the statistics match the corresponding properties of the performance list"""
+
+		self.assertEqual(set(pyracing.PerformanceList.STATISTICS) - set(self.UNSUPPORTED_STATISTICS), set(statistics))
+
+		for statistic in statistics:
+			expected_value = getattr(performance_list, statistic)
+			if expected_value is None:
+				self.assertIsNone(statistics[statistic])
+			else:
+				self.assertAlmostEqual(expected_value, statistics[statistic])
+
+
+class JockeyCumulativeStatisticsTest(unittest.TestCase):
+
+	def setUp(self):
+
+		pyracing.Jockey.clear_cumulative_statistics()
+
+		self.jockey = pyracing.Jockey({'url': '/jockeys/0/'})
+		self.jockey.cache['performances'] = create_performances()
+
+	def tearDown(self):
+
+		pyracing.Jockey.clear_cumulative_statistics()
+
+	def test_shared(self):
+		"""Jockey objects with the same profile URL should share cumulative statistics"""
+
+		other_jockey = pyracing.Jockey({'url': '/jockeys/0/'})
+
+		self.assertIs(self.jockey.cumulative_statistics, other_jockey.cumulative_statistics)
+
+	def test_latest_as_of(self):
+		"""Only the cumulative statistics for the most recent as-of date should be kept for each jockey"""
+
+		for date in (datetime(2016, 1, 1), datetime(2016, 2, 1), datetime(2016, 3, 1)):
+			with pyracing.as_of(date):
+				statistics = self.jockey.cumulative_statistics
+
+		self.assertEqual(['/jockeys/0/'], list(pyracing.Jockey.cumulative_statistics_cache.keys()))
+		self.assertIs(statistics, self.jockey.cumulative_statistics_cache['/jockeys/0/'][1])
@@ -0,0 +1,190 @@
+from .common import *
+
+
+class EntityChangesTest(unittest.TestCase):
+
+	def setUp(self):
+
+		self.entity = pyracing.Entity({'_id': 1, 'name': 'name', 'values': [1, 2]})
+
+	def test_no_changes(self):
+		"""An entity that has not been modified since it was loaded should have no changes"""
+
+		self.assertEqual({}, self.entity.get_changes())
+
+	def test_set(self):
+		"""Keys set since the entity was loaded should be included in $set"""
+
+		self.entity['name'] = 'new name'
+		self.entity.update(number=1)
+		self.entity.setdefault('distance', 1000)
+
+		self.assertEqual({'$set': {'name': 'new name', 'number': 1, 'distance': 1000}}, self.entity.get_changes())
+
+	def test_unset(self):
+		"""Keys deleted since the entity was loaded should be included in $unset"""
+
+		del self.entity['name']
+		self.entity.pop('values')
+
+		self.assertEqual({'$unset': {'name': '', 'values': ''}}, self.entity.get_changes())
+
+	def test_mark_changed(self):
+		"""Keys marked as changed should be included in $set"""
+
+		self.entity['values'].append(3)
+		self.entity.mark_changed('values')
+
+		self.assertEqual({'$set': {'values': [1, 2, 3]}}, self.entity.get_changes())
+
+	def test_mark_all_changed(self):
+		"""Marking no specific keys as changed should include all keys except _id in $set"""
+
+		self.entity.mark_changed()
+
+		self.assertEqual({'$set': {'name': 'name', 'values': [1, 2]}}, self.entity.get_changes())
+
+
+class EntityDatabaseTest(unittest.TestCase):
+
+	class Collection:
+
+		def __init__(self, name, options=None):
+
+			self.name = name
+			self.options = options
+
+		def with_options(self, **options):
+
+			return self.__class__(self.name, options)
+
+	class Database:
+
+		def __getitem__(self, name):
+
+			return EntityDatabaseTest.Collection(name)
+
+	def setUp(self):
+
+		self.database = pyracing.Entity.database
+		self.factory_calls = 0
+
+	def tearDown(self):
+
+		pyracing.Entity.database = self.database
+		pyracing.Performance.set_collection_options()
+
+	def factory(self):
+
+		self.factory_calls += 1
+		return self.Database()
+
+	def test_cached_collections(self):
+		"""Collection handles should be created once and reused"""
+
+		pyracing.Entity.database = self.Database()
+
+		self.assertIs(pyracing.Meet.get_database_collection(), pyracing.Meet.get_database_collection())
+		self.assertEqual('meets', pyracing.Meet.get_database_collection().name)
+		self.assertEqual('runner_features', pyracing.RunnerFeatures.get_database_collection().name)
+
+	def test_factory(self):
+		"""A database factory should be called once per process"""
+
+		pyracing.Entity.database = self.factory
+
+		pyracing.Meet.get_database_collection()
+		pyracing.Race.get_database_collection()
+
+		self.assertEqual(1, self.factory_calls)
+
+	def test_collection_options(self):
+		"""Collection options should be applied to the specified entity type only"""
+
+		pyracing.Entity.database = self.Database()
+		pyracing.Performance.set_collection_options(read_preference='secondaryPreferred')
+
+		self.assertEqual({'read_preference': 'secondaryPreferred', 'write_concern': None}, pyracing.Performance.get_database_collection().options)
+		self.assertIsNone(pyracing.Meet.get_database_collection().options)
+
+
+class EntityVersionTest(unittest.TestCase):
+
+	class Item(pyracing.Entity):
+
+		pass
+
+	def setUp(self):
+
+		self.database = pyracing.Entity.database
+		self.session_id = pyracing.Entity.SESSION_ID
+		pyracing.Entity.database = pyracing.MemoryDatabase()
+		pyracing.Entity.versioned = True
+
+		self.before_scrape = datetime.now()
+		self.scrape({'url': 'item', 'value': 1})
+		self.before_rescrape = datetime.now()
+		pyracing.Entity.SESSION_ID = datetime.now()
+		self.scrape({'url': 'item', 'value': 2}, expiry_date=datetime.now())
+
+	def tearDown(self):
+
+		pyracing.Entity.database = self.database
+		pyracing.Entity.SESSION_ID = self.session_id
+		pyracing.Entity.versioned = False
+
+	def scrape(self, values, expiry_date=None):
+
+		return self.Item.find_or_scrape_one({'url': 'item'}, scrape=lambda: values, expiry_date=expiry_date)
+
+	def test_current(self):
+		"""Reads outside an as_of context should only find the current version"""
+
+		self.assertEqual(2, self.Item.find_one({'url': 'item'})['value'])
+		self.assertEqual(1, len(self.Item.find({'url': 'item'})))
+		self.assertEqual(2, len(list(self.Item.get_database_collection().find({}))))
+
+	def test_as_of(self):
+		"""Reads within an as_of context should find the version current at the as-of date"""
+
+		with pyracing.as_of(self.before_rescrape):
+			self.assertEqual(1, self.Item.find_one({'url': 'item'})['value'])
+			self.assertEqual([1], [item['value'] for item in self.Item.find({'url': 'item'})])
+
+		with pyracing.as_of(self.before_scrape):
+			self.assertIsNone(self.Item.find_one({'url': 'item'}))
+
+	def test_iter_find_as_of(self):
+		"""Generators created by iter_find within an as_of context should read as of that date when consumed after the context exits"""
+
+		with pyracing.as_of(self.before_rescrape):
+			items = self.Item.iter_find({'url': 'item'})
+
+		self.assertEqual([1], [item['value'] for item in items])
+
+	def test_supersede_cascade(self):
+		"""Superseding a meet should also supersede its races and their runners"""
+
+		meet = pyracing.Meet({'track': 'Flemington', 'date': historical_date, 'scraped_at': datetime.now()})
+		meet.save()
+		race = pyracing.Race({'meet_id': meet['_id'], 'number': 1, 'scraped_at': datetime.now()})
+		race.save()
+		runner = pyracing.Runner({'race_id': race['_id'], 'number': 1, 'scraped_at': datetime.now()})
+		runner.save()
+		before_supersede = datetime.now()
+
+		meet.supersede()
+
+		self.assertEqual([], pyracing.Race.find({'meet_id': meet['_id']}))
+		self.assertEqual([], pyracing.Runner.find({'race_id': race['_id']}))
+		with pyracing.as_of(before_supersede):
+			self.assertEqual([race['_id']], [item['_id'] for item in pyracing.Race.find({'meet_id': meet['_id']})])
+			self.assertEqual([runner['_id']], [item['_id'] for item in pyracing.Runner.find({'race_id': race['_id']})])
+
+	def test_as_of_no_scrape(self):
+		"""find_or_scrape methods should not scrape within an as_of context"""
+
+		with pyracing.as_of(self.before_scrape):
+			self.assertIsNone(self.scrape({'url': 'item', 'value': 3}))
+
+		self.assertEqual(2, len(list(self.Item.get_database_collection().find({}))))
@@ -0,0 +1,78 @@
+from .common import *
+
+
+class EventDispatcherTest(unittest.TestCase):
+
+	def setUp(self):
+
+		self.event_dispatcher = pyracing.EventDispatcher(batch_size=3, flush_interval=60)
+		self.received = []
+
+	def test_synchronous(self):
+		"""Synchronous subscribers should be called before publish_event returns"""
+
+		self.event_dispatcher.add_subscriber('saved_meet', self.received.append)
+
+		self.event_dispatcher.publish_event('saved_meet', ['meet'])
+
+		self.assertEqual(['meet'], self.received)
+
+	def test_asynchronous(self):
+		"""Asynchronous subscribers should receive all published events once flush returns"""
+
+		self.event_dispatcher.add_subscriber('saved_meet', self.received.append, asynchronous=True)
+
+		for index in range(5):
+			self.event_dispatcher.publish_event('saved_meet', [index])
+		self.event_dispatcher.flush()
+
+		self.assertEqual(list(range(5)), self.received)
+
+	def test_batch(self):
+		"""Batch subscribers should receive lists of entities no larger than the batch size"""
+
+		self.event_dispatcher.add_subscriber('saved_meet', self.received.append, asynchronous=True, batch=True)
+
+		for index in range(5):
+			self.event_dispatcher.publish_event('saved_meet', [index])
+		self.event_dispatcher.flush()
+
+		self.assertEqual([[0, 1, 2], [3, 4]], self.received)
+
+	def test_batch_requires_asynchronous(self):
+		"""Adding a synchronous batch subscriber should raise a ValueError"""
+
+		with self.assertRaises(ValueError):
+			self.event_dispatcher.add_subscriber('saved_meet', self.received.append, batch=True)
+
+	def test_exception(self):
+		"""Exceptions raised by asynchronous subscribers should be raised by flush"""
+
+		def handler(entity):
+			raise RuntimeError(entity)
+
+		self.event_dispatcher.add_subscriber('saved_meet', handler, asynchronous=True)
+
+		with self.assertLogs('pyracing.event_dispatcher'):
+			self.event_dispatcher.publish_event('saved_meet', ['meet'])
+			with self.assertRaises(RuntimeError):
+				self.event_dispatcher.flush()
+
+	def test_multiple_exceptions(self):
+		"""flush should raise the first exception raised by asynchronous subscribers, and log every exception"""
+
+		def handler(entity):
+			raise RuntimeError(entity)
+
+		self.event_dispatcher.add_subscriber('saved_meet', handler, asynchronous=True)
+
+		with self.assertLogs('pyracing.event_dispatcher') as logs:
+			self.event_dispatcher.publish_event('saved_meet', ['first'])
+			self.event_dispatcher.publish_event('saved_meet', ['second'])
+			with self.assertRaises(RuntimeError) as context:
+				self.event_dispatcher.flush()
+
+		self.assertEqual(('first',), context.exception.args)
+		self.assertEqual(2, len(logs.records))
+		self.event_dispatcher.flush()
+
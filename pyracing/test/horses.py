@@ -62,6 +62,34 @@ class HorsePropertiesTest(EntityTest):
 
 		self.assertEqual(pyracing.Performance.get_performances_by_horse(runner.horse), runner.horse.performances)
 
+	def test_get_performance_by_track_and_date(self):
+		"""The get_performance_by_track_and_date method should return the horse's performance at the specified track on the specified date"""
+
+		meet = pyracing.Meet.get_meets_by_date(historical_date)[0]
+		race = meet.races[0]
+		runner = race.runners[0]
+
+		for performance in runner.horse.performances:
+			self.assertEqual(performance['date'], runner.horse.get_performance_by_track_and_date(performance['track'], performance['date'])['date'])
+		self.assertIsNone(runner.horse.get_performance_by_track_and_date('Nowhere', historical_date))
+
+	def test_get_preparations(self):
+		"""The get_preparations method should return the preparation and UP numbers for each of the horse's performances"""
+
+		meet = pyracing.Meet.get_meets_by_date(historical_date)[0]
+		race = meet.races[0]
+		runner = race.runners[0]
+
+		preparations = runner.horse.get_preparations(pyracing.Runner.REST_PERIOD)
+
+		self.assertEqual(len(runner.horse.performances), len(preparations))
+		self.assertEqual((1, 1), preparations[-1])
+		for index in range(len(preparations) - 1):
+			if runner.horse.performances[index]['date'] - runner.horse.performances[index + 1]['date'] < pyracing.Runner.REST_PERIOD:
+				self.assertEqual((preparations[index + 1][0], preparations[index + 1][1] + 1), preparations[index])
+			else:
+				self.assertEqual((preparations[index + 1][0] + 1, 1), preparations[index])
+
 
 class DeleteHorseTest(EntityTest):
 
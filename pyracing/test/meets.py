@@ -29,6 +29,48 @@ class GetHistoricalMeetsByDateTest(EntityTest):
 		self.check_no_rescrape(pyracing.Meet.get_meets_by_date, historical_date)
 
 
+class GetMeetsBetweenTest(EntityTest):
+
+	@classmethod
+	def setUpClass(cls):
+
+		for meet in pyracing.Meet.get_meets_by_date(historical_date):
+			for race in meet.races:
+				race.runners
+
+		cls.meets = pyracing.Meet.get_meets_between(historical_date, historical_date)
+
+	def test_types(self):
+		"""The get_meets_between method should return a list of Meet objects"""
+
+		self.check_types(self.meets, list, pyracing.Meet)
+
+	def test_dates(self):
+		"""All Meet objects returned by get_meets_between should occur within the specified date range"""
+
+		for meet in self.meets:
+			self.assertEqual(historical_date, meet['date'])
+
+	def test_races(self):
+		"""The get_meets_between method should preload the races for each meet"""
+
+		for meet in self.meets:
+			self.assertIn('races', meet.cache)
+			self.assertEqual([race['_id'] for race in pyracing.Race.get_races_by_meet(meet)], [race['_id'] for race in meet.races])
+			for race in meet.races:
+				self.assertIs(meet, race.meet)
+
+	def test_runners(self):
+		"""The get_meets_between method should preload the runners for each race"""
+
+		for meet in self.meets:
+			for race in meet.races:
+				self.assertIn('runners', race.cache)
+				self.assertEqual([runner['_id'] for runner in pyracing.Runner.get_runners_by_race(race)], [runner['_id'] for runner in race.runners])
+				for runner in race.runners:
+					self.assertIs(race, runner.race)
+
+
 class GetFutureMeetsByDateTest(EntityTest):
 
 	def test_rescrape(self):
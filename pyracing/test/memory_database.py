@@ -0,0 +1,101 @@
+from .common import *
+
+
+class DatabaseTests:
+	"""Tests shared by all database backends, which are run by mixing this class into a TestCase that implements create_database"""
+
+	def setUp(self):
+
+		self.collection = self.create_database()['performances']
+		self.collection.create_index([('horse_url', 1), ('date', -1)])
+
+		for index in range(10):
+			self.collection.insert_one({'horse_url': 'horse {number}'.format(number=index % 3), 'date': datetime(2016, 1, index + 1), 'values': [index]})
+
+	def test_insert_one(self):
+		"""insert_one should add a new _id to the inserted document"""
+
+		document = {'horse_url': 'horse 4'}
+		result = self.collection.insert_one(document)
+
+		self.assertIn('_id', document)
+		self.assertEqual(document['_id'], result.inserted_id)
+		self.assertEqual(document, self.collection.find_one({'_id': document['_id']}))
+
+	def test_equality(self):
+		"""find should return documents with equal values using the index"""
+
+		documents = list(self.collection.find({'horse_url': 'horse 1'}))
+
+		self.assertEqual(3, len(documents))
+		for document in documents:
+			self.assertEqual('horse 1', document['horse_url'])
+
+	def test_operators(self):
+		"""find should support the $in, $ne, $lt, $lte, $gt and $gte operators"""
+
+		self.assertEqual(7, len(list(self.collection.find({'horse_url': {'$in': ['horse 0', 'horse 1']}}))))
+		self.assertEqual(6, len(list(self.collection.find({'horse_url': {'$ne': 'horse 0'}}))))
+		self.assertEqual(3, len(list(self.collection.find({'date': {'$lt': datetime(2016, 1, 4)}}))))
+		self.assertEqual(4, len(list(self.collection.find({'date': {'$lte': datetime(2016, 1, 4)}}))))
+		self.assertEqual(6, len(list(self.collection.find({'date': {'$gt': datetime(2016, 1, 4)}}))))
+		self.assertEqual(3, len(list(self.collection.find({'date': {'$gte': datetime(2016, 1, 4), '$lt': datetime(2016, 1, 7)}}))))
+
+	def test_sort(self):
+		"""Cursors should sort documents by multiple keys"""
+
+		documents = list(self.collection.find({}).sort([('horse_url', 1), ('date', -1)]))
+
+		self.assertEqual([(document['horse_url'], document['date']) for document in documents], sorted([(document['horse_url'], document['date']) for document in documents], key=lambda key: (key[0], -key[1].toordinal())))
+
+	def test_updates(self):
+		"""update_one, update_many and replace_one should modify stored documents and indexes"""
+
+		document = self.collection.find_one({'horse_url': 'horse 0'})
+
+		self.collection.update_one({'_id': document['_id']}, {'$set': {'horse_url': 'horse 5'}, '$unset': {'values': ''}})
+		self.assertEqual({'_id': document['_id'], 'horse_url': 'horse 5', 'date': document['date']}, self.collection.find_one({'horse_url': 'horse 5'}))
+
+		self.collection.update_many({'horse_url': 'horse 1'}, {'$set': {'horse_url': 'horse 6'}})
+		self.assertEqual(3, len(list(self.collection.find({'horse_url': 'horse 6'}))))
+
+		self.collection.replace_one({'_id': document['_id']}, {'horse_url': 'horse 7'})
+		self.assertEqual({'_id': document['_id'], 'horse_url': 'horse 7'}, self.collection.find_one({'horse_url': 'horse 7'}))
+		self.assertIsNone(self.collection.find_one({'horse_url': 'horse 5'}))
+
+	def test_deletes(self):
+		"""delete_one and delete_many should remove stored documents"""
+
+		self.assertEqual(1, self.collection.delete_one({'horse_url': 'horse 0'}).deleted_count)
+		self.assertEqual(3, self.collection.delete_many({'horse_url': 'horse 0'}).deleted_count)
+		self.assertIsNone(self.collection.find_one({'horse_url': 'horse 0'}))
+
+	def test_copies(self):
+		"""Modifying a returned document should not modify the stored document"""
+
+		document = self.collection.find_one({'horse_url': 'horse 0'})
+		document['values'].append(1)
+
+		self.assertEqual(1, len(self.collection.find_one({'_id': document['_id']})['values']))
+
+	def test_entities(self):
+		"""Entities should be saved to and loaded from the database"""
+
+		database = pyracing.Entity.database
+		pyracing.Entity.database = self.create_database()
+		try:
+			meet = pyracing.Meet({'track': 'Flemington', 'date': historical_date})
+			meet.save()
+			meet['track'] = 'Randwick'
+			meet.save()
+
+			self.assertEqual(meet, pyracing.Meet.find_one({'_id': meet['_id']}))
+		finally:
+			pyracing.Entity.database = database
+
+
+class MemoryDatabaseTest(DatabaseTests, unittest.TestCase):
+
+	def create_database(self):
+
+		return pyracing.MemoryDatabase()
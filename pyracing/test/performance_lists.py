@@ -1,218 +1,273 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import unittest
 
 import pyracing
 
 
+def create_performances():
+	"""Create the performances used by the PerformanceList and CumulativeStatistics tests"""
+
+	performances = [
+		{
+			'result':				10,
+			'starters':				13,
+			'track':				'Wangaratta',
+			'date':					datetime(2016, 4, 21),
+			'distance':				1170,
+			'track_condition':		'Good 4',
+			'runner_prize_money':	500.00,
+			'race_prize_money':		20000.00,
+			'barrier':				16,
+			'winning_time':			68.66,
+			'starting_price':		6.50,
+			'horse_url':			'/horses/Tycoon-Tony_395471/',
+			'jockey_url':			'/jockeys/Dylan-Dunn_7917/',
+			'weight':				60.5,
+			'carried':				60.5,
+			'lengths':				4.15
+		},
+		{
+			'result':				3,
+			'starters':				12,
+			'track':				'Echuca',
+			'date':					datetime(2016, 4, 10),
+			'distance':				1209,
+			'track_condition':		'Good 4',
+			'runner_prize_money':	1600.00,
+			'race_prize_money':		20000.00,
+			'barrier':				15,
+			'winning_time':			73.2,
+			'starting_price':		6.50,
+			'horse_url':			'/horses/Tycoon-Tony_395471/',
+			'jockey_url':			'/jockeys/Mark-Pegus_980/',
+			'weight':				60.5,
+			'carried':				60.5,
+			'lengths':				0.30
+		},
+		{
+			'result':				3,
+			'starters':				4,
+			'track':				'Yarra Valley',
+			'date':					datetime(2016, 3, 20),
+			'distance':				1200,
+			'track_condition':		'Heavy 9',
+			'runner_prize_money':	2000.00,
+			'race_prize_money':		25000.00,
+			'barrier':				4,
+			'winning_time':			76.55,
+			'starting_price':		2.10,
+			'horse_url':			'/horses/Tycoon-Tony_395471/',
+			'jockey_url':			'/jockeys/Ben-Allen_9146/',
+			'weight':				60.5,
+			'carried':				59.0,
+			'lengths':				2.95
+		},
+		{
+			'result':				6,
+			'starters':				11,
+			'track':				'Sandown Hillside',
+			'date':					datetime(2016, 2, 17),
+			'distance':				1300,
+			'track_condition':		'Soft 5',
+			'runner_prize_money':	700.00,
+			'race_prize_money':		35000.00,
+			'barrier':				4,
+			'winning_time':			79.18,
+			'starting_price':		9.00,
+			'horse_url':			'/horses/Tycoon-Tony_395471/',
+			'jockey_url':			'/jockeys/Harry-Coffey_3109/',
+			'weight':				61.0,
+			'carried':				59.5,
+			'lengths':				4.35
+		},
+		{
+			'result':				2,
+			'starters':				8,
+			'track':				'Kilmore',
+			'date':					datetime(2016, 2, 1),
+			'distance':				1100,
+			'track_condition':		'Good 4',
+			'runner_prize_money':	3400.00,
+			'race_prize_money':		20000.00,
+			'barrier':				2,
+			'winning_time':			63.6,
+			'starting_price':		4.00,
+			'horse_url':			'/horses/Tycoon-Tony_395471/',
+			'jockey_url':			'/jockeys/Ben-E-Thompson_2143/',
+			'weight':				61.0,
+			'carried':				59.5,
+			'lengths':				0.10
+		},
+		{
+			'result':				9,
+			'starters':				12,
+			'track':				'Wangaratta',
+			'date':					datetime(2016, 1, 21),
+			'distance':				1300,
+			'track_condition':		'Good 4',
+			'runner_prize_money':	500.00,
+			'race_prize_money':		20000.00,
+			'barrier':				12,
+			'winning_time':			77.55,
+			'starting_price':		8.00,
+			'horse_url':			'/horses/Tycoon-Tony_395471/',
+			'jockey_url':			'/jockeys/Mitchell-Aitken_9402/',
+			'weight':				61.0,
+			'carried':				58.0,
+			'lengths':				5.25
+		},
+		{
+			'result':				1,
+			'starters':				14,
+			'track':				'Wangaratta',
+			'date':					datetime(2016, 1, 4),
+			'distance':				1170,
+			'track_condition':		'Soft 5',
+			'runner_prize_money':	11000.00,
+			'race_prize_money':		20000.00,
+			'barrier':				5,
+			'winning_time':			68.51,
+			'starting_price':		10.00,
+			'horse_url':			'/horses/Tycoon-Tony_395471/',
+			'jockey_url':			'/jockeys/Ben-E-Thompson_2143/',
+			'weight':				60.0,
+			'carried':				58.5,
+			'lengths':				0.00
+		},
+		{
+			'result':				5,
+			'starters':				11,
+			'track':				'Echuca',
+			'date':					datetime(2015, 9, 25),
+			'distance':				1100,
+			'track_condition':		'Good 4',
+			'runner_prize_money':	600.00,
+			'race_prize_money':		20000.00,
+			'barrier':				1,
+			'winning_time':			64.42,
+			'starting_price':		7.00,
+			'horse_url':			'/horses/Tycoon-Tony_395471/',
+			'jockey_url':			'/jockeys/Jason-Collins_2265/',
+			'weight':				59.0,
+			'carried':				57.0,
+			'lengths':				2.80
+		},
+		{
+			'result':				1,
+			'starters':				13,
+			'track':				'Echuca',
+			'date':					datetime(2015, 9, 5),
+			'distance':				1200,
+			'track_condition':		'Good 4',
+			'runner_prize_money':	13000.00,
+			'race_prize_money':		20000.00,
+			'barrier':				12,
+			'winning_time':			72.04,
+			'starting_price':		19.00,
+			'horse_url':			'/horses/Tycoon-Tony_395471/',
+			'jockey_url':			'/jockeys/Jason-Collins_2265/',
+			'weight':				58.5,
+			'carried':				56.5,
+			'lengths':				0.00
+		},
+		{
+			'result':				4,
+			'starters':				14,
+			'track':				'Echuca',
+			'date':					datetime(2015, 8, 17),
+			'distance':				1400,
+			'track_condition':		'Good 4',
+			'runner_prize_money':	900.00,
+			'race_prize_money':		20000.00,
+			'barrier':				6,
+			'winning_time':			85.74,
+			'starting_price':		5.00,
+			'horse_url':			'/horses/Tycoon-Tony_395471/',
+			'jockey_url':			'/jockeys/Jason-Benbow_690/',
+			'weight':				58.5,
+			'carried':				58.5,
+			'lengths':				5.25
+		},
+		{
+			'result':				3,
+			'starters':				11,
+			'track':				'Wodonga',
+			'date':					datetime(2015, 7, 29),
+			'distance':				1100,
+			'track_condition':		'Heavy 9',
+			'runner_prize_money':	1200.00,
+			'race_prize_money':		15000.00,
+			'barrier':				15,
+			'winning_time':			67.96,
+			'starting_price':		21.00,
+			'horse_url':			'/horses/Tycoon-Tony_395471/',
+			'jockey_url':			'/jockeys/Jason-Benbow_690/',
+			'weight':				58.5,
+			'carried':				58.5,
+			'lengths':				4.50
+		}
+	]
+
+	return [pyracing.Performance(performance) for performance in performances]
+
+
 class PerformanceListTest(unittest.TestCase):
 
 	@classmethod
 	def setUpClass(cls):
 
-		cls.performances = [
-			{
-				'result':				10,
-				'starters':				13,
-				'track':				'Wangaratta',
-				'date':					datetime(2016, 4, 21),
-				'distance':				1170,
-				'track_condition':		'Good 4',
-				'runner_prize_money':	500.00,
-				'race_prize_money':		20000.00,
-				'barrier':				16,
-				'winning_time':			68.66,
-				'starting_price':		6.50,
-				'horse_url':			'/horses/Tycoon-Tony_395471/',
-				'jockey_url':			'/jockeys/Dylan-Dunn_7917/',
-				'weight':				60.5,
-				'carried':				60.5,
-				'lengths':				4.15
-			},
-			{
-				'result':				3,
-				'starters':				12,
-				'track':				'Echuca',
-				'date':					datetime(2016, 4, 10),
-				'distance':				1209,
-				'track_condition':		'Good 4',
-				'runner_prize_money':	1600.00,
-				'race_prize_money':		20000.00,
-				'barrier':				15,
-				'winning_time':			73.2,
-				'starting_price':		6.50,
-				'horse_url':			'/horses/Tycoon-Tony_395471/',
-				'jockey_url':			'/jockeys/Mark-Pegus_980/',
-				'weight':				60.5,
-				'carried':				60.5,
-				'lengths':				0.30
-			},
-			{
-				'result':				3,
-				'starters':				4,
-				'track':				'Yarra Valley',
-				'date':					datetime(2016, 3, 20),
-				'distance':				1200,
-				'track_condition':		'Heavy 9',
-				'runner_prize_money':	2000.00,
-				'race_prize_money':		25000.00,
-				'barrier':				4,
-				'winning_time':			76.55,
-				'starting_price':		2.10,
-				'horse_url':			'/horses/Tycoon-Tony_395471/',
-				'jockey_url':			'/jockeys/Ben-Allen_9146/',
-				'weight':				60.5,
-				'carried':				59.0,
-				'lengths':				2.95
-			},
-			{
-				'result':				6,
-				'starters':				11,
-				'track':				'Sandown Hillside',
-				'date':					datetime(2016, 2, 17),
-				'distance':				1300,
-				'track_condition':		'Soft 5',
-				'runner_prize_money':	700.00,
-				'race_prize_money':		35000.00,
-				'barrier':				4,
-				'winning_time':			79.18,
-				'starting_price':		9.00,
-				'horse_url':			'/horses/Tycoon-Tony_395471/',
-				'jockey_url':			'/jockeys/Harry-Coffey_3109/',
-				'weight':				61.0,
-				'carried':				59.5,
-				'lengths':				4.35
-			},
-			{
-				'result':				2,
-				'starters':				8,
-				'track':				'Kilmore',
-				'date':					datetime(2016, 2, 1),
-				'distance':				1100,
-				'track_condition':		'Good 4',
-				'runner_prize_money':	3400.00,
-				'race_prize_money':		20000.00,
-				'barrier':				2,
-				'winning_time':			63.6,
-				'starting_price':		4.00,
-				'horse_url':			'/horses/Tycoon-Tony_395471/',
-				'jockey_url':			'/jockeys/Ben-E-Thompson_2143/',
-				'weight':				61.0,
-				'carried':				59.5,
-				'lengths':				0.10
-			},
-			{
-				'result':				9,
-				'starters':				12,
-				'track':				'Wangaratta',
-				'date':					datetime(2016, 1, 21),
-				'distance':				1300,
-				'track_condition':		'Good 4',
-				'runner_prize_money':	500.00,
-				'race_prize_money':		20000.00,
-				'barrier':				12,
-				'winning_time':			77.55,
-				'starting_price':		8.00,
-				'horse_url':			'/horses/Tycoon-Tony_395471/',
-				'jockey_url':			'/jockeys/Mitchell-Aitken_9402/',
-				'weight':				61.0,
-				'carried':				58.0,
-				'lengths':				5.25
-			},
-			{
-				'result':				1,
-				'starters':				14,
-				'track':				'Wangaratta',
-				'date':					datetime(2016, 1, 4),
-				'distance':				1170,
-				'track_condition':		'Soft 5',
-				'runner_prize_money':	11000.00,
-				'race_prize_money':		20000.00,
-				'barrier':				5,
-				'winning_time':			68.51,
-				'starting_price':		10.00,
-				'horse_url':			'/horses/Tycoon-Tony_395471/',
-				'jockey_url':			'/jockeys/Ben-E-Thompson_2143/',
-				'weight':				60.0,
-				'carried':				58.5,
-				'lengths':				0.00
-			},
-			{
-				'result':				5,
-				'starters':				11,
-				'track':				'Echuca',
-				'date':					datetime(2015, 9, 25),
-				'distance':				1100,
-				'track_condition':		'Good 4',
-				'runner_prize_money':	600.00,
-				'race_prize_money':		20000.00,
-				'barrier':				1,
-				'winning_time':			64.42,
-				'starting_price':		7.00,
-				'horse_url':			'/horses/Tycoon-Tony_395471/',
-				'jockey_url':			'/jockeys/Jason-Collins_2265/',
-				'weight':				59.0,
-				'carried':				57.0,
-				'lengths':				2.80
-			},
-			{
-				'result':				1,
-				'starters':				13,
-				'track':				'Echuca',
-				'date':					datetime(2015, 9, 5),
-				'distance':				1200,
-				'track_condition':		'Good 4',
-				'runner_prize_money':	13000.00,
-				'race_prize_money':		20000.00,
-				'barrier':				12,
-				'winning_time':			72.04,
-				'starting_price':		19.00,
-				'horse_url':			'/horses/Tycoon-Tony_395471/',
-				'jockey_url':			'/jockeys/Jason-Collins_2265/',
-				'weight':				58.5,
-				'carried':				56.5,
-				'lengths':				0.00
-			},
-			{
-				'result':				4,
-				'starters':				14,
-				'track':				'Echuca',
-				'date':					datetime(2015, 8, 17),
-				'distance':				1400,
-				'track_condition':		'Good 4',
-				'runner_prize_money':	900.00,
-				'race_prize_money':		20000.00,
-				'barrier':				6,
-				'winning_time':			85.74,
-				'starting_price':		5.00,
-				'horse_url':			'/horses/Tycoon-Tony_395471/',
-				'jockey_url':			'/jockeys/Jason-Benbow_690/',
-				'weight':				58.5,
-				'carried':				58.5,
-				'lengths':				5.25
-			},
-			{
-				'result':				3,
-				'starters':				11,
-				'track':				'Wodonga',
-				'date':					datetime(2015, 7, 29),
-				'distance':				1100,
-				'track_condition':		'Heavy 9',
-				'runner_prize_money':	1200.00,
-				'race_prize_money':		15000.00,
-				'barrier':				15,
-				'winning_time':			67.96,
-				'starting_price':		21.00,
-				'horse_url':			'/horses/Tycoon-Tony_395471/',
-				'jockey_url':			'/jockeys/Jason-Benbow_690/',
-				'weight':				58.5,
-				'carried':				58.5,
-				'lengths':				4.50
-			}
-		]
-		cls.performances = [pyracing.Performance(performance) for performance in cls.performances]
+		cls.performances = create_performances()
 
 		cls.performance_list = pyracing.PerformanceList(cls.performances)
 
+	def test_add(self):
+		"""The add method should insert a performance in date order and update the list's statistics"""
+
+		performance_list = pyracing.PerformanceList(self.performances[1:])
+		performance_list.average_momentum
+
+		performance_list.add(self.performances[0])
+		self.assertEqual(self.performance_list, performance_list)
+		self.assertAlmostEqual(self.performance_list.average_momentum, performance_list.average_momentum)
+		self.assertEqual(self.performance_list.wins, performance_list.wins)
+
+		performance_list = pyracing.PerformanceList(self.performances[:-1])
+		performance_list.add(self.performances[-1])
+		self.assertEqual(self.performance_list, performance_list)
+
+	def test_filter(self):
+		"""The filter method should return a PerformanceList containing the performances matching the predicate in the same order"""
+
+		performances = self.performance_list.filter(lambda performance: performance['track'] == 'Echuca')
+
+		self.assertIsInstance(performances, pyracing.PerformanceList)
+		self.assertEqual([performance for performance in self.performance_list if performance['track'] == 'Echuca'], performances)
+
+	def test_presorted(self):
+		"""A PerformanceList created with presorted=True should not sort its performances"""
+
+		performances = list(reversed(self.performances))
+
+		self.assertEqual(performances, pyracing.PerformanceList(performances, presorted=True))
+		self.assertEqual(self.performances, pyracing.PerformanceList(performances))
+
+	def test_slice(self):
+		"""Slicing a PerformanceList should return a PerformanceList"""
+
+		performances = self.performance_list[:3]
+
+		self.assertIsInstance(performances, pyracing.PerformanceList)
+		self.assertEqual(self.performances[:3], performances)
+		self.assertEqual(3, performances.starts)
+
+	def test_reversed_slice(self):
+		"""Slicing a PerformanceList with a negative step should return a plain list in the sliced order"""
+
+		performances = self.performance_list[::-1]
+
+		self.assertNotIsInstance(performances, pyracing.PerformanceList)
+		self.assertEqual(list(reversed(self.performances)), performances)
+
 	def test_average_momentum(self):
 		"""The average_momentum property should return the average momentum per start in the list"""
 
@@ -293,6 +348,92 @@ class PerformanceListTest(unittest.TestCase):
 
 		self.assertEqual(sum([performance['runner_prize_money'] for performance in self.performances]), self.performance_list.total_prize_money)
 
+	def test_get_decayed_statistics(self):
+		"""The get_decayed_statistics method should return statistics weighted by the age of each performance"""
+
+		date = datetime(2016, 3, 1)
+		half_life = timedelta(days=30)
+
+		weights = [0.5 ** ((date - performance['date']).total_seconds() / half_life.total_seconds()) for performance in self.performances if performance['date'] < date]
+		performances = [performance for performance in self.performances if performance['date'] < date]
+		statistics = self.performance_list.get_decayed_statistics(half_life, date)
+
+		self.assertAlmostEqual(sum(weights), statistics['starts'])
+		self.assertAlmostEqual(sum([weight for weight, performance in zip(weights, performances) if performance['result'] == 1]) / sum(weights), statistics['win_pct'])
+		self.assertAlmostEqual(sum([weight * performance.momentum for weight, performance in zip(weights, performances)]) / sum(weights), statistics['average_momentum'])
+
+	def test_get_statistics_for_last(self):
+		"""The get_statistics_for_last method should return the same statistics as a slice of the most recent performances"""
+
+		statistics = self.performance_list.get_statistics_for_last(5)
+
+		self.assertEqual(self.performance_list[:5].wins, statistics['wins'])
+		self.assertAlmostEqual(self.performance_list[:5].average_momentum, statistics['average_momentum'])
+
+	def test_get_statistics_within(self):
+		"""The get_statistics_within method should return the same statistics as a list of the performances within the specified period"""
+
+		date = datetime(2016, 3, 1)
+		performance_list = self.performance_list.filter(lambda performance: date - timedelta(days=365) <= performance['date'] < date)
+		statistics = self.performance_list.get_statistics_within(timedelta(days=365), date)
+
+		self.assertEqual(performance_list.starts, statistics['starts'])
+		self.assertEqual(performance_list.places, statistics['places'])
+		self.assertAlmostEqual(performance_list.total_prize_money, statistics['total_prize_money'])
+
+	def test_get_performances_at_distance(self):
+		"""The get_performances_at_distance method should return a PerformanceList containing the performances within the specified window of the specified distance"""
+
+		for distance, window in ((1200, 100), (1200, 50), (1300, 0), (1000, 200)):
+			expected_performances = [performance for performance in self.performance_list if distance - window <= performance['distance'] <= distance + window]
+			performances = self.performance_list.get_performances_at_distance(distance, window)
+
+			self.assertIsInstance(performances, pyracing.PerformanceList)
+			self.assertEqual(expected_performances, performances)
+
+	def test_get_performances_by_track_condition(self):
+		"""The get_performances_by_track_condition method should return a PerformanceList containing the performances on the specified track condition"""
+
+		for track_condition in ('firm', 'good', 'heavy', 'soft', 'synthetic', 'Good 4'):
+			expected_performances = [performance for performance in self.performance_list if performance['track_condition'].upper().startswith(track_condition.upper())]
+			performances = self.performance_list.get_performances_by_track_condition(track_condition)
+
+			self.assertIsInstance(performances, pyracing.PerformanceList)
+			self.assertEqual(expected_performances, performances)
+
+	def test_where(self):
+		"""The where method should return a lazy query whose performances match all specified criteria"""
+
+		performance_list = pyracing.PerformanceList(self.performances)
+		query = performance_list.where(distance=1200, distance_within=100).where(condition='good', track='Echuca')
+
+		self.assertIsInstance(query, pyracing.PerformanceQuery)
+		self.assertNotIn('queries', performance_list.cache)
+
+		expected_performances = [performance for performance in self.performances if 1100 <= performance['distance'] <= 1300 and performance['track_condition'].startswith('Good') and performance['track'] == 'Echuca']
+		self.assertIsInstance(query.performances, pyracing.PerformanceList)
+		self.assertEqual(expected_performances, query.performances)
+		self.assertEqual(pyracing.PerformanceList(expected_performances).win_pct, query.win_pct)
+		self.assertIs(query.performances, performance_list.where(track='Echuca', condition='good', distance=1200, distance_within=100).performances)
+
+	def test_where_positions(self):
+		"""Queries with a positions criterion should match the performances at those positions, and get_matcher should agree with the query's performances"""
+
+		performance_list = pyracing.PerformanceList(self.performances)
+		query = performance_list.where(positions=range(1, 5), condition='good')
+
+		expected_performances = [performance for performance in performance_list[1:5] if performance['track_condition'].startswith('Good')]
+		self.assertEqual(expected_performances, query.performances)
+
+		matcher = query.get_matcher()
+		self.assertEqual(expected_performances, [performance for position, performance in enumerate(performance_list) if matcher(position, performance)])
+
+	def test_where_unsupported_criterion(self):
+		"""The where method should raise a TypeError for unsupported criteria"""
+
+		with self.assertRaises(TypeError):
+			self.performance_list.where(colour='green')
+
 	def test_wins(self):
 		"""The wins property should return the number of wins in the list"""
 
@@ -0,0 +1,127 @@
+import json
+import pickle
+import shutil
+import tempfile
+
+from .common import *
+
+
+class PerformanceStoreTest(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+
+		cls.database = pyracing.Entity.database
+		pyracing.Entity.database = pyracing.MemoryDatabase()
+
+		for index in range(12):
+			pyracing.Performance({
+				'result':		index % 4 + 1,
+				'track':		'Echuca',
+				'date':			datetime(2016, 1, index + 1),
+				'distance':		1200,
+				'horse_url':	'/horses/{number}/'.format(number=index % 3),
+				'jockey_url':	'/jockeys/{number}/'.format(number=index % 2)
+			}).save()
+
+		pyracing.Horse({'url': '/horses/0/', 'name': 'Horse 0', 'scraped_at': datetime.now()}).save()
+
+		cls.path = tempfile.mkdtemp()
+		cls.store = pyracing.PerformanceStore.build(cls.path)
+
+	@classmethod
+	def tearDownClass(cls):
+
+		pyracing.Entity.database = cls.database
+		pyracing.Performance.store = None
+		shutil.rmtree(cls.path)
+
+	def check_performances(self, performances, key, value):
+		"""Check that performances contains all performances with the specified value for key in descending date order"""
+
+		expected = sorted(pyracing.Performance.find({key: value}), key=lambda performance: performance['date'], reverse=True)
+
+		self.assertEqual([performance['_id'] for performance in expected], [performance['_id'] for performance in performances])
+
+	def test_horse(self):
+		"""get_performances_by_horse should return the horse's performances in descending date order"""
+
+		for number in range(3):
+			url = '/horses/{number}/'.format(number=number)
+			self.check_performances(self.store.get_performances_by_horse({'url': url}), 'horse_url', url)
+
+	def test_jockey(self):
+		"""get_performances_by_jockey should return the jockey's performances in descending date order"""
+
+		for number in range(2):
+			url = '/jockeys/{number}/'.format(number=number)
+			self.check_performances(self.store.get_performances_by_jockey({'url': url}), 'jockey_url', url)
+
+	def test_missing(self):
+		"""Horses and jockeys not in the store should return None"""
+
+		self.assertIsNone(self.store.get_performances_by_horse({'url': '/horses/missing/'}))
+		self.assertIsNone(self.store.get_performances_by_jockey({'url': '/jockeys/missing/'}))
+
+	def test_configured(self):
+		"""Performance.get_performances_by_horse should read from the configured store"""
+
+		pyracing.Performance.store = self.store
+		try:
+			performances = pyracing.Performance.get_performances_by_horse({'url': '/horses/0/'})
+			for performance in performances:
+				self.assertIsInstance(performance, pyracing.CompactPerformance)
+			self.check_performances(performances, 'horse_url', '/horses/0/')
+		finally:
+			pyracing.Performance.store = None
+
+	def test_index(self):
+		"""The horse and jockey indexes should be stored in memory-mapped columns rather than the manifest"""
+
+		manifest = json.dumps(self.store.manifest)
+
+		self.assertNotIn('/horses/0/', manifest)
+		self.assertNotIn('/jockeys/0/', manifest)
+		self.assertTrue(self.store.has_horse('/horses/0/'))
+		self.assertFalse(self.store.has_horse('/horses/missing/'))
+
+	def test_sequence(self):
+		"""Stored performances should be returned as a lazy sequence that can be sliced"""
+
+		performances = self.store.get_performances_by_horse({'url': '/horses/0/'})
+
+		self.assertIsInstance(performances, pyracing.performance_store.StoredPerformances)
+		self.assertEqual(4, len(performances))
+		self.assertIsInstance(performances[1:], pyracing.performance_store.StoredPerformances)
+		self.assertEqual([performance['_id'] for performance in performances][1:3], [performance['_id'] for performance in performances[1:3]])
+		self.assertEqual(performances[-1]['_id'], list(performances)[-1]['_id'])
+
+	def test_decoded_once(self):
+		"""Stored performances should be decoded once per sequence, including when accessed via a slice"""
+
+		performances = self.store.get_performances_by_jockey({'url': '/jockeys/1/'})
+
+		self.assertIs(performances[1], performances[1])
+		self.assertIs(performances[2], performances[1:][1])
+		self.assertEqual([performance['_id'] for performance in performances], [performance['_id'] for performance in pickle.loads(pickle.dumps(performances))])
+
+	def test_rescraped_horse(self):
+		"""Horses scraped again since the store was built should not be read from the store"""
+
+		self.assertIsNone(self.store.get_performances_by_horse({'url': '/horses/0/', 'scraped_at': datetime.now()}))
+
+		pyracing.Performance.store = self.store
+		try:
+			performances = pyracing.Performance.get_performances_by_horse({'url': '/horses/0/', 'scraped_at': datetime.now()})
+			for performance in performances:
+				self.assertIsInstance(performance, pyracing.Performance)
+			self.check_performances(performances, 'horse_url', '/horses/0/')
+		finally:
+			pyracing.Performance.store = None
+
+	def test_horse_property(self):
+		"""Stored performances should provide the horse involved"""
+
+		performance = self.store.get_performances_by_horse({'url': '/horses/0/'})[0]
+
+		self.assertEqual('Horse 0', performance.horse['name'])
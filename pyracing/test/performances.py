@@ -63,6 +63,57 @@ class GetPerformancesByJockeyTest(EntityTest):
 		self.check_no_rescrape(pyracing.Performance.get_performances_by_jockey, self.runner.jockey)
 
 
+class IterPerformancesByJockeyTest(EntityTest):
+
+	@classmethod
+	def setUpClass(cls):
+
+		cls.meet = pyracing.Meet.get_meets_by_date(historical_date)[0]
+		cls.race = cls.meet.races[0]
+		cls.runner = cls.race.runners[0]
+		cls.runner.horse.performances
+		cls.performances = pyracing.Performance.iter_performances_by_jockey(cls.runner.jockey, batch_size=10)
+
+	def test_generator(self):
+		"""The iter_performances_by_jockey method should return a generator rather than a list"""
+
+		self.assertNotIsInstance(self.performances, list)
+
+	def test_matches_get_performances_by_jockey(self):
+		"""The iter_performances_by_jockey method should yield the same performances as get_performances_by_jockey in the same order"""
+
+		expected_ids = [performance['_id'] for performance in pyracing.Performance.get_performances_by_jockey(self.runner.jockey)]
+
+		self.assertEqual(expected_ids, [performance['_id'] for performance in pyracing.Performance.iter_performances_by_jockey(self.runner.jockey, batch_size=10)])
+
+
+class IterPerformancesBetweenTest(EntityTest):
+
+	@classmethod
+	def setUpClass(cls):
+
+		cls.meet = pyracing.Meet.get_meets_by_date(historical_date)[0]
+		cls.race = cls.meet.races[0]
+		cls.runner = cls.race.runners[0]
+		cls.runner.horse.performances
+		cls.date_from = historical_date - timedelta(days=365)
+		cls.date_to = historical_date
+
+	def test_types(self):
+		"""The iter_performances_between method should yield Performance objects"""
+
+		self.check_types(list(pyracing.Performance.iter_performances_between(self.date_from, self.date_to)), list, pyracing.Performance)
+
+	def test_dates(self):
+		"""The iter_performances_between method should only yield performances within the date range in ascending date order"""
+
+		dates = [performance['date'] for performance in pyracing.Performance.iter_performances_between(self.date_from, self.date_to, batch_size=100)]
+
+		self.assertEqual(sorted(dates), dates)
+		for date in dates:
+			self.assertTrue(self.date_from <= date <= self.date_to)
+
+
 class PerformancePropertiesTest(EntityTest):
 
 	@classmethod
@@ -100,4 +151,56 @@ class PerformancePropertiesTest(EntityTest):
 	def test_speed(self):
 		"""The speed property should return the average speed achieved by the horse in this performance"""
 
-		self.assertEqual(self.performance.actual_distance / self.performance['winning_time'], self.performance.speed)
\ No newline at end of file
+		self.assertEqual(self.performance.actual_distance / self.performance['winning_time'], self.performance.speed)
+
+
+class PerformanceDerivedValuesTest(unittest.TestCase):
+
+	def setUp(self):
+
+		self.performance = pyracing.Performance({
+			'distance':		1200,
+			'lengths':		2.95,
+			'carried':		59.0,
+			'winning_time':	76.55
+		})
+
+	def test_memoised(self):
+		"""Derived values should be calculated once and stored in the performance's cache"""
+
+		momentum = self.performance.momentum
+		self.performance.track_condition_category
+
+		for key in pyracing.Performance.DERIVED_VALUES:
+			self.assertIn(key, self.performance.cache)
+		self.assertIs(momentum, self.performance.momentum)
+
+	def test_invalidated(self):
+		"""Setting a value on the performance should discard previously calculated derived values"""
+
+		old_momentum = self.performance.momentum
+
+		self.performance['carried'] = 61.0
+
+		self.assertNotEqual(old_momentum, self.performance.momentum)
+		self.assertEqual((61.0 + pyracing.Horse.AVERAGE_WEIGHT) * self.performance.speed, self.performance.momentum)
+
+	def test_stored_track_condition_category(self):
+		"""A stored track condition category should be used until the track condition is changed"""
+
+		performance = pyracing.Performance({'track_condition': 'Good 4', 'track_condition_category': 'good'})
+		self.assertEqual('good', performance.track_condition_category)
+
+		performance['track_condition'] = 'Heavy 8'
+		self.assertEqual('heavy', performance.track_condition_category)
+
+	def test_saving_track_condition_category(self):
+		"""Saving a performance should only store its track condition category if it is new or its track condition has changed"""
+
+		performance = pyracing.Performance({'_id': 1, 'track_condition': 'Good 4'})
+		pyracing.Performance.event_manager.publish_event('saving_performance', [performance])
+		self.assertEqual({}, performance.get_changes())
+
+		performance['track_condition'] = 'Heavy 8'
+		pyracing.Performance.event_manager.publish_event('saving_performance', [performance])
+		self.assertEqual({'$set': {'track_condition': 'Heavy 8', 'track_condition_category': 'heavy'}}, performance.get_changes())
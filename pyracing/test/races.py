@@ -55,6 +55,19 @@ class RacePropertiesTest(EntityTest):
 		cls.meet = pyracing.Meet.get_meets_by_date(historical_date)[0]
 		cls.race = pyracing.Race.get_races_by_meet(cls.meet)[0]
 
+	def test_calculate_field_statistics(self):
+		"""The calculate_field_statistics method should return a table ranking the runners in the race"""
+
+		statistics = self.race.calculate_field_statistics()
+
+		self.assertEqual(len(self.race.runners), statistics['field']['size'])
+		self.assertEqual(len(self.race.runners), len(statistics['runners']))
+		for runner, row in zip(self.race.runners, statistics['runners']):
+			self.assertEqual(runner['_id'], row['runner_id'])
+			self.assertEqual(runner.career.win_pct, row['win_pct'])
+			if row['win_pct'] is not None:
+				self.assertEqual(len([other_row for other_row in statistics['runners'] if other_row['win_pct'] is not None and other_row['win_pct'] > row['win_pct']]) + 1, row['win_pct_rank'])
+
 	def test_importance(self):
 		"""The importance property should return the product of the starting price of runners finishing in the first four"""
 
@@ -0,0 +1,103 @@
+
+from .common import *
+
+
+class RunnerFeaturesTest(EntityTest):
+
+	@classmethod
+	def setUpClass(cls):
+
+		pyracing.RunnerFeatures.enabled = True
+
+		for meet in pyracing.Meet.get_meets_by_date(historical_date):
+			if meet['track'] == 'Kilmore':
+				cls.meet = meet
+				for race in cls.meet.races:
+					if race['number'] == 5:
+						cls.race = race
+						for runner in cls.race.runners:
+							if runner['number'] == 1:
+								cls.runner = runner
+								break
+						break
+				break
+
+	@classmethod
+	def tearDownClass(cls):
+
+		pyracing.RunnerFeatures.enabled = False
+
+	def test_features(self):
+		"""The features property should return RunnerFeatures containing the runner's calculated statistics"""
+
+		features = self.runner.features
+
+		self.assertIsInstance(features, pyracing.RunnerFeatures)
+		self.assertEqual(self.runner.up, features['up'])
+		for performance_list in pyracing.Runner.PERFORMANCE_LISTS:
+			self.assertEqual(getattr(self.runner, performance_list).get_statistics(), features['performance_lists'][performance_list])
+
+	def test_stored(self):
+		"""Runner features should be stored in the database and retrievable by race"""
+
+		self.runner.features
+
+		self.assertIn(self.runner['_id'], [features['runner_id'] for features in pyracing.RunnerFeatures.get_features_by_race(self.race)])
+
+	def test_invalidated_by_saved_runner(self):
+		"""Saving a runner should discard its stored features"""
+
+		runner = pyracing.Runner.get_runner_by_id(self.runner['_id'])
+		runner.features
+
+		runner.save()
+
+		self.assertIsNone(pyracing.RunnerFeatures.find_one({'runner_id': runner['_id']}))
+
+	def test_invalidated_by_saved_jockey(self):
+		"""Saving a runner's jockey should discard its stored features"""
+
+		runner = pyracing.Runner.get_runner_by_id(self.runner['_id'])
+		runner.features
+
+		runner.jockey.save()
+
+		self.assertIsNone(pyracing.RunnerFeatures.find_one({'runner_id': runner['_id']}))
+
+
+class RunnerFeaturesInputsTest(unittest.TestCase):
+
+	def setUp(self):
+
+		meet = pyracing.Meet({'date': historical_date})
+		race = pyracing.Race({'start_time': historical_date})
+		race.cache['meet'] = meet
+
+		self.horse = pyracing.Horse({'url': '/horses/0/'})
+		self.horse.cache['performances'] = []
+		self.jockey = pyracing.Jockey({'url': '/jockeys/0/'})
+		self.jockey.cache['performances'] = []
+
+		self.runner = pyracing.Runner({'horse_url': '/horses/0/', 'jockey_url': '/jockeys/0/'})
+		self.runner.cache['race'] = race
+		self.runner.cache['horse'] = self.horse
+		self.runner.cache['jockey'] = self.jockey
+
+	def test_complete(self):
+		"""Runners with a horse and jockey whose performances have been loaded should have complete inputs"""
+
+		self.assertTrue(pyracing.RunnerFeatures.has_complete_inputs(self.runner))
+
+	def test_missing_jockey(self):
+		"""Runners whose jockey is not available should not have complete inputs"""
+
+		self.runner.cache['jockey'] = None
+
+		self.assertFalse(pyracing.RunnerFeatures.has_complete_inputs(self.runner))
+
+	def test_stale_store(self):
+		"""Runners whose jockey's performances were read from a store built before the race should not have complete inputs"""
+
+		self.jockey.cache['performances'] = pyracing.performance_store.StoredPerformances(None, range(0), built_at=historical_date - timedelta(days=1))
+
+		self.assertFalse(pyracing.RunnerFeatures.has_complete_inputs(self.runner))
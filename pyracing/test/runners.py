@@ -98,6 +98,15 @@ class RunnerPropertiesTest(EntityTest):
 
 		self.assertEqual(expected_result, self.runner.calculate_expected_speed('career'))
 
+	def test_calculate_expected_speeds(self):
+		"""The calculate_expected_speeds method should return a table of expected speeds for each runner and performance list"""
+
+		table = pyracing.Runner.calculate_expected_speeds(self.race.runners)
+
+		self.assertEqual(len(self.race.runners), len(table))
+		for runner, expected_speeds in zip(self.race.runners, table):
+			self.assertEqual(dict((performance_list, runner.calculate_expected_speed(performance_list)) for performance_list in pyracing.Runner.PERFORMANCE_LISTS), expected_speeds)
+
 	def test_career(self):
 		"""The career property should return a PerformanceList containing all of the horse's performances prior to the current race"""
 
@@ -250,4 +259,63 @@ class RunnerPropertiesTest(EntityTest):
 		"""Check that the specified performance list has the expected length"""
 
 		self.assertIsInstance(performance_list, pyracing.PerformanceList)
-		self.assertEqual(expected_length, len(performance_list))
\ No newline at end of file
+		self.assertEqual(expected_length, len(performance_list))
+
+
+class RunnerExpectedSpeedsTest(unittest.TestCase):
+
+	TRACKS = ('Echuca', 'Kilmore', 'Wangaratta')
+	TRACK_CONDITIONS = ('Good 4', 'Soft 6', 'Heavy 9', 'Firm 2', 'Synthetic')
+
+	@classmethod
+	def setUpClass(cls):
+
+		cls.performances = []
+		for horse_index in range(2):
+			date = datetime(2014, 1, 1)
+			for index in range(40):
+				cls.performances.append(pyracing.Performance({
+					'result':				(index + horse_index) % 12 + 1,
+					'starters':				12,
+					'track':				cls.TRACKS[index // 2 % len(cls.TRACKS)],
+					'date':					date,
+					'distance':				1000 + 100 * ((index + horse_index) % 7),
+					'track_condition':		cls.TRACK_CONDITIONS[index % len(cls.TRACK_CONDITIONS)],
+					'runner_prize_money':	None,
+					'race_prize_money':		20000.00,
+					'barrier':				1,
+					'winning_time':			70.0 + index % 9,
+					'starting_price':		None,
+					'horse_url':			'/horses/{index}/'.format(index=horse_index),
+					'jockey_url':			'/jockeys/{index}/'.format(index=(index + horse_index) % 3),
+					'weight':				58.0,
+					'carried':				55.0 + index % 4,
+					'lengths':				(index % 5) * 0.7
+					}))
+				date += timedelta(days=120 if index % 9 == 8 else 14)
+
+	def create_runner(self):
+		"""Create a runner in a race partway through the career of the performances' first horse"""
+
+		meet = pyracing.Meet({'track': 'Kilmore', 'date': datetime(2014, 11, 20)})
+		race = pyracing.Race({'distance': 1200, 'start_time': meet['date']})
+		race.cache['meet'] = meet
+
+		horse = pyracing.Horse({'url': '/horses/0/'})
+		horse.cache['performances'] = sorted([performance for performance in self.performances if performance['horse_url'] == '/horses/0/'], key=lambda performance: performance['date'], reverse=True)
+		jockey = pyracing.Jockey({'url': '/jockeys/0/'})
+		jockey.cache['performances'] = sorted([performance for performance in self.performances if performance['jockey_url'] == '/jockeys/0/'], key=lambda performance: performance['date'], reverse=True)
+
+		runner = pyracing.Runner({'horse_url': '/horses/0/', 'jockey_url': '/jockeys/0/', 'weight': 58.0, 'jockey_claiming': 0.0})
+		runner.cache['race'] = race
+		runner.cache['horse'] = horse
+		runner.cache['jockey'] = jockey
+		return runner
+
+	def test_get_expected_speeds(self):
+		"""The get_expected_speeds method should return the same expected speeds as calculate_expected_speed for every performance list"""
+
+		runner = self.create_runner()
+		expected_speeds = dict((performance_list, runner.calculate_expected_speed(performance_list)) for performance_list in pyracing.Runner.PERFORMANCE_LISTS)
+
+		self.assertEqual(expected_speeds, self.create_runner().get_expected_speeds())
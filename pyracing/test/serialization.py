@@ -0,0 +1,132 @@
+import pickle
+
+from pyracing import serialization
+
+from .common import *
+
+
+class PickleTest(unittest.TestCase):
+
+	def setUp(self):
+
+		self.performances = pyracing.PerformanceList([
+			pyracing.Performance({
+				'_id':					1,
+				'result':				1,
+				'starters':				8,
+				'track':				'Echuca',
+				'date':					datetime(2016, 1, 2),
+				'distance':				1200,
+				'track_condition':		'Good 4',
+				'runner_prize_money':	1000.00,
+				'race_prize_money':		20000.00,
+				'barrier':				3,
+				'winning_time':			70.12,
+				'starting_price':		3.00,
+				'horse_url':			'horse',
+				'jockey_url':			'jockey',
+				'weight':				56.5,
+				'carried':				56.5,
+				'lengths':				0.00
+			}),
+			pyracing.Performance({
+				'_id':					2,
+				'result':				3,
+				'starters':				10,
+				'track':				'Wangaratta',
+				'date':					datetime(2016, 1, 1),
+				'distance':				1400,
+				'track_condition':		'Soft 5',
+				'runner_prize_money':	250.00,
+				'race_prize_money':		20000.00,
+				'barrier':				7,
+				'winning_time':			84.40,
+				'starting_price':		6.00,
+				'horse_url':			'horse',
+				'jockey_url':			'jockey',
+				'weight':				57.0,
+				'carried':				57.0,
+				'lengths':				2.50
+			})
+			])
+
+	def test_entity(self):
+		"""Pickling an entity should preserve its values and changed keys but not its cache"""
+
+		horse = pyracing.Horse({'_id': 1, 'url': 'horse', 'name': 'Horse'})
+		horse['name'] = 'New Name'
+		horse.cache['performances'] = self.performances
+
+		unpickled = pickle.loads(pickle.dumps(horse))
+
+		self.assertIsInstance(unpickled, pyracing.Horse)
+		self.assertEqual(horse, unpickled)
+		self.assertEqual({'name'}, unpickled.changed_keys)
+		self.assertEqual({}, unpickled.cache)
+
+	def test_performance_list(self):
+		"""Pickling a PerformanceList should preserve its performances and recalculate its statistics on demand"""
+
+		self.performances.average_momentum
+
+		unpickled = pickle.loads(pickle.dumps(self.performances))
+
+		self.assertIsInstance(unpickled, pyracing.PerformanceList)
+		self.assertEqual(self.performances, unpickled)
+		self.assertEqual({}, unpickled.cache)
+		self.assertAlmostEqual(self.performances.average_momentum, unpickled.average_momentum)
+
+	def test_performance_query(self):
+		"""Pickling a PerformanceQuery should preserve its criteria"""
+
+		query = self.performances.where(since=datetime(2016, 1, 2))
+
+		unpickled = pickle.loads(pickle.dumps(query))
+
+		self.assertEqual(query.starts, unpickled.starts)
+		self.assertEqual(query.wins, unpickled.wins)
+
+
+@unittest.skipIf(serialization.msgpack is None, 'msgpack is not installed')
+class MsgpackTest(unittest.TestCase):
+
+	setUp = PickleTest.setUp
+
+	def round_trip(self, value):
+
+		return serialization.unpack(serialization.pack(value))
+
+	def test_datetime(self):
+		"""Datetimes should be packed to the microsecond"""
+
+		value = datetime(2016, 2, 1, 12, 30, 15, 123456)
+
+		self.assertEqual(value, self.round_trip(value))
+
+	def test_entity(self):
+		"""Packing an entity should preserve its class, values and changed keys but not its cache"""
+
+		horse = pyracing.Horse({'_id': 1, 'url': 'horse', 'name': 'Horse', 'foaled': datetime(2012, 9, 1)})
+		horse['name'] = 'New Name'
+		horse.cache['performances'] = self.performances
+
+		unpacked = self.round_trip(horse)
+
+		self.assertIsInstance(unpacked, pyracing.Horse)
+		self.assertEqual(horse, unpacked)
+		self.assertEqual({'name'}, unpacked.changed_keys)
+		self.assertEqual({}, unpacked.cache)
+
+	def test_performance_list(self):
+		"""Packing a PerformanceList should preserve its performances"""
+
+		unpacked = self.round_trip(self.performances)
+
+		self.assertIsInstance(unpacked, pyracing.PerformanceList)
+		self.assertEqual(self.performances, unpacked)
+		self.assertIsInstance(unpacked[0], pyracing.Performance)
+
+	def test_unsupported(self):
+		"""Packing an unsupported object should raise a TypeError"""
+
+		self.assertRaises(TypeError, serialization.pack, object())
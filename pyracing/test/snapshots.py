@@ -0,0 +1,120 @@
+import json
+import os
+import shutil
+import tempfile
+
+from .common import *
+
+
+class SnapshotTest(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+
+		cls.database = pyracing.Entity.database
+		pyracing.Entity.database = pyracing.MemoryDatabase()
+
+		meet = pyracing.Meet({'track': 'Echuca', 'date': datetime(2016, 4, 10)})
+		meet.save()
+		race = pyracing.Race({'meet_id': meet['_id'], 'number': 1, 'distance': 1200})
+		race.save()
+		pyracing.Runner({'race_id': race['_id'], 'number': 1, 'horse_url': '/horses/1/'}).save()
+
+		for index in range(10):
+			pyracing.Performance({
+				'result':				index % 4 + 1,
+				'starters':				12,
+				'track':				'Echuca',
+				'date':					datetime(2016, 1, index + 1),
+				'distance':				1200,
+				'track_condition':		'Good 4',
+				'runner_prize_money':	None if index % 3 == 0 else 1000.00 * index,
+				'winning_time':			72.5,
+				'starting_price':		4.50,
+				'horse_url':			'/horses/{number}/'.format(number=index % 2),
+				'jockey_url':			'/jockeys/1/',
+				'carried':				58.0,
+				'lengths':				0.5 * index
+			}).save()
+
+		cls.path = tempfile.mkdtemp()
+		cls.snapshot = pyracing.Snapshot.export(cls.path)
+
+		cls.performances = pyracing.PerformanceList(pyracing.Performance.find({}))
+
+	@classmethod
+	def tearDownClass(cls):
+
+		pyracing.Entity.database = cls.database
+		shutil.rmtree(cls.path)
+
+	def test_manifest(self):
+		"""The snapshot should contain a manifest describing a .npy file for each column, with the distinct values of dictionary-encoded columns stored in their own .npy files rather than the manifest"""
+
+		manifest = pyracing.Snapshot(self.path).manifest
+
+		self.assertEqual(10, manifest['collections']['performances']['rows'])
+		for description in manifest['collections']['performances']['columns'].values():
+			filename = os.path.join(self.path, description['file'])
+			self.assertTrue(os.path.exists(filename))
+			if description['type'] == 'category':
+				self.assertNotIn('values', description)
+				self.assertTrue(os.path.exists(pyracing.snapshot.SnapshotColumn.get_offsets_filename(filename)))
+				self.assertTrue(os.path.exists(pyracing.snapshot.SnapshotColumn.get_values_filename(filename)))
+
+	def test_values(self):
+		"""Snapshot rows should contain the same values as the exported documents"""
+
+		documents = dict((document['_id'], document) for document in pyracing.Performance.get_database_collection().find({}))
+
+		for row in self.snapshot['performances']:
+			self.assertEqual(documents[row['_id']], dict(row.items()))
+
+	def test_statistics(self):
+		"""Snapshot performances should produce the same statistics as the exported performances"""
+
+		self.assertEqual(self.performances.get_statistics(), pyracing.PerformanceList(self.snapshot.get_performances()).get_statistics())
+
+	def test_performances_by_horse(self):
+		"""get_performances_by_horse should return only the horse's performances"""
+
+		performances = self.snapshot.get_performances_by_horse({'url': '/horses/1/'})
+
+		self.assertEqual(5, len(performances))
+		for performance in performances:
+			self.assertEqual('/horses/1/', performance['horse_url'])
+
+	def test_performances_by_jockey(self):
+		"""get_performances_by_jockey should return a lazy sequence of the jockey's performances in descending date order"""
+
+		performances = self.snapshot.get_performances_by_jockey({'url': '/jockeys/1/'})
+		expected = sorted(self.performances, key=lambda performance: performance['date'], reverse=True)
+
+		self.assertIsInstance(performances, pyracing.performance_store.StoredPerformances)
+		self.assertEqual([performance['_id'] for performance in expected], [performance['_id'] for performance in performances])
+		self.assertEqual(0, len(self.snapshot.get_performances_by_jockey({'url': '/jockeys/missing/'})))
+
+	def test_performance_indexes(self):
+		"""The horse and jockey indexes should be written when the snapshot is exported, as memory-mapped columns rather than in the manifest"""
+
+		description = self.snapshot.manifest['collections']['performances']
+
+		self.assertEqual(set(pyracing.Snapshot.PERFORMANCE_INDEXES), set(description['indexes']))
+		self.assertNotIn('/horses/1/', json.dumps(description))
+
+	def test_sort(self):
+		"""Collections written with a sort should be sorted locally by each key in turn, with missing values first in ascending order"""
+
+		documents = [{'a': 2, 'b': 1}, {'a': None, 'b': 2}, {'a': 2, 'b': 3}, {'b': 4}, {'a': 1, 'b': 5}]
+		collection = pyracing.snapshot.SnapshotCollection(self.path, 'sorted', pyracing.snapshot.SnapshotCollection.write(self.path, 'sorted', documents, sort=[('a', 1), ('b', -1)]))
+
+		self.assertEqual([4, 2, 5, 3, 1], [row['b'] for row in collection])
+
+	def test_race_runners(self):
+		"""race_runners rows should contain the values of each runner's race and meet"""
+
+		row = self.snapshot['race_runners'][0]
+
+		self.assertEqual(1200, row['race_distance'])
+		self.assertEqual('Echuca', row['meet_track'])
+		self.assertEqual(datetime(2016, 4, 10), row['meet_date'])
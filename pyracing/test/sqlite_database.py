@@ -0,0 +1,48 @@
+import threading
+
+from .common import *
+from .memory_database import DatabaseTests
+
+
+class SQLiteDatabaseTest(DatabaseTests, unittest.TestCase):
+
+	def create_database(self):
+
+		return pyracing.SQLiteDatabase(':memory:')
+
+	def test_batch_size(self):
+		"""Cursors should return all matching documents when fetched in batches, without holding the database's lock while the cursor is consumed"""
+
+		documents = self.collection.find({}).sort('date', 1).batch_size(3)
+		iterator = iter(documents)
+		first_document = next(iterator)
+
+		thread = threading.Thread(target=self.collection.insert_one, args=[{'horse_url': 'horse 4', 'date': datetime(2016, 2, 1)}])
+		thread.start()
+		thread.join(timeout=5)
+		self.assertFalse(thread.is_alive())
+
+		remaining_documents = [document for document in iterator if document['horse_url'] != 'horse 4']
+		self.assertEqual([datetime(2016, 1, index + 1) for index in range(10)], [document['date'] for document in [first_document] + remaining_documents])
+
+	def test_datetimes(self):
+		"""Datetimes should be returned as datetimes"""
+
+		for document in self.collection.find({}):
+			self.assertIsInstance(document['date'], datetime)
+
+	def test_index(self):
+		"""Queries on indexed keys should use the index"""
+
+		where, parameters = pyracing.sqlite_database.translate_filter({'horse_url': 'horse 1'})
+		plan = self.collection.database.connection.execute('EXPLAIN QUERY PLAN SELECT document FROM performances WHERE ' + where, parameters).fetchall()
+
+		self.assertIn('USING INDEX', ' '.join(str(row[-1]) for row in plan))
+
+	def test_copy_from(self):
+		"""copy_from should load all documents from another database"""
+
+		database = self.create_database()
+		database.copy_from(self.collection.database, ['performances'], batch_size=3)
+
+		self.assertEqual(10, len(list(database['performances'].find({}))))
@@ -0,0 +1,118 @@
+from .common import *
+
+
+class WriteBufferTest(unittest.TestCase):
+
+	class Collection:
+
+		def __init__(self):
+
+			self.writes = []
+
+		def update_one(self, filter, document):
+
+			self.writes.append((filter, document))
+
+	def setUp(self):
+
+		collection = self.collection = self.Collection()
+
+		class EntityType:
+
+			@classmethod
+			def get_database_collection(cls):
+
+				return collection
+
+		self.entity_type = EntityType
+		self.write_buffer = pyracing.WriteBuffer(batch_size=3)
+
+	def test_batch_size(self):
+		"""Pending updates should be written to the database when batch_size updates are pending"""
+
+		for id in range(2):
+			self.write_buffer.add(self.entity_type, id, {'$set': {'a': id}})
+		self.assertEqual([], self.collection.writes)
+
+		self.write_buffer.add(self.entity_type, 2, {'$set': {'a': 2}})
+		self.assertEqual([({'_id': id}, {'$set': {'a': id}}) for id in range(3)], self.collection.writes)
+
+	def test_copied_values(self):
+		"""Values changed in place after an update is added should not be written by the pending update"""
+
+		values = [1, 2]
+		self.write_buffer.add(self.entity_type, 1, {'$set': {'values': values}})
+		values.append(3)
+		self.write_buffer.flush()
+
+		self.assertEqual([({'_id': 1}, {'$set': {'values': [1, 2]}})], self.collection.writes)
+
+	def test_discard(self):
+		"""Discarded updates should not be written to the database"""
+
+		self.write_buffer.add(self.entity_type, 1, {'$set': {'a': 1}})
+		self.write_buffer.discard(self.entity_type, 1)
+		self.write_buffer.flush()
+
+		self.assertEqual([], self.collection.writes)
+
+	def test_flush(self):
+		"""All pending updates should be written to the database by flush"""
+
+		self.write_buffer.add(self.entity_type, 1, {'$set': {'a': 1}})
+		self.write_buffer.flush()
+
+		self.assertEqual([({'_id': 1}, {'$set': {'a': 1}})], self.collection.writes)
+
+	def test_merge(self):
+		"""Consecutive updates to the same entity should be merged into a single update"""
+
+		self.write_buffer.add(self.entity_type, 1, {'$set': {'a': 1}, '$unset': {'b': ''}})
+		self.write_buffer.add(self.entity_type, 1, {'$set': {'b': 2}})
+		self.write_buffer.flush()
+
+		self.assertEqual([({'_id': 1}, {'$set': {'a': 1, 'b': 2}})], self.collection.writes)
+
+	def test_merge_unset(self):
+		"""Unsetting a key after a pending update has set it should remove it from the merged $set"""
+
+		self.write_buffer.add(self.entity_type, 1, {'$set': {'a': 1, 'b': 2}})
+		self.write_buffer.add(self.entity_type, 1, {'$unset': {'a': ''}})
+		self.write_buffer.flush()
+
+		self.assertEqual([({'_id': 1}, {'$set': {'b': 2}, '$unset': {'a': ''}})], self.collection.writes)
+
+	def test_repeated_saves(self):
+		"""Repeated updates to the same key before a flush should result in a single write of the latest value"""
+
+		self.write_buffer.add(self.entity_type, 1, {'$set': {'a': 1}})
+		self.write_buffer.add(self.entity_type, 1, {'$set': {'a': 2}})
+		self.write_buffer.flush()
+
+		self.assertEqual([({'_id': 1}, {'$set': {'a': 2}})], self.collection.writes)
+
+	def test_save(self):
+		"""Entity saves in write-behind mode should add the entity's changes as a pending update"""
+
+		class Item(pyracing.Entity):
+
+			pass
+
+		database = pyracing.Entity.database
+		pyracing.Entity.database = pyracing.MemoryDatabase()
+		try:
+			item = Item({'a': 1, 'b': 2})
+			item.save()
+
+			pyracing.Entity.enable_write_behind()
+			item['a'] = 3
+			del item['b']
+			item.save()
+
+			self.assertEqual({'$set': {'a': 3}, '$unset': {'b': ''}}, pyracing.Entity.write_buffer.updates[Item][item['_id']])
+
+			pyracing.Entity.disable_write_behind()
+			self.assertEqual({'_id': item['_id'], 'a': 3}, Item.get_database_collection().find_one({'_id': item['_id']}))
+		finally:
+			pyracing.Entity.disable_write_behind()
+			pyracing.Entity.database = database
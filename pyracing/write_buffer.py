@@ -0,0 +1,88 @@
+from collections import OrderedDict
+from copy import deepcopy
+import threading
+
+
+class WriteBuffer:
+	"""A WriteBuffer collects updates to existing entities and flushes them to the database in bulk
+
+	Updates are collected per entity type and keyed by database ID, so saving the same entity several times before a flush results in a single update.
+	When the number of pending updates for an entity type reaches batch_size, they are flushed as a single bulk_write call (or as individual update_one calls if the database does not support bulk_write).
+	"""
+
+	def __init__(self, batch_size=1000):
+		"""Initialize instance dependencies"""
+
+		self.batch_size = batch_size
+		self.updates = {}
+		self.lock = threading.RLock()
+
+	def add(self, entity_type, id, update):
+		"""Add a pending update for the entity with the specified type and database ID
+
+		update must be an update document containing $set and/or $unset, as returned by Entity.get_changes. The values being set are copied, so changes made in place to the entity's mutable values after this method returns are not written by the pending update.
+		"""
+
+		update = deepcopy(update)
+
+		with self.lock:
+			if entity_type not in self.updates:
+				self.updates[entity_type] = OrderedDict()
+			updates = self.updates[entity_type]
+
+			if id in updates:
+				update = self.merge(updates[id], update)
+			updates[id] = update
+
+			if len(updates) >= self.batch_size:
+				self.flush_entity_type(entity_type)
+
+	def discard(self, entity_type, id):
+		"""Discard any pending update for the entity with the specified type and database ID"""
+
+		with self.lock:
+			if entity_type in self.updates:
+				self.updates[entity_type].pop(id, None)
+
+	def flush(self):
+		"""Write all pending updates to the database"""
+
+		with self.lock:
+			for entity_type in list(self.updates.keys()):
+				self.flush_entity_type(entity_type)
+
+	def flush_entity_type(self, entity_type):
+		"""Write all pending updates for the specified entity type to the database"""
+
+		with self.lock:
+			updates = self.updates.pop(entity_type, None)
+			if not updates:
+				return
+
+			collection = entity_type.get_database_collection()
+
+			requests = None
+			if hasattr(collection, 'bulk_write'):
+				try:
+					from pymongo import UpdateOne
+					requests = [UpdateOne({'_id': id}, update) for id, update in updates.items()]
+				except ImportError:
+					requests = None
+
+			if requests is not None:
+				collection.bulk_write(requests, ordered=True)
+			else:
+				for id, update in updates.items():
+					collection.update_one({'_id': id}, update)
+
+	def merge(self, pending, new):
+		"""Return a single update document equivalent to applying the pending update followed by the new update"""
+
+		update = {'$set': dict(pending.get('$set', {})), '$unset': dict(pending.get('$unset', {}))}
+		for key, value in new.get('$set', {}).items():
+			update['$set'][key] = value
+			update['$unset'].pop(key, None)
+		for key in new.get('$unset', {}):
+			update['$unset'][key] = ''
+			update['$set'].pop(key, None)
+		return dict((operator, values) for operator, values in update.items() if len(values) > 0)